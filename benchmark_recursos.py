@@ -0,0 +1,45 @@
+"""
+Benchmark do custo por passo de simulação em função do número de recursos,
+comparando as consultas pelo IndiceRecursos com a varredura linear.
+
+Uso: python benchmark_recursos.py [largura] [altura]
+"""
+import random
+import sys
+import time
+
+from robo_exercicio import Ambiente, Robo
+
+
+def custo_por_passo(ambiente, usar_indice, n_passos=2000, semente=0):
+    indice = ambiente.indice_recursos
+    if not usar_indice:
+        ambiente.indice_recursos = None
+    random.seed(semente)
+    ambiente.reset()
+    robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+
+    inicio = time.perf_counter()
+    for _ in range(n_passos):
+        robo.get_sensores(ambiente)
+        robo.mover(random.uniform(-1, 1), random.uniform(-0.5, 0.5), ambiente)
+        ambiente.soma_distancias_recursos(robo.x, robo.y)  # potencial do shaping
+        robo.energia = 100  # mantém o robô vivo durante a medição
+    duracao = time.perf_counter() - inicio
+
+    ambiente.indice_recursos = indice
+    return duracao / n_passos
+
+
+if __name__ == "__main__":
+    largura = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    altura  = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    print(f"Mapa {largura}x{altura}")
+    print(f"{'recursos':>9} | {'linear (us/passo)':>18} | {'índice (us/passo)':>18} | {'ganho':>6}")
+    for n_recursos in (5, 50, 200, 1000, 2000, 5000):
+        random.seed(42)
+        ambiente = Ambiente(largura, altura, num_obstaculos=20, num_recursos=n_recursos)
+        linear = custo_por_passo(ambiente, usar_indice=False)
+        indice = custo_por_passo(ambiente, usar_indice=True)
+        print(f"{n_recursos:>9} | {linear * 1e6:>18.1f} | {indice * 1e6:>18.1f} | {linear / indice:>5.1f}x")
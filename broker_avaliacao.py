@@ -0,0 +1,378 @@
+"""
+Broker local de avaliação: um único conjunto de processos de simulação
+compartilhado por vários treinadores (ProgramacaoGenetica) na mesma máquina.
+
+Protocolo: uma mensagem JSON por linha, via socket Unix ou TCP em localhost.
+
+  cliente -> broker
+    {"tipo": "ola", "nome": "exp1"}
+    {"tipo": "lote", "lote": 7, "cenario": 123, "semente": 456,
+     "avaliador": {...}, "timeout": 30, "fim": true,
+     "tarefas": [{"id": 0, "arvores": [arvore_aceleracao, arvore_rotacao]}, ...]}
+    {"tipo": "estatisticas"}
+
+  broker -> cliente
+    {"tipo": "resultado", "lote": 7, "id": 0, "fitness": ..., "passos": ...}
+    {"tipo": "erro", "lote": 7, "id": 0, "erro": "timeout"}
+    {"tipo": "erro", "lote": 7, "erro": "..."}     (parte recusada)
+    {"tipo": "lote_concluido", "lote": 7}
+    {"tipo": "estatisticas", "clientes": {...}}
+
+Um lote pode vir em várias mensagens (partes) com o mesmo número de lote;
+a última tem "fim": true (o padrão, se o campo faltar). Uma parte com mais
+de `limite_pendentes` tarefas é recusada.
+
+Os resultados são enviados à medida que ficam prontos. As tarefas de cada
+cliente entram em uma fila própria e o escalonador alterna entre os clientes
+com trabalho (rodízio), então um cliente com lotes grandes não monopoliza os
+processos. A contrapressão conta indivíduos: quando um cliente tem
+`limite_pendentes` tarefas em aberto o broker para de ler o seu socket, e o
+envio do lado do cliente bloqueia. Como cada parte é limitada, a fila de um
+cliente nunca passa de 2 x limite_pendentes tarefas.
+
+Uso:
+    python broker_avaliacao.py --socket /tmp/broker_pg.sock --processos 8
+    python broker_avaliacao.py --porta 8765
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from robo_exercicio import AvaliadorFitness, avaliar_em_processo
+
+
+class EstadoCliente:
+    def __init__(self, nome, writer):
+        self.nome = nome
+        self.writer = writer
+        self.fila = deque()           # tarefas aguardando um processo
+        self.pendentes = 0            # na fila ou em execução
+        self.lotes = {}               # lote -> tarefas ainda sem resposta
+        self.livre = asyncio.Event()  # sinaliza pendentes < limite
+        self.livre.set()
+        self.trava_escrita = asyncio.Lock()
+        self.conectado = True
+
+        # contadores
+        self.inicio = time.monotonic()
+        self.enviadas = 0
+        self.concluidas = 0
+        self.erros = 0
+        self.timeouts = 0
+        self.tempo_cpu = 0.0
+
+    def estatisticas(self):
+        duracao = max(1e-9, time.monotonic() - self.inicio)
+        return {
+            'enviadas':   self.enviadas,
+            'concluidas': self.concluidas,
+            'erros':      self.erros,
+            'timeouts':   self.timeouts,
+            'pendentes':  self.pendentes,
+            'tarefas_por_segundo': self.concluidas / duracao,
+            'segundos_de_processo': self.tempo_cpu,
+        }
+
+
+class BrokerAvaliacao:
+    # Tamanho máximo de uma linha (um lote inteiro de árvores em JSON)
+    LIMITE_MENSAGEM = 64 * 1024 * 1024
+
+    def __init__(self, n_processos=None, limite_pendentes=256, timeout_padrao=120.0):
+        self.n_processos = n_processos or os.cpu_count() or 1
+        self.limite_pendentes = limite_pendentes
+        self.timeout_padrao = timeout_padrao
+        self.clientes = {}
+        self.rodizio = deque()  # clientes com tarefas na fila
+        self.proximo_id = 0
+        self.vagas = asyncio.Semaphore(self.n_processos)
+        self.ha_trabalho = asyncio.Event()
+
+    async def iniciar(self, caminho_socket=None, host='127.0.0.1', porta=0):
+        # spawn: processos criados por fork herdariam os sockets dos clientes
+        # já conectados e a conexão não fecharia quando um lado a encerrasse
+        self.pool = ProcessPoolExecutor(max_workers=self.n_processos,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        self.escalonador = asyncio.create_task(self.escalonar())
+        if caminho_socket:
+            if os.path.exists(caminho_socket):
+                os.unlink(caminho_socket)
+            self.servidor = await asyncio.start_unix_server(
+                self.atender, path=caminho_socket, limit=self.LIMITE_MENSAGEM)
+        else:
+            self.servidor = await asyncio.start_server(
+                self.atender, host, porta, limit=self.LIMITE_MENSAGEM)
+        return self.servidor
+
+    async def encerrar(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        self.escalonador.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Conexões
+    # ------------------------------------------------------------------
+    async def atender(self, reader, writer):
+        self.proximo_id += 1
+        cliente = EstadoCliente(f"cliente-{self.proximo_id}", writer)
+        self.clientes[id(cliente)] = cliente
+        try:
+            while True:
+                # contrapressão: não lê mais nada enquanto o cliente estiver no limite
+                await cliente.livre.wait()
+                linha = await reader.readline()
+                if not linha:
+                    break
+                mensagem = json.loads(linha)
+                tipo = mensagem.get('tipo')
+                if tipo == 'ola':
+                    cliente.nome = mensagem.get('nome', cliente.nome)
+                elif tipo == 'lote':
+                    erro = self.receber_lote(cliente, mensagem)
+                    if erro is not None:
+                        await self.enviar(cliente, {'tipo': 'erro', 'lote': mensagem.get('lote'),
+                                                    'erro': erro})
+                elif tipo == 'estatisticas':
+                    await self.enviar(cliente, {'tipo': 'estatisticas',
+                                                'clientes': self.estatisticas()})
+                else:
+                    await self.enviar(cliente, {'tipo': 'erro', 'erro': f"mensagem desconhecida: {tipo}"})
+        except (ConnectionError, ValueError):  # inclui JSON inválido e linha longa demais
+            pass
+        finally:
+            cliente.conectado = False
+            cliente.fila.clear()
+            del self.clientes[id(cliente)]
+            writer.close()
+
+    def receber_lote(self, cliente, mensagem):
+        """Admite uma parte de lote; devolve o motivo se ela for recusada."""
+        lote = mensagem['lote']
+        tarefas = mensagem['tarefas']
+        if len(tarefas) > self.limite_pendentes:
+            return (f"parte com {len(tarefas)} tarefas acima do limite de "
+                    f"{self.limite_pendentes}; divida o lote")
+        avaliador = AvaliadorFitness.de_configuracao(mensagem.get('avaliador', {}))
+        estado = cliente.lotes.setdefault(lote, {'abertas': 0, 'fim': False})
+        estado['abertas'] += len(tarefas)
+        estado['fim'] = mensagem.get('fim', True)
+        for tarefa in tarefas:
+            cliente.fila.append({
+                'lote': lote, 'id': tarefa['id'], 'arvores': tarefa['arvores'],
+                'cenario': mensagem['cenario'], 'semente': mensagem.get('semente'),
+                'avaliador': avaliador,
+                'timeout': mensagem.get('timeout', self.timeout_padrao),
+            })
+        cliente.enviadas += len(tarefas)
+        cliente.pendentes += len(tarefas)
+        if cliente.pendentes >= self.limite_pendentes:
+            cliente.livre.clear()
+        if tarefas and cliente not in self.rodizio:
+            self.rodizio.append(cliente)
+            self.ha_trabalho.set()
+        if estado['fim'] and estado['abertas'] == 0:
+            del cliente.lotes[lote]
+            asyncio.create_task(self.enviar(cliente, {'tipo': 'lote_concluido', 'lote': lote}))
+        return None
+
+    async def enviar(self, cliente, mensagem):
+        if not cliente.conectado:
+            return
+        async with cliente.trava_escrita:
+            cliente.writer.write((json.dumps(mensagem) + '\n').encode())
+            try:
+                await cliente.writer.drain()
+            except ConnectionError:
+                cliente.conectado = False
+
+    # ------------------------------------------------------------------
+    # Escalonamento
+    # ------------------------------------------------------------------
+    async def escalonar(self):
+        while True:
+            await self.vagas.acquire()
+            cliente = None
+            while cliente is None:
+                while not self.rodizio:
+                    self.ha_trabalho.clear()
+                    await self.ha_trabalho.wait()
+                # rodízio entre clientes: uma tarefa de cada por vez
+                cliente = self.rodizio.popleft()
+                if not cliente.fila:  # desconectou com tarefas na fila
+                    cliente = None
+            tarefa = cliente.fila.popleft()
+            if cliente.fila:
+                self.rodizio.append(cliente)
+            asyncio.create_task(self.executar(cliente, tarefa))
+
+    async def executar(self, cliente, tarefa):
+        loop = asyncio.get_running_loop()
+        inicio = time.monotonic()
+        futuro = loop.run_in_executor(
+            self.pool, avaliar_em_processo, tuple(tarefa['arvores']),
+            tarefa['avaliador'], tarefa['cenario'], tarefa['semente'])
+
+        def liberar(_):
+            # a vaga só volta quando o processo termina de fato, mesmo após timeout
+            cliente.tempo_cpu += time.monotonic() - inicio
+            self.vagas.release()
+        futuro.add_done_callback(liberar)
+
+        resposta = {'lote': tarefa['lote'], 'id': tarefa['id']}
+        try:
+            fitness, passos = await asyncio.wait_for(asyncio.shield(futuro), tarefa['timeout'])
+            resposta.update(tipo='resultado', fitness=float(fitness), passos=int(passos))
+            cliente.concluidas += 1
+        except asyncio.TimeoutError:
+            resposta.update(tipo='erro', erro='timeout')
+            cliente.timeouts += 1
+        except Exception as erro:
+            resposta.update(tipo='erro', erro=repr(erro))
+            cliente.erros += 1
+
+        cliente.pendentes -= 1
+        if cliente.pendentes < self.limite_pendentes:
+            cliente.livre.set()
+        await self.enviar(cliente, resposta)
+        estado = cliente.lotes[tarefa['lote']]
+        estado['abertas'] -= 1
+        if estado['abertas'] == 0 and estado['fim']:
+            del cliente.lotes[tarefa['lote']]
+            await self.enviar(cliente, {'tipo': 'lote_concluido', 'lote': tarefa['lote']})
+
+    def estatisticas(self):
+        return {c.nome: c.estatisticas() for c in self.clientes.values()}
+
+
+class ClienteBroker:
+    """
+    Cliente síncrono para ProgramacaoGenetica(broker=ClienteBroker(...)).
+    `endereco` é o caminho de um socket Unix ou um par (host, porta).
+    """
+    def __init__(self, endereco, nome=None, timeout=None, tarefas_por_mensagem=32,
+                 tentativas=1):
+        if isinstance(endereco, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.connect(endereco)
+        self.arquivo = self.sock.makefile('rwb')
+        self.timeout = timeout
+        self.tarefas_por_mensagem = tarefas_por_mensagem
+        self.tentativas = tentativas  # reenvios das tarefas que falharem
+        self.falhas = []              # índices sem resultado no último lote
+        self.proximo_lote = 0
+        if nome:
+            self.enviar({'tipo': 'ola', 'nome': nome})
+
+    def enviar(self, mensagem):
+        self.arquivo.write((json.dumps(mensagem) + '\n').encode())
+        self.arquivo.flush()
+
+    def receber(self):
+        linha = self.arquivo.readline()
+        if not linha:
+            raise ConnectionError("broker encerrou a conexão")
+        return json.loads(linha)
+
+    def avaliar_lote(self, individuos, semente_cenario, semente, avaliador=None):
+        """
+        Lista de (fitness, passos) na ordem dos indivíduos. O lote vai em
+        partes de no máximo `tarefas_por_mensagem` tarefas. As que falharem
+        ou estourarem o timeout são reenviadas até `tentativas` vezes; as que
+        ainda assim falharem recebem o pior fitness do lote e 0 passos (ver
+        completar_falhas) e ficam listadas em self.falhas.
+        """
+        resultados = [None] * len(individuos)
+        faltando = list(range(len(individuos)))
+        for _ in range(1 + self.tentativas):
+            if not faltando:
+                break
+            self.enviar_lote(individuos, faltando, resultados,
+                             semente_cenario, semente, avaliador)
+            faltando = [i for i in faltando if resultados[i] is None]
+        self.falhas = faltando
+        return self.completar_falhas(resultados)
+
+    def enviar_lote(self, individuos, indices, resultados, semente_cenario, semente, avaliador):
+        lote = self.proximo_lote
+        self.proximo_lote += 1
+        for inicio in range(0, len(indices), self.tarefas_por_mensagem):
+            parte = indices[inicio:inicio + self.tarefas_por_mensagem]
+            mensagem = {
+                'tipo': 'lote', 'lote': lote, 'cenario': semente_cenario, 'semente': semente,
+                'avaliador': avaliador or {},
+                'fim': inicio + self.tarefas_por_mensagem >= len(indices),
+                'tarefas': [{'id': i, 'arvores': [individuos[i].arvore_aceleracao,
+                                                  individuos[i].arvore_rotacao]}
+                            for i in parte],
+            }
+            if self.timeout is not None:
+                mensagem['timeout'] = self.timeout
+            self.enviar(mensagem)
+
+        while True:
+            resposta = self.receber()
+            if resposta.get('lote') != lote:
+                continue
+            if resposta['tipo'] == 'resultado':
+                resultados[resposta['id']] = (resposta['fitness'], resposta['passos'])
+            elif resposta['tipo'] == 'erro' and 'id' not in resposta:
+                raise RuntimeError(f"broker recusou o lote: {resposta['erro']}")
+            elif resposta['tipo'] == 'lote_concluido':
+                return
+
+    @staticmethod
+    def completar_falhas(resultados):
+        """
+        Troca os resultados ausentes (None) pelo pior fitness obtido no lote,
+        que é finito e não distorce média, desvio nem a roleta.
+        """
+        validos = [r[0] for r in resultados if r is not None]
+        if resultados and not validos:
+            raise RuntimeError("nenhuma tarefa do lote foi avaliada pelo broker")
+        pior = min(validos, default=0.0)
+        return [r if r is not None else (pior, 0) for r in resultados]
+
+    def estatisticas(self):
+        self.enviar({'tipo': 'estatisticas'})
+        while True:
+            resposta = self.receber()
+            if resposta['tipo'] == 'estatisticas':
+                return resposta['clientes']
+
+    def fechar(self):
+        self.arquivo.close()
+        self.sock.close()
+
+
+async def servir(args):
+    broker = BrokerAvaliacao(args.processos, args.limite_pendentes, args.timeout)
+    servidor = await broker.iniciar(args.socket, args.host, args.porta)
+    enderecos = ', '.join(str(s.getsockname()) for s in servidor.sockets)
+    print(f"Broker de avaliação com {broker.n_processos} processos em {enderecos}")
+    try:
+        await servidor.serve_forever()
+    finally:
+        await broker.encerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Broker local de avaliação de indivíduos")
+    parser.add_argument('--socket', help="caminho do socket Unix")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--limite-pendentes', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    try:
+        asyncio.run(servir(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
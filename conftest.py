@@ -0,0 +1,4 @@
+import matplotlib
+
+# Os testes nunca abrem janelas
+matplotlib.use('Agg')
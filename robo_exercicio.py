@@ -1,13 +1,29 @@
 import numpy as np
 import random
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import matplotlib.animation as animation
+from matplotlib.collections import PatchCollection
 import json
 import time
 import math
 import difflib
 import copy
+import heapq
+import hashlib
+import struct
+import zlib
+import os
+import functools
+import weakref
+import threading
+import queue
+import multiprocessing
+import http.server
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 # =====================================================================
 # PARTE 1: ESTRUTURA DA SIMULAÇÃO (NÃO MODIFICAR)
@@ -15,16 +31,240 @@ import copy
 # o robô e a visualização. Não é recomendado modificar esta parte.
 # =====================================================================
 
+class IndiceRecursos:
+    """
+    Índice espacial dos recursos não coletados de um Ambiente.
+
+    Grade uniforme com uma pirâmide de contagens por cima (cada nível junta
+    2x2 células do anterior). A coleta remove o recurso da célula e
+    decrementa as contagens até a raiz, então as consultas de mais próximo,
+    coleta por raio e contagem em setor angular só descem nos ramos que
+    ainda têm recursos e que cruzam a região consultada.
+    """
+    def __init__(self, recursos, largura, altura, tamanho_celula=64):
+        self.recursos = recursos
+        self.tamanho_celula = tamanho_celula
+        self.niveis = max(0, math.ceil(math.log2(max(largura, altura, 1) / tamanho_celula)))
+        self.lado = 1 << self.niveis  # células por lado no nível mais fino
+        self.xs = [float(r['x']) for r in recursos]
+        self.ys = [float(r['y']) for r in recursos]
+        # cópias em NumPy para as agregações que dependem de todos os recursos
+        self.xs_np = np.array(self.xs)
+        self.ys_np = np.array(self.ys)
+        self.reset()
+
+    def celula(self, x, y):
+        ix = min(self.lado - 1, max(0, int(x // self.tamanho_celula)))
+        iy = min(self.lado - 1, max(0, int(y // self.tamanho_celula)))
+        return ix, iy
+
+    def reset(self):
+        # contagens[n] é a grade do nível n (0 = mais fino), achatada por linha
+        self.contagens = [[0] * ((self.lado >> n) ** 2) for n in range(self.niveis + 1)]
+        self.celulas = {}
+        self.restantes = 0
+        self.ativos = np.array([not r['coletado'] for r in self.recursos], dtype=bool)
+        for i, r in enumerate(self.recursos):
+            if not r['coletado']:
+                ix, iy = self.celula(self.xs[i], self.ys[i])
+                self.celulas.setdefault((ix, iy), []).append(i)
+                self.ajustar_contagens(ix, iy, 1)
+                self.restantes += 1
+
+    def ajustar_contagens(self, ix, iy, delta):
+        for n in range(self.niveis + 1):
+            self.contagens[n][(iy >> n) * (self.lado >> n) + (ix >> n)] += delta
+
+    def remover(self, i):
+        ix, iy = self.celula(self.xs[i], self.ys[i])
+        self.celulas[(ix, iy)].remove(i)
+        self.ajustar_contagens(ix, iy, -1)
+        self.ativos[i] = False
+        self.restantes -= 1
+
+    def coletar_no_raio(self, x, y, raio):
+        """Marca como coletados os recursos a menos de `raio` de (x, y)."""
+        x0, y0 = self.celula(x - raio, y - raio)
+        x1, y1 = self.celula(x + raio, y + raio)
+        coletados = []
+        for iy in range(y0, y1 + 1):
+            for ix in range(x0, x1 + 1):
+                for i in self.celulas.get((ix, iy), ()):
+                    if math.hypot(x - self.xs[i], y - self.ys[i]) < raio:
+                        coletados.append(i)
+        for i in coletados:
+            self.recursos[i]['coletado'] = True
+            self.remover(i)
+        return len(coletados)
+
+    def mais_proximo(self, x, y):
+        """(distância, índice) do recurso não coletado mais próximo, ou (inf, None)."""
+        melhor = (float('inf'), None)
+        if self.restantes == 0:
+            return melhor
+        # busca best-first pela pirâmide, podando pela distância até a caixa
+        heap = [(0.0, self.niveis, 0, 0)]
+        while heap:
+            d_caixa, n, ix, iy = heapq.heappop(heap)
+            if d_caixa > melhor[0]:
+                break
+            if n == 0:
+                for i in self.celulas.get((ix, iy), ()):
+                    cand = (math.hypot(x - self.xs[i], y - self.ys[i]), i)
+                    if cand < melhor:
+                        melhor = cand
+                continue
+            n -= 1
+            s = self.tamanho_celula << n
+            largura_nivel = self.lado >> n
+            for cy in (2 * iy, 2 * iy + 1):
+                for cx in (2 * ix, 2 * ix + 1):
+                    if self.contagens[n][cy * largura_nivel + cx] == 0:
+                        continue
+                    dx = max(cx * s - x, 0.0, x - (cx + 1) * s)
+                    dy = max(cy * s - y, 0.0, y - (cy + 1) * s)
+                    d = math.hypot(dx, dy)
+                    if d <= melhor[0]:
+                        heapq.heappush(heap, (d, n, cx, cy))
+        return melhor
+
+    def direcao_media(self, x, y):
+        """Soma dos vetores unitários até os recursos não coletados."""
+        dx = self.xs_np[self.ativos] - x
+        dy = self.ys_np[self.ativos] - y
+        dist = np.hypot(dx, dy)
+        dist[dist == 0] = 1.0
+        return float(np.sum(dx / dist)), float(np.sum(dy / dist))
+
+    def soma_distancias(self, x, y):
+        return float(np.sum(np.hypot(self.xs_np[self.ativos] - x, self.ys_np[self.ativos] - y)))
+
+    def contar_no_setor(self, x, y, angulo, abertura):
+        """Recursos não coletados com |ângulo relativo a `angulo`| <= abertura."""
+        total = 0
+        pilha = [(self.niveis, 0, 0)]
+        while pilha:
+            n, ix, iy = pilha.pop()
+            if self.contagens[n][iy * (self.lado >> n) + ix] == 0:
+                continue
+            s = self.tamanho_celula << n
+            x0, y0 = ix * s, iy * s
+            if n > 0 and not (x0 <= x < x0 + s and y0 <= y < y0 + s):
+                situacao = self.setor_contem_caixa(x, y, angulo, abertura, x0, y0, s)
+                if situacao == 'fora':
+                    continue
+                if situacao == 'dentro':
+                    total += self.contagens[n][iy * (self.lado >> n) + ix]
+                    continue
+            if n == 0:
+                for i in self.celulas.get((ix, iy), ()):
+                    ang = math.atan2(self.ys[i] - y, self.xs[i] - x) - angulo
+                    ang = (ang + math.pi) % (2*math.pi) - math.pi
+                    if abs(ang) <= abertura:
+                        total += 1
+                continue
+            for cy in (2 * iy, 2 * iy + 1):
+                for cx in (2 * ix, 2 * ix + 1):
+                    pilha.append((n - 1, cx, cy))
+        return total
+
+    @staticmethod
+    def setor_contem_caixa(x, y, angulo, abertura, x0, y0, s):
+        """Classifica uma caixa que não contém (x, y) como 'dentro', 'fora' ou 'parcial'."""
+        ang_c = math.atan2(y0 + s / 2 - y, x0 + s / 2 - x)
+        desvios = []
+        for cx, cy in ((x0, y0), (x0 + s, y0), (x0, y0 + s), (x0 + s, y0 + s)):
+            d = math.atan2(cy - y, cx - x) - ang_c
+            desvios.append((d + math.pi) % (2*math.pi) - math.pi)
+        centro = (ang_c - angulo + math.pi) % (2*math.pi) - math.pi
+        lo, hi = centro + min(desvios), centro + max(desvios)
+        if -abertura <= lo and hi <= abertura:
+            return 'dentro'
+        for k in (-2*math.pi, 0.0, 2*math.pi):
+            if lo + k <= abertura and hi + k >= -abertura:
+                return 'parcial'
+        return 'fora'
+
 class Ambiente:
+    # A partir de quantos recursos as consultas passam pelo IndiceRecursos
+    LIMIAR_INDICE = 32
+    # Passos por episódio dos cenários gerados
+    MAX_TEMPO = 1000
+
     def __init__(self, largura=800, altura=600, num_obstaculos=5, num_recursos=5):
         self.largura = largura
         self.altura = altura
         self.obstaculos = self.gerar_obstaculos(num_obstaculos)
         self.recursos = self.gerar_recursos(num_recursos)
         self.tempo = 0
-        self.max_tempo = 1000
+        self.max_tempo = self.MAX_TEMPO
         self.meta = self.gerar_meta()
         self.meta_atingida = False
+        self.indice_recursos = self.construir_indice()
+        self.grade_colisao = None  # ver usar_grade_colisao
+        self.raio_grade    = None
+        self.celula_grade  = None
+
+    @classmethod
+    def de_layout(cls, largura, altura, obstaculos, recursos, meta, max_tempo=MAX_TEMPO):
+        """Ambiente com layout já definido (sem sortear nada)."""
+        ambiente = cls.__new__(cls)
+        ambiente.largura = largura
+        ambiente.altura = altura
+        ambiente.obstaculos = obstaculos
+        ambiente.recursos = recursos
+        ambiente.tempo = 0
+        ambiente.max_tempo = max_tempo
+        ambiente.meta = meta
+        ambiente.meta_atingida = False
+        ambiente.indice_recursos = ambiente.construir_indice()
+        ambiente.grade_colisao = None
+        ambiente.raio_grade    = None
+        ambiente.celula_grade  = None
+        return ambiente
+
+    def usar_grade_colisao(self, raio=15, celula=4, grade=None):
+        """
+        Liga o atalho de verificar_colisao para robôs de `raio`: calcula a
+        grade, ou usa `grade` já calculada para este layout com o mesmo raio
+        e célula (e.g. compartilhada entre cópias ou lida do BancoCenarios).
+        """
+        self.grade_colisao = self.calcular_grade_colisao(raio, celula) if grade is None else grade
+        self.raio_grade    = raio
+        self.celula_grade  = celula
+        return self.grade_colisao
+
+    def calcular_grade_colisao(self, raio=15, celula=4):
+        """
+        Grade com 1 nas células em que um robô de `raio` centrado em qualquer
+        ponto da célula certamente não colide. É conservadora: células de
+        fronteira ficam com 0 e caem na verificação exata.
+        """
+        colunas = math.ceil(self.largura / celula)
+        linhas  = math.ceil(self.altura / celula)
+        livre = np.ones((linhas, colunas), dtype=np.uint8)
+
+        def faixa(a, b, n):
+            # células [i*celula, (i+1)*celula] que tocam o intervalo fechado [a, b]
+            return max(0, math.ceil(a / celula - 1)), min(n, math.floor(b / celula) + 1)
+
+        # bordas
+        livre[:, :faixa(-1, raio, colunas)[1]] = 0
+        livre[:, faixa(self.largura - raio, self.largura + 1, colunas)[0]:] = 0
+        livre[:faixa(-1, raio, linhas)[1], :] = 0
+        livre[faixa(self.altura - raio, self.altura + 1, linhas)[0]:, :] = 0
+        # obstáculos expandidos pelo raio
+        for o in self.obstaculos:
+            c0, c1 = faixa(o['x'] - raio, o['x'] + o['largura'] + raio, colunas)
+            l0, l1 = faixa(o['y'] - raio, o['y'] + o['altura'] + raio, linhas)
+            livre[l0:l1, c0:c1] = 0
+        return livre
+
+    def construir_indice(self):
+        # Com poucos recursos a varredura linear é mais barata que o índice
+        if len(self.recursos) <= self.LIMIAR_INDICE:
+            return None
+        return IndiceRecursos(self.recursos, self.largura, self.altura)
     
     def gerar_obstaculos(self, num_obstaculos):
         obstaculos = []
@@ -89,6 +329,13 @@ class Ambiente:
         }
     
     def verificar_colisao(self, x, y, raio):
+        # Atalho pela grade pré-calculada (ex.: vinda do BancoCenarios)
+        grade = self.grade_colisao
+        if grade is not None and raio == self.raio_grade and x >= 0 and y >= 0:
+            ix, iy = int(x // self.celula_grade), int(y // self.celula_grade)
+            if iy < grade.shape[0] and ix < grade.shape[1] and grade[iy, ix]:
+                return False
+
         # Verificar colisão com as bordas
         if x - raio < 0 or x + raio > self.largura or y - raio < 0 or y + raio > self.altura:
             return True
@@ -104,6 +351,8 @@ class Ambiente:
         return False
     
     def verificar_coleta_recursos(self, x, y, raio):
+        if self.indice_recursos is not None:
+            return self.indice_recursos.coletar_no_raio(x, y, raio + 10)
         recursos_coletados = 0
         for recurso in self.recursos:
             if not recurso['coletado']:
@@ -125,6 +374,8 @@ class Ambiente:
         self.tempo = 0
         for recurso in self.recursos:
             recurso['coletado'] = False
+        if self.indice_recursos is not None:
+            self.indice_recursos.reset()
         self.meta_atingida = False
         return self.get_estado()
     
@@ -132,14 +383,75 @@ class Ambiente:
         return {
             'tempo': self.tempo,
             'recursos_coletados': sum(1 for r in self.recursos if r['coletado']),
-            'recursos_restantes': sum(1 for r in self.recursos if not r['coletado']),
+            'recursos_restantes': self.recursos_restantes(),
             'meta_atingida': self.meta_atingida
         }
     
+    def recursos_restantes(self):
+        if self.indice_recursos is not None:
+            return self.indice_recursos.restantes
+        return sum(1 for r in self.recursos if not r['coletado'])
+
+    def recurso_mais_proximo(self, x, y):
+        """(distância, recurso) do recurso não coletado mais próximo."""
+        if self.indice_recursos is not None:
+            dist, i = self.indice_recursos.mais_proximo(x, y)
+            return dist, (self.recursos[i] if i is not None else None)
+        dist, rec_prox = float('inf'), None
+        for r in self.recursos:
+            if not r['coletado']:
+                d = np.hypot(x - r['x'], y - r['y'])
+                if d < dist:
+                    dist, rec_prox = d, r
+        return dist, rec_prox
+
+    def direcao_recursos(self, x, y):
+        """Soma dos vetores unitários até todos os recursos não coletados."""
+        if self.indice_recursos is not None:
+            return self.indice_recursos.direcao_media(x, y)
+        sum_dx, sum_dy = 0.0, 0.0
+        for r in self.recursos:
+            if not r['coletado']:
+                dx, dy = r['x'] - x, r['y'] - y
+                dist = np.hypot(dx, dy) or 1.0
+                sum_dx += dx / dist
+                sum_dy += dy / dist
+        return sum_dx, sum_dy
+
+    def recursos_no_cone(self, x, y, angulo, abertura):
+        if self.indice_recursos is not None:
+            return self.indice_recursos.contar_no_setor(x, y, angulo, abertura)
+        count_cone = 0
+        for r in self.recursos:
+            if not r['coletado']:
+                dx, dy = r['x'] - x, r['y'] - y
+                ang = math.atan2(dy, dx) - angulo
+                ang = (ang + math.pi) % (2*math.pi) - math.pi
+                if abs(ang) <= abertura:
+                    count_cone += 1
+        return count_cone
+
+    def soma_distancias_recursos(self, x, y):
+        if self.indice_recursos is not None:
+            return self.indice_recursos.soma_distancias(x, y)
+        return sum(
+            np.hypot(x - r['x'], y - r['y'])
+            for r in self.recursos if not r['coletado']
+        )
+
     def passo(self):
         self.tempo += 1
         return self.tempo >= self.max_tempo
     
+    @classmethod
+    def gerar_cenario(cls, semente, **parametros):
+        """Ambiente reprodutível a partir de uma semente, sem afetar o `random` global."""
+        estado = random.getstate()
+        random.seed(semente)
+        ambiente = cls(**parametros)
+        random.setstate(estado)
+        return ambiente
+
     def posicao_segura(self, raio_robo=15):
         """Encontra uma posição segura para o robô, longe dos obstáculos"""
         max_tentativas = 100
@@ -275,13 +587,7 @@ class Robo:
     
     def get_sensores(self, ambiente):
         # recurso mais próximo
-        dist_recurso = float('inf')
-        rec_prox = None
-        for r in ambiente.recursos:
-            if not r['coletado']:
-                d = np.hypot(self.x - r['x'], self.y - r['y'])
-                if d < dist_recurso:
-                    dist_recurso, rec_prox = d, r
+        dist_recurso, rec_prox = ambiente.recurso_mais_proximo(self.x, self.y)
 
         # obstáculo mais próximo
         dist_obst = float('inf')
@@ -306,7 +612,7 @@ class Robo:
         ang_meta = math.atan2(dym, dxm) - self.angulo
         ang_meta = (ang_meta + math.pi) % (2*math.pi) - math.pi
 
-        recursos_rest = sum(1 for r in ambiente.recursos if not r['coletado'])
+        recursos_rest = ambiente.recursos_restantes()
 
         # vetor unitário direção à meta
         norm_m = np.hypot(dxm, dym) or 1.0
@@ -329,26 +635,13 @@ class Robo:
         }
 
         # 1) Soma de vetores direção a todos os recursos não coletados
-        sum_dx, sum_dy = 0.0, 0.0
-        for r in ambiente.recursos:
-            if not r['coletado']:
-                dx, dy = r['x'] - self.x, r['y'] - self.y
-                dist = np.hypot(dx, dy) or 1.0
-                sum_dx += dx / dist
-                sum_dy += dy / dist
+        sum_dx, sum_dy = ambiente.direcao_recursos(self.x, self.y)
         mag = np.hypot(sum_dx, sum_dy) or 1.0
         sensores['direcao_recursos_x'] = sum_dx / mag
         sensores['direcao_recursos_y'] = sum_dy / mag
 
         # 2) Contagem de recursos dentro de um cone frontal ±30°
-        count_cone = 0
-        for r in ambiente.recursos:
-            if not r['coletado']:
-                dx, dy = r['x'] - self.x, r['y'] - self.y
-                ang = math.atan2(dy, dx) - self.angulo
-                ang = (ang + math.pi) % (2*math.pi) - math.pi
-                if abs(ang) <= math.radians(30):
-                    count_cone += 1
+        count_cone = ambiente.recursos_no_cone(self.x, self.y, self.angulo, math.radians(30))
         sensores['recursos_cone_frontal'] = count_cone / max(1, len(ambiente.recursos))
 
         # 3) Passos desde a última coleta (normalizado pelo tempo máximo)
@@ -356,169 +649,346 @@ class Robo:
 
         return sensores
 
+# Estado do robô por passo gravado pelo GravadorTrajetoria
+DTYPE_TRAJETORIA = np.dtype([
+    ('x',          '<f4'),
+    ('y',          '<f4'),
+    ('angulo',     '<f4'),
+    ('velocidade', '<f4'),
+    ('energia',    '<f4'),
+    ('coletados',  '<u2'),
+    ('colisao',    'u1'),
+    ('aceleracao', '<f4'),
+    ('rotacao',    '<f4'),
+])
+
+class GravadorTrajetoria:
+    """
+    Grava a trajetória de cada episódio em um arquivo binário próprio
+    (append-only, registros DTYPE_TRAJETORIA) e uma linha por episódio no
+    índice `indice.jsonl`. Só um buffer de `tamanho_buffer` passos fica em
+    memória; a leitura é feita com np.memmap, sem cópia.
+    """
+    ARQUIVO_INDICE = 'indice.jsonl'
+
+    def __init__(self, diretorio, tamanho_buffer=512):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self.buffer = np.empty(tamanho_buffer, dtype=DTYPE_TRAJETORIA)
+        self.n_buffer = 0
+        self.arquivo = None
+        self.contexto = {}  # metadados extras (ex.: geração) copiados para o índice
+        # continua a numeração de gravações anteriores no mesmo diretório
+        self.proximo_episodio = len(self.indice(diretorio))
+
+    def iniciar_episodio(self):
+        # pula números já usados por outro gravador no mesmo diretório
+        while os.path.exists(os.path.join(self.diretorio, f"episodio_{self.proximo_episodio:06d}.bin")):
+            self.proximo_episodio += 1
+        self.episodio = self.proximo_episodio
+        self.proximo_episodio += 1
+        self.nome_arquivo = f"episodio_{self.episodio:06d}.bin"
+        self.arquivo = open(os.path.join(self.diretorio, self.nome_arquivo), 'xb')
+        self.n_buffer = 0
+        self.passos = 0
+
+    def registrar(self, robo, aceleracao, rotacao, colisao):
+        self.buffer[self.n_buffer] = (
+            robo.x, robo.y, robo.angulo, robo.velocidade, robo.energia,
+            robo.recursos_coletados, colisao, aceleracao, rotacao
+        )
+        self.n_buffer += 1
+        self.passos += 1
+        if self.n_buffer == len(self.buffer):
+            self.descarregar()
+
+    def descarregar(self):
+        self.buffer[:self.n_buffer].tofile(self.arquivo)
+        self.n_buffer = 0
+
+    def finalizar_episodio(self, **metadados):
+        self.descarregar()
+        self.arquivo.close()
+        self.arquivo = None
+        entrada = {'episodio': self.episodio, 'arquivo': self.nome_arquivo,
+                   'passos': self.passos, **self.contexto, **metadados}
+        with open(os.path.join(self.diretorio, self.ARQUIVO_INDICE), 'a') as f:
+            f.write(json.dumps(entrada) + '\n')
+
+    @classmethod
+    def indice(cls, diretorio):
+        caminho = os.path.join(diretorio, cls.ARQUIVO_INDICE)
+        if not os.path.exists(caminho):
+            return []
+        with open(caminho) as f:
+            return [json.loads(linha) for linha in f if linha.strip()]
+
+    @staticmethod
+    def ambiente(entrada):
+        """
+        Ambiente em que um episódio de treino foi gravado (pela
+        `semente_cenario` da entrada do índice), ou None se ela não existir.
+        Para refazer o episódio: random.seed(entrada['semente_episodio']) e
+        AvaliadorFitness.simular_episodio nesse ambiente.
+        """
+        if entrada.get('semente_cenario') is None:
+            return None
+        return Ambiente.gerar_cenario(entrada['semente_cenario'])
+
+    @staticmethod
+    def carregar(diretorio, episodio):
+        """Trajetória de um episódio como np.memmap somente leitura."""
+        caminho = os.path.join(diretorio, f"episodio_{episodio:06d}.bin")
+        if os.path.getsize(caminho) == 0:
+            return np.empty(0, dtype=DTYPE_TRAJETORIA)
+        return np.memmap(caminho, dtype=DTYPE_TRAJETORIA, mode='r')
+
+def plotar_trajetoria(trajetoria, arquivo_png, ambiente=None):
+    """Desenha o caminho do robô, marcando colisões e coletas."""
+    fig, ax = plt.subplots(figsize=(10, 7))
+    if ambiente is not None:
+        ax.set_xlim(0, ambiente.largura)
+        ax.set_ylim(0, ambiente.altura)
+        for obst in ambiente.obstaculos:
+            ax.add_patch(patches.Rectangle(
+                (obst['x'], obst['y']), obst['largura'], obst['altura'],
+                linewidth=1, edgecolor='black', facecolor='#FF9999', alpha=0.7
+            ))
+        for rec in ambiente.recursos:
+            ax.add_patch(patches.Circle(
+                (rec['x'], rec['y']), 10,
+                linewidth=1, edgecolor='black', facecolor='#99FF99', alpha=0.8
+            ))
+        ax.add_patch(patches.Circle(
+            (ambiente.meta['x'], ambiente.meta['y']), ambiente.meta['raio'],
+            linewidth=2, edgecolor='black', facecolor='#FFFF00', alpha=0.8
+        ))
+    ax.plot(trajetoria['x'], trajetoria['y'], '-', color='#3333AA', linewidth=1)
+    colisoes = trajetoria['colisao'] > 0
+    ax.plot(trajetoria['x'][colisoes], trajetoria['y'][colisoes], 'rx', label='Colisão')
+    coletas = np.flatnonzero(np.diff(trajetoria['coletados'].astype(int)) > 0) + 1
+    ax.plot(trajetoria['x'][coletas], trajetoria['y'][coletas], 'g*', markersize=12, label='Coleta')
+    ax.set_title(f"Trajetória ({len(trajetoria)} passos)")
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    fig.savefig(arquivo_png)
+    plt.close(fig)
+
 class Simulador:
-    def __init__(self, ambiente, robo, individuo):
+    """
+    Roda um ou mais indivíduos no mesmo layout de Ambiente, em um único laço
+    com todos os robôs andando juntos. Cada robô tem a sua cópia do estado
+    dos recursos (e da meta); obstáculos, meta e grade de colisão são
+    compartilhados. A figura é montada uma vez só: a cada passo apenas os
+    robôs, a tabela de estatísticas e a transparência dos recursos mudam.
+    Com `headless=True` nada é desenhado (só os resultados em
+    `self.resultados`). O gravador, se houver, acompanha o primeiro robô.
+    """
+    CELULA_GRADE = 4
+
+    def __init__(self, ambiente, robo, individuo, gravador=None, headless=False,
+                 intervalo=0.05):
         self.ambiente = ambiente
+        self.individuos = list(individuo) if isinstance(individuo, (list, tuple)) else [individuo]
+        self.individuo = self.individuos[0]
+        self.robos = [robo] + [Robo(robo.x, robo.y, robo.raio) for _ in self.individuos[1:]]
         self.robo = robo
-        self.individuo = individuo
-        self.frames = []
-
-        plt.style.use('default')
-        plt.ion()
-        self.fig, self.ax = plt.subplots(figsize=(12, 8))
-        self.ax.set_xlim(0, ambiente.largura)
-        self.ax.set_ylim(0, ambiente.altura)
-        self.ax.set_title("Simulador de Robô com Programação Genética", fontsize=14)
-        self.ax.set_xlabel("X", fontsize=12)
-        self.ax.set_ylabel("Y", fontsize=12)
-        self.ax.grid(True, linestyle='--', alpha=0.7)
-    
-    def simular(self):
-        self.ambiente.reset()
-        # Encontrar uma posição segura para o robô
-        x_inicial, y_inicial = self.ambiente.posicao_segura(self.robo.raio)
-        self.robo.reset(x_inicial, y_inicial)
+        self.gravador = gravador
+        self.headless = headless
+        self.intervalo = intervalo  # pausa entre quadros (s)
         self.frames = []
-
-        # Configurações iniciais da figura
-        self.ax.clear()
+        self.resultados = []
+        self.cores = ['#9999FF'] if len(self.individuos) == 1 else \
+            [plt.cm.tab10(i % 10) for i in range(len(self.individuos))]
+
+        if not headless:
+            plt.style.use('default')
+            plt.ion()
+            n = len(self.individuos)
+            self.fig, (self.ax, self.ax_tabela) = plt.subplots(
+                2, 1, figsize=(12, 8 + 0.3 * n),
+                gridspec_kw={'height_ratios': [8, 0.6 + 0.3 * n]})
+            self.configurar_eixos()
+
+    def configurar_eixos(self):
         self.ax.set_xlim(0, self.ambiente.largura)
         self.ax.set_ylim(0, self.ambiente.altura)
         self.ax.set_title("Simulador de Robô com Programação Genética", fontsize=14)
         self.ax.set_xlabel("X", fontsize=12)
         self.ax.set_ylabel("Y", fontsize=12)
         self.ax.grid(True, linestyle='--', alpha=0.7)
+        self.ax_tabela.axis('off')
+
+    def copia_ambiente(self, grade):
+        """Mesmo layout do ambiente, com recursos, índice e meta próprios."""
+        vista = copy.copy(self.ambiente)
+        vista.recursos = [dict(recurso) for recurso in self.ambiente.recursos]
+        vista.indice_recursos = vista.construir_indice()
+        vista.usar_grade_colisao(self.robo.raio, self.CELULA_GRADE, grade)
+        vista.reset()
+        return vista
+
+    def comandos(self, individuo, sensores):
+        if sensores['recursos_restantes'] == 0:
+            # força retorno à meta
+            aceleracao = sensores['direcao_meta_x']
+            rotacao    = sensores['angulo_meta']
+        else:
+            # uso normal da árvore genética
+            resultado = individuo.avaliar(sensores, 'aceleracao')
+            if isinstance(resultado, tuple):
+                aceleracao, rotacao = resultado
+            else:
+                aceleracao = resultado
+                rotacao    = individuo.avaliar(sensores, 'rotacao')
 
-        # Desenhar estáticos
+        # Normalização dos comandos
+        return max(-1, min(1, aceleracao)), max(-0.5, min(0.5, rotacao))
+
+    def desenhar_estaticos(self):
+        """Cria uma vez todos os artistas; depois só são atualizados."""
+        self.ax.clear()
+        self.configurar_eixos()
         for obst in self.ambiente.obstaculos:
             self.ax.add_patch(patches.Rectangle(
                 (obst['x'], obst['y']),
                 obst['largura'], obst['altura'],
                 linewidth=1, edgecolor='black', facecolor='#FF9999', alpha=0.7
             ))
-        for rec in self.ambiente.recursos:
-            if not rec['coletado']:
-                self.ax.add_patch(patches.Circle(
-                    (rec['x'], rec['y']), 10,
-                    linewidth=1, edgecolor='black', facecolor='#99FF99', alpha=0.8
-                ))
         self.ax.add_patch(patches.Circle(
             (self.ambiente.meta['x'], self.ambiente.meta['y']),
             self.ambiente.meta['raio'],
             linewidth=2, edgecolor='black', facecolor='#FFFF00', alpha=0.8
         ))
 
-        # Patch inicial do robô e texto de info
-        robo_circ = patches.Circle(
-            (self.robo.x, self.robo.y), self.robo.raio,
-            linewidth=1, edgecolor='black', facecolor='#9999FF', alpha=0.8
-        )
-        self.ax.add_patch(robo_circ)
-        info_text = self.ax.text(
-            10, self.ambiente.altura - 50, "",
-            fontsize=12,
-            bbox=dict(facecolor='white', alpha=0.8, edgecolor='gray', boxstyle='round,pad=0.5')
-        )
+        # Recursos: mais transparentes conforme mais robôs já os coletaram
+        self.cores_recursos = np.tile(matplotlib.colors.to_rgba('#99FF99', 0.8),
+                                      (len(self.ambiente.recursos), 1))
+        self.recursos_artista = PatchCollection(
+            [patches.Circle((rec['x'], rec['y']), 10) for rec in self.ambiente.recursos],
+            facecolors=self.cores_recursos, edgecolors='black', linewidths=1)
+        self.ax.add_collection(self.recursos_artista)
+
+        self.robos_artistas = []
+        for robo, cor in zip(self.robos, self.cores):
+            circulo = patches.Circle((robo.x, robo.y), robo.raio, linewidth=1,
+                                     edgecolor='black', facecolor=cor, alpha=0.8)
+            self.ax.add_patch(circulo)
+            direcao, = self.ax.plot([], [], '-', color='red' if len(self.robos) == 1 else cor,
+                                    linewidth=2)
+            self.robos_artistas.append((circulo, direcao))
+
+        self.tempo_texto = self.ax.text(
+            10, self.ambiente.altura - 30, "", fontsize=12,
+            bbox=dict(facecolor='white', alpha=0.8, edgecolor='gray', boxstyle='round,pad=0.5'))
+
+        colunas = ["Robô", "Recursos", "Energia", "Colisões", "Distância", "Meta", "Situação"]
+        self.tabela = self.ax_tabela.table(
+            cellText=[[str(i + 1)] + [""] * (len(colunas) - 1) for i in range(len(self.robos))],
+            colLabels=colunas, loc='center', cellLoc='center')
+        for i, cor in enumerate(self.cores):
+            self.tabela[(i + 1, 0)].set_facecolor(cor)
+
+    def atualizar_artistas(self, vistas, ativos, recursos_mudaram):
+        for robo, (circulo, direcao), ativo in zip(self.robos, self.robos_artistas, ativos):
+            circulo.center = (robo.x, robo.y)
+            circulo.set_alpha(0.8 if ativo else 0.3)
+            direcao.set_data([robo.x, robo.x + robo.raio * np.cos(robo.angulo)],
+                             [robo.y, robo.y + robo.raio * np.sin(robo.angulo)])
+
+        if recursos_mudaram:
+            restantes = np.zeros(len(self.ambiente.recursos))
+            for vista in vistas:
+                restantes += [not rec['coletado'] for rec in vista.recursos]
+            self.cores_recursos[:, 3] = 0.05 + 0.75 * restantes / len(vistas)
+            self.recursos_artista.set_facecolors(self.cores_recursos)
+
+        self.tempo_texto.set_text(f"Tempo: {max(vista.tempo for vista in vistas)}")
+        for i, (robo, ativo) in enumerate(zip(self.robos, ativos), 1):
+            for j, valor in enumerate((robo.recursos_coletados, f"{robo.energia:.1f}",
+                                       robo.colisoes, f"{robo.distancia_percorrida:.1f}",
+                                       'Sim' if robo.meta_atingida else 'Não',
+                                       'ativo' if ativo else 'fim'), 1):
+                self.tabela[(i, j)].get_text().set_text(str(valor))
 
-        plt.draw()
-        plt.pause(0.01)
+    def simular(self):
+        # Encontrar uma posição segura, a mesma para todos os robôs
+        x_inicial, y_inicial = self.ambiente.posicao_segura(self.robo.raio)
+        for robo in self.robos:
+            robo.reset(x_inicial, y_inicial)
+        grade = self.ambiente.calcular_grade_colisao(self.robo.raio, self.CELULA_GRADE)
+        vistas = [self.copia_ambiente(grade) for _ in self.robos]
+        ativos = [True] * len(self.robos)
+        self.frames = []
 
-        try:
-            while True:
-                # === SENSORING e CONTROLE ===
-                sensores = self.robo.get_sensores(self.ambiente)
+        if not self.headless:
+            self.desenhar_estaticos()
+            self.atualizar_artistas(vistas, ativos, False)
+            plt.draw()
+            plt.pause(0.01)
 
-                if sensores['recursos_restantes'] == 0:
-                    # força retorno à meta
-                    aceleracao = sensores['direcao_meta_x']
-                    rotacao    = sensores['angulo_meta']
-                else:
-                    # uso normal da árvore genética
-                    resultado = self.individuo.avaliar(sensores, 'aceleracao')
-                    if isinstance(resultado, tuple):
-                        aceleracao, rotacao = resultado
-                    else:
-                        aceleracao = resultado
-                        rotacao    = self.individuo.avaliar(sensores, 'rotacao')
-
-                # Normalização dos comandos
-                aceleracao = max(-1, min(1, aceleracao))
-                rotacao    = max(-0.5, min(0.5, rotacao))
-
-                # Mover robô e verificar fim por energia
-                sem_energia = self.robo.mover(aceleracao, rotacao, self.ambiente)
-
-                # === ATUALIZA VISUALIZAÇÃO ===
-                self.ax.clear()
-                self.ax.set_xlim(0, self.ambiente.largura)
-                self.ax.set_ylim(0, self.ambiente.altura)
-                self.ax.set_title("Simulador de Robô com Programação Genética", fontsize=14)
-                self.ax.set_xlabel("X", fontsize=12)
-                self.ax.set_ylabel("Y", fontsize=12)
-                self.ax.grid(True, linestyle='--', alpha=0.7)
-
-                # Desenhar estáticos novamente
-                for obst in self.ambiente.obstaculos:
-                    self.ax.add_patch(patches.Rectangle(
-                        (obst['x'], obst['y']),
-                        obst['largura'], obst['altura'],
-                        linewidth=1, edgecolor='black', facecolor='#FF9999', alpha=0.7
-                    ))
-                for rec in self.ambiente.recursos:
-                    if not rec['coletado']:
-                        self.ax.add_patch(patches.Circle(
-                            (rec['x'], rec['y']), 10,
-                            linewidth=1, edgecolor='black', facecolor='#99FF99', alpha=0.8
-                        ))
-                self.ax.add_patch(patches.Circle(
-                    (self.ambiente.meta['x'], self.ambiente.meta['y']),
-                    self.ambiente.meta['raio'],
-                    linewidth=2, edgecolor='black', facecolor='#FFFF00', alpha=0.8
-                ))
-
-                # Desenhar robô e direção
-                robo_circ = patches.Circle(
-                    (self.robo.x, self.robo.y), self.robo.raio,
-                    linewidth=1, edgecolor='black', facecolor='#9999FF', alpha=0.8
-                )
-                self.ax.add_patch(robo_circ)
-                direcao_x = self.robo.x + self.robo.raio * np.cos(self.robo.angulo)
-                direcao_y = self.robo.y + self.robo.raio * np.sin(self.robo.angulo)
-                self.ax.plot([self.robo.x, direcao_x], [self.robo.y, direcao_y], 'r-', linewidth=2)
-
-                # Atualizar texto de info
-                info_text = self.ax.text(
-                    10, self.ambiente.altura - 50,
-                    f"Tempo: {self.ambiente.tempo}\n"
-                    f"Recursos: {self.robo.recursos_coletados}\n"
-                    f"Energia: {self.robo.energia:.1f}\n"
-                    f"Colisões: {self.robo.colisoes}\n"
-                    f"Distância: {self.robo.distancia_percorrida:.1f}\n"
-                    f"Meta atingida: {'Sim' if self.robo.meta_atingida else 'Não'}",
-                    fontsize=12,
-                    bbox=dict(facecolor='white', alpha=0.8, edgecolor='gray', boxstyle='round,pad=0.5')
-                )
-
-                plt.draw()
-                plt.pause(0.05)
-
-                # Verificar fim da simulação:
-                # - sem energia
-                # - tempo esgotado
-                # - recursos zerados e meta atingida
-                if sem_energia or self.ambiente.passo() or (
-                    sensores['recursos_restantes'] == 0 and self.robo.meta_atingida):
-                    break
+        if self.gravador is not None:
+            self.gravador.iniciar_episodio()
 
-            plt.ioff()
-            plt.show()
+        try:
+            while any(ativos):
+                # Todos os robôs ativos dão um passo, cada um na sua cópia
+                recursos_mudaram = False
+                for k, (individuo, robo, vista) in enumerate(zip(self.individuos, self.robos, vistas)):
+                    if not ativos[k]:
+                        continue
+                    sensores = robo.get_sensores(vista)
+                    aceleracao, rotacao = self.comandos(individuo, sensores)
+
+                    # Mover robô e verificar fim por energia
+                    colisoes_antes = robo.colisoes
+                    coletados_antes = robo.recursos_coletados
+                    sem_energia = robo.mover(aceleracao, rotacao, vista)
+                    recursos_mudaram |= robo.recursos_coletados > coletados_antes
+                    if k == 0 and self.gravador is not None:
+                        self.gravador.registrar(robo, aceleracao, rotacao,
+                                                robo.colisoes > colisoes_antes)
+
+                    # Verificar fim da simulação do robô:
+                    # - sem energia
+                    # - tempo esgotado
+                    # - recursos zerados e meta atingida
+                    if sem_energia or vista.passo() or (
+                        sensores['recursos_restantes'] == 0 and robo.meta_atingida):
+                        ativos[k] = False
+
+                # === ATUALIZA VISUALIZAÇÃO (um quadro para todos) ===
+                if not self.headless:
+                    self.atualizar_artistas(vistas, ativos, recursos_mudaram)
+                    plt.draw()
+                    plt.pause(self.intervalo)
+
+            if self.gravador is not None:
+                self.gravador.finalizar_episodio(origem='simulador',
+                                                 meta_atingida=self.robo.meta_atingida)
+            if not self.headless:
+                plt.ioff()
+                plt.show()
 
         except KeyboardInterrupt:
-            plt.close('all')
-
+            if getattr(self.gravador, 'arquivo', None) is not None:
+                self.gravador.finalizar_episodio(origem='simulador', interrompido=True)
+            if not self.headless:
+                plt.close('all')
+
+        self.resultados = [{'passos':             vista.tempo,
+                            'recursos_coletados': robo.recursos_coletados,
+                            'energia':            robo.energia,
+                            'colisoes':           robo.colisoes,
+                            'distancia':          robo.distancia_percorrida,
+                            'meta_atingida':      robo.meta_atingida}
+                           for robo, vista in zip(self.robos, vistas)]
         return self.frames
 
     def animar(self):
+        if self.headless:
+            raise ValueError("animar exige um Simulador criado com headless=False")
         # Desativar o modo interativo antes de criar a animação
         plt.ioff()
         
@@ -549,18 +1019,25 @@ class IndividuoPG:
         self.arvore_aceleracao = self.criar_arvore_aleatoria()
         self.arvore_rotacao    = self.criar_arvore_aleatoria()
         self.fitness           = 0
+        self.assinatura        = None  # impressão digital semântica (cache)
+        self.estimado          = False # fitness previsto pelo substituto
+        self.passos            = None  # passos simulados na última avaliação
+        self.passos_pais       = None  # média dos pais, prevê o custo do filho
     
     def criar_arvore_aleatoria(self):
+        """Árvore com profundidade_no de no máximo self.profundidade (folha = 0)."""
         if self.profundidade == 0:
             return self.criar_folha()
 
-        operador = random.choice([
+        operadores = [
             '+', '-', '*', '/',
             'max', 'min', 'abs',
             'if_positivo', 'if_negativo',
             'and', 'or', 'not',
             'if_then_else','goto_meta'
-        ])
+        ]
+        # goto_meta fica dois níveis abaixo da raiz (ver abaixo)
+        operador = random.choice(operadores if self.profundidade >= 2 else operadores[:-1])
 
         # Para binários simples e max/min
         if operador in ['+', '-', '*', '/', 'max', 'min', 'and', 'or']:
@@ -613,8 +1090,8 @@ class IndividuoPG:
             goto_sub   = {
                 'tipo': 'operador',
                 'operador': 'goto_meta',
-                'esquerda': IndividuoPG(self.profundidade-1).criar_arvore_aleatoria(),
-                'direita':  IndividuoPG(self.profundidade-1).criar_arvore_aleatoria()
+                'esquerda': IndividuoPG(self.profundidade-2).criar_arvore_aleatoria(),
+                'direita':  IndividuoPG(self.profundidade-2).criar_arvore_aleatoria()
             }
             return {
                 'tipo': 'operador',
@@ -650,7 +1127,63 @@ class IndividuoPG:
         # escolhe qual árvore usar
         arvore = self.arvore_aceleracao if tipo == 'aceleracao' else self.arvore_rotacao
         return self.avaliar_no(arvore, sensores)
-    
+
+    def comandos(self, sensores):
+        """Devolve (aceleracao, rotacao) já limitados, como usados no treino."""
+        resultado = self.avaliar(sensores, 'aceleracao')
+        if isinstance(resultado, tuple):
+            a, r = resultado
+        else:
+            a = resultado
+            # substitui o desempacotamento direto por um check de tupla
+            resultado_r = self.avaliar(sensores, 'rotacao')
+            if isinstance(resultado_r, tuple):
+                _, r = resultado_r
+            else:
+                r = resultado_r
+
+        # Clamp
+        a = max(-1, min(1, a))
+        r = max(-0.5, min(0.5, r))
+        return a, r
+
+    def assinatura_semantica(self, banco_sondas, passo=1e-3):
+        """
+        Hash das saídas (aceleracao, rotacao) já limitadas sobre um banco fixo
+        de sensores, quantizadas em `passo`. Árvores com a mesma assinatura
+        comandam o robô da mesma forma em todas as sondas.
+        """
+        if self.assinatura is None:
+            saidas = np.array([self.comandos(s) for s in banco_sondas], dtype=float)
+            saidas = np.nan_to_num(saidas, nan=0.0)
+            quantizado = np.round(saidas / passo).astype(np.int32)
+            self.assinatura = hashlib.blake2b(quantizado.tobytes(), digest_size=16).hexdigest()
+        return self.assinatura
+
+    def filhos_no(self, no):
+        """Subárvores avaliáveis de um nó (then/else no caso do if_then_else)."""
+        if not (isinstance(no, dict) and no.get('tipo') == 'operador'):
+            return []
+        if no.get('operador') == 'if_then_else' and isinstance(no.get('direita'), dict) \
+                and 'tipo' not in no['direita']:
+            filhos = [no.get('esquerda'), no['direita'].get('then'), no['direita'].get('else')]
+        else:
+            filhos = [no.get('esquerda'), no.get('direita')]
+        return [f for f in filhos if isinstance(f, dict) and 'tipo' in f]
+
+    def contar_nos(self, no):
+        return 1 + sum(self.contar_nos(f) for f in self.filhos_no(no)) if no else 0
+
+    def altura_no(self, no):
+        return 1 + max((self.altura_no(f) for f in self.filhos_no(no)), default=0) if no else 0
+
+    def profundidade_no(self, no):
+        """Profundidade na unidade de `profundidade` do construtor: uma folha tem 0."""
+        return self.altura_no(no) - 1
+
+    def tamanho(self):
+        return self.contar_nos(self.arvore_aceleracao) + self.contar_nos(self.arvore_rotacao)
+
     def avaliar_no(self, no, sensores):
         # caso base
         if no is None or not isinstance(no, dict) or 'tipo' not in no:
@@ -746,6 +1279,7 @@ class IndividuoPG:
    
     def mutacao(self, probabilidade=0.1):
         # PROBABILIDADE DE MUTAÇÃO PARA O ALUNO MODIFICAR
+        self.assinatura = None
         self.mutacao_no(self.arvore_aceleracao, probabilidade)
         self.mutacao_no(self.arvore_rotacao, probabilidade)
     
@@ -774,6 +1308,7 @@ class IndividuoPG:
                     '+', '-', '*', '/', 'max', 'min',
                     'abs', 'if_positivo', 'if_negativo'
                 ])
+                self.descartar_orfao(no)
 
         # 2) recursão apenas se for operador
         if no.get('tipo') == 'operador':
@@ -789,6 +1324,31 @@ class IndividuoPG:
                 if no.get('direita') is not None:
                     self.mutacao_no(no.get('direita'), probabilidade)
     
+    def descartar_orfao(self, no):
+        """
+        Remove o filho direito que o operador do nó não avalia mais (e.g.
+        binário que virou abs, ou if_then_else que virou binário e ficou com
+        os ramos then/else). avaliar_no já ignorava esses filhos (ou os lia
+        como 0), então o comportamento não muda; eles só deixam de ser
+        copiados e salvos.
+        """
+        direita = no.get('direita')
+        if no['operador'] in ('abs', 'not'):
+            no['direita'] = None
+        elif no['operador'] != 'if_then_else' and isinstance(direita, dict) \
+                and 'tipo' not in direita:
+            no['direita'] = None
+
+    def limpar_orfaos(self):
+        """Aplica descartar_orfao na árvore toda (e.g. árvores antigas ou do crossover)."""
+        pilha = [self.arvore_aceleracao, self.arvore_rotacao]
+        while pilha:
+            no = pilha.pop()
+            if isinstance(no, dict) and no.get('tipo') == 'operador':
+                self.descartar_orfao(no)
+                pilha.extend(self.filhos_no(no))
+        return self
+
     def crossover(self, outro):
         filho = IndividuoPG(self.profundidade)
         # faz subtree crossover em aceleração e rotação
@@ -864,117 +1424,1583 @@ class IndividuoPG:
             individuo.arvore_rotacao = dados['arvore_rotacao']
             return individuo
 
+    @classmethod
+    def de_arvores(cls, arvore_aceleracao, arvore_rotacao, profundidade=3):
+        # profundidade 0 só sorteia folhas, que são logo substituídas
+        individuo = cls(0)
+        individuo.profundidade = profundidade
+        individuo.arvore_aceleracao = arvore_aceleracao
+        individuo.arvore_rotacao = arvore_rotacao
+        return individuo
+
+@functools.lru_cache(maxsize=8)
+def cenario_por_semente(semente):
+    return Ambiente.gerar_cenario(semente)
+
+def avaliar_em_processo(arvores, avaliador, semente_cenario, semente_episodios):
+    """
+    Avalia um indivíduo (par de árvores) em um processo de trabalho. O cenário
+    é regenerado a partir da semente e guardado em cache no processo.
+    """
+    ambiente = cenario_por_semente(semente_cenario)
+    robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+    individuo = IndividuoPG.de_arvores(*arvores)
+    return avaliador.avaliar(individuo, ambiente, robo, semente_episodios)
+
+def avaliar_em_processo_conferido(arvores, configuracao, semente_cenario, semente_episodios,
+                                  conformidade=None):
+    """
+    avaliar_em_processo com o avaliador montado aqui (AvaliadorFitness.para_processo)
+    + o que ele conferiu (conformidade_parcial; None sem conformidade).
+    """
+    avaliador = AvaliadorFitness.para_processo(configuracao, conformidade)
+    fitness, passos = avaliar_em_processo(arvores, avaliador, semente_cenario, semente_episodios)
+    return fitness, passos, avaliador.conformidade_parcial(conformidade)
+
+class BancoCenarios:
+    """
+    Layouts de cenários (obstáculos, recursos, meta e grade de colisão)
+    empacotados em um único bloco de memória compartilhada, para que os
+    processos de avaliação anexem por id sem cópia nem pickle dos dicts do
+    Ambiente.
+
+    `carregar` regrava o mesmo bloco com outros cenários (só aloca um novo
+    se eles não couberem) e incrementa a versão no descritor, que os
+    processos usam para descartar os ambientes montados da versão anterior.
+    O bloco é liberado por `fechar()`, ao sair do `with`, quando o objeto é
+    coletado ou na saída do interpretador. Se o processo morrer sem rodar
+    nada disso, o resource_tracker do multiprocessing remove o segmento.
+    """
+    def __init__(self, ambientes, raio_robo=15, celula_grade=4):
+        self.raio_robo = raio_robo
+        self.celula_grade = celula_grade
+        self.shm = None
+        self.finalizador = None
+        self.versao = 0
+        self.carregar(ambientes)
+
+    def carregar(self, ambientes):
+        arrays = []
+        for ambiente in ambientes:
+            arrays.append({
+                'obstaculos': np.array([[o['x'], o['y'], o['largura'], o['altura']]
+                                        for o in ambiente.obstaculos], dtype=np.float64).reshape(-1, 4),
+                'recursos':   np.array([[r['x'], r['y']] for r in ambiente.recursos],
+                                       dtype=np.float64).reshape(-1, 2),
+                'meta':       np.array([ambiente.meta['x'], ambiente.meta['y'],
+                                        ambiente.meta['raio']], dtype=np.float64),
+                'grade':      ambiente.calcular_grade_colisao(self.raio_robo, self.celula_grade),
+            })
+
+        # offsets alinhados em 8 bytes dentro do bloco
+        cenarios = []
+        tamanho = 0
+        for ambiente, campos in zip(ambientes, arrays):
+            descricao = {}
+            for nome, arr in campos.items():
+                descricao[nome] = (tamanho, arr.shape, arr.dtype.str)
+                tamanho += (arr.nbytes + 7) // 8 * 8
+            cenarios.append({'largura': ambiente.largura, 'altura': ambiente.altura,
+                             'max_tempo': ambiente.max_tempo, 'campos': descricao})
+
+        if self.shm is None or tamanho > self.shm.size:
+            if self.finalizador is not None:
+                self.finalizador()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(8, tamanho))
+            self.finalizador = weakref.finalize(self, BancoCenarios.liberar, self.shm)
+        for campos, cenario in zip(arrays, cenarios):
+            for nome, arr in campos.items():
+                offset, forma, tipo = cenario['campos'][nome]
+                np.ndarray(forma, dtype=tipo, buffer=self.shm.buf, offset=offset)[...] = arr
+        self.versao += 1
+        self.descritor = {'nome': self.shm.name, 'versao': self.versao,
+                          'raio_robo': self.raio_robo, 'celula_grade': self.celula_grade,
+                          'cenarios': cenarios}
+
+    @staticmethod
+    def liberar(shm):
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def fechar(self):
+        self.finalizador()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def __len__(self):
+        return len(self.descritor['cenarios'])
+
+# Nos processos de avaliação: blocos anexados e ambientes já montados
+BANCOS_ANEXADOS = OrderedDict()
+MAX_BANCOS_ANEXADOS = 4
+
+def ambiente_do_banco(descritor, id_cenario):
+    """Ambiente do cenário `id_cenario`, com a grade de colisão apontando para o bloco."""
+    nome = descritor['nome']
+    if nome not in BANCOS_ANEXADOS:
+        while len(BANCOS_ANEXADOS) >= MAX_BANCOS_ANEXADOS:
+            antigo, ambientes = BANCOS_ANEXADOS.popitem(last=False)[1]
+            del ambientes  # solta as views antes de fechar o bloco
+            try:
+                antigo.close()
+            except BufferError:
+                pass  # ainda há views vivas; o mapeamento sai com o coletor
+        BANCOS_ANEXADOS[nome] = (shared_memory.SharedMemory(name=nome), {})
+    shm, ambientes = BANCOS_ANEXADOS[nome]
+    if ambientes.get('versao') != descritor['versao']:
+        # bloco regravado com outros cenários: os ambientes montados expiram
+        ambientes.clear()
+        ambientes['versao'] = descritor['versao']
+    if id_cenario not in ambientes:
+        cenario = descritor['cenarios'][id_cenario]
+        campos = {n: np.ndarray(forma, dtype=tipo, buffer=shm.buf, offset=offset)
+                  for n, (offset, forma, tipo) in cenario['campos'].items()}
+        ambiente = Ambiente.de_layout(
+            cenario['largura'], cenario['altura'],
+            [{'x': int(x), 'y': int(y), 'largura': int(l), 'altura': int(a)}
+             for x, y, l, a in campos['obstaculos']],
+            [{'x': int(x), 'y': int(y), 'coletado': False} for x, y in campos['recursos']],
+            {'x': int(campos['meta'][0]), 'y': int(campos['meta'][1]), 'raio': int(campos['meta'][2])},
+            cenario['max_tempo'])
+        ambiente.usar_grade_colisao(descritor['raio_robo'], descritor['celula_grade'],
+                                    campos['grade'])
+        ambientes[id_cenario] = ambiente
+    return ambientes[id_cenario]
+
+def avaliar_no_banco(arvores, avaliador, descritor, id_cenario, semente_episodios):
+    """Como avaliar_em_processo, mas com o cenário lido do BancoCenarios."""
+    ambiente = ambiente_do_banco(descritor, id_cenario)
+    robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+    individuo = IndividuoPG.de_arvores(*arvores)
+    return avaliador.avaliar(individuo, ambiente, robo, semente_episodios)
+
+def avaliar_no_banco_cronometrado(arvores, configuracao, descritor, id_cenario, semente_episodios,
+                                  conformidade=None):
+    """
+    avaliar_no_banco com o avaliador montado aqui (AvaliadorFitness.para_processo)
+    + processo e instantes (monotônicos) de início e fim da tarefa e o que
+    o avaliador conferiu (conformidade_parcial; None sem conformidade).
+    """
+    inicio = time.monotonic()
+    avaliador = AvaliadorFitness.para_processo(configuracao, conformidade)
+    fitness, passos = avaliar_no_banco(arvores, avaliador, descritor, id_cenario, semente_episodios)
+    return (fitness, passos, os.getpid(), inicio, time.monotonic(),
+            avaliador.conformidade_parcial(conformidade))
+
+def gerar_banco_sondas(n_sondas=256, semente=1234):
+    """
+    Banco fixo de vetores de sensores usado nas impressões digitais
+    semânticas. Cobre as faixas que os sensores assumem no treino, incluindo
+    os casos de borda (sem recursos restantes, meta atingida, robô parado).
+    """
+    rng = random.Random(semente)
+    banco = []
+    for i in range(n_sondas):
+        restantes = rng.choice([0, 1, 2, 3, 4, 5])
+        ang_meta = rng.uniform(-math.pi, math.pi)
+        dir_meta = rng.uniform(-math.pi, math.pi)
+        dir_rec  = rng.uniform(-math.pi, math.pi)
+        banco.append({
+            'dist_recurso':        rng.uniform(0, 1000) if restantes else float('inf'),
+            'dist_obstaculo':      rng.uniform(0, 700),
+            'dist_meta':           rng.uniform(0, 1000),
+            'angulo_recurso':      rng.uniform(-math.pi, math.pi) if restantes else 0.0,
+            'angulo_meta':         ang_meta,
+            'energia':             rng.uniform(0, 100),
+            'velocidade':          rng.uniform(0.1, 5),
+            'meta_atingida':       float(rng.random() < 0.2),
+            'tempo_parado':        rng.choice([0, rng.randint(1, 1000)]),
+            'recursos_restantes':  restantes,
+            'direcao_meta_x':      math.cos(dir_meta),
+            'direcao_meta_y':      math.sin(dir_meta),
+            'direcao_recursos_x':  math.cos(dir_rec) if restantes else 0.0,
+            'direcao_recursos_y':  math.sin(dir_rec) if restantes else 0.0,
+            'recursos_cone_frontal': rng.choice([0.0, 0.2, 0.4]),
+            'passos_desde_coleta': rng.uniform(0, 1),
+        })
+    return banco
+
+# Regras de parada antecipada dos episódios de treino
+PARADA_ANTECIPADA_PADRAO = {
+    'ativa':            True,
+    'meta_e_recursos':  True,   # meta atingida e todos os recursos coletados
+    'max_tempo_parado': 30,     # passos seguidos sem sair do lugar
+    'janela_loop':      150,    # passos da janela de detecção de loop
+    'deslocamento_min': 40.0,   # deslocamento líquido mínimo na janela (px)
+}
+
+class AvaliadorFitness:
+    """
+    Executa os episódios de treino de um indivíduo e calcula o fitness
+    com reward shaping, encerrando cedo episódios que já não mudam o ranking.
+    """
+    def __init__(self, n_episodios: int = 5, parada_antecipada: dict = None,
+                 gravador=None, horizonte: int = None,
+                 conformidade: float = 0.0, limite_conformidade: float = 0.05):
+        self.n_episodios = n_episodios
+        self.gravador    = gravador   # GravadorTrajetoria opcional
+        self.horizonte   = horizonte  # passos máximos por episódio (None = max_tempo)
+
+        # Modo sombra: a fração `conformidade` dos episódios é refeita pelo
+        # caminho de referência e comparada passo a passo, enquanto o custo
+        # extra não passar de `limite_conformidade` do tempo de simulação
+        self.conformidade        = conformidade
+        self.limite_conformidade = limite_conformidade
+        self.tolerancias = {'comando': 1e-9, 'posicao': 1e-6, 'fitness': 1e-6}
+        self.divergencias         = []  # relatórios (no máximo MAX_DIVERGENCIAS)
+        self.episodios_conferidos = 0
+        self.tempo_episodios      = 0.0
+        self.tempo_conformidade   = 0.0
+        self.rng_conformidade     = random.Random(0)  # não mexe no `random` global
+
+        # Parâmetros de reward shaping
+        self.peso_recursos    = 200.0
+        self.peso_tempo       = -1.0
+        self.peso_proximidade = 10.0
+        self.penalidade_loop  = 50.0
+        self.limiar_loop      = 50.0  # distância em pixels
+        self.bonus_meta       = 500.0
+
+        self.parada_antecipada = dict(PARADA_ANTECIPADA_PADRAO)
+        if parada_antecipada:
+            self.parada_antecipada.update(parada_antecipada)
+
+    # Atributos que definem a avaliação e podem ser enviados a outro processo
+    PARAMETROS = ('n_episodios', 'peso_recursos', 'peso_tempo', 'peso_proximidade',
+                  'penalidade_loop', 'limiar_loop', 'bonus_meta', 'parada_antecipada',
+                  'horizonte')
+
+    def configuracao(self):
+        return {nome: getattr(self, nome) for nome in self.PARAMETROS}
+
+    @classmethod
+    def de_configuracao(cls, configuracao):
+        avaliador = cls()
+        for nome, valor in configuracao.items():
+            if nome not in cls.PARAMETROS:
+                raise ValueError(f"Parâmetro de avaliação desconhecido: {nome}")
+            setattr(avaliador, nome, valor)
+        return avaliador
+
+    def avaliar(self, individuo, ambiente, robo, semente=None):
+        """
+        Fitness médio e passos simulados sobre os n episódios. Com `semente`,
+        o episódio k usa random.seed(semente + k) e o resultado passa a
+        depender só do comportamento do indivíduo; o estado global do
+        `random` é restaurado ao final para não afetar a evolução.
+        """
+        estado = random.getstate() if semente is not None else None
+        total_fitness = 0.0
+        total_passos  = 0
+        for k in range(self.n_episodios):
+            if semente is not None:
+                random.seed(semente + k)
+            semente_episodio = None if semente is None else semente + k
+            if not self.conformidade:
+                resultado = self.simular_episodio(individuo, ambiente, robo, semente_episodio)
+            elif (self.rng_conformidade.random() < self.conformidade
+                  and self.tempo_conformidade <= self.limite_conformidade * self.tempo_episodios):
+                resultado = self.conferir_episodio(individuo, ambiente, robo, semente_episodio)
+            else:
+                inicio = time.perf_counter()
+                resultado = self.simular_episodio(individuo, ambiente, robo, semente_episodio)
+                self.tempo_episodios += time.perf_counter() - inicio
+            total_fitness += resultado['fitness']
+            total_passos  += resultado['passos']
+        if estado is not None:
+            random.setstate(estado)
+        return total_fitness / self.n_episodios, total_passos
+
+    def simular_episodio(self, individuo, ambiente, robo, semente=None):
+        """
+        Um episódio de treino. `semente` é a usada em random.seed antes
+        dele; só vai para o índice do gravador, para reproduzir o episódio.
+        """
+        ambiente.reset()
+        robo.reset(ambiente.largura // 2, ambiente.altura // 2)
+        regras = self.parada_antecipada
+
+        fitness = 0.0
+        # Inicializa potencial Φ(s₀)
+        prev_potencial = -ambiente.soma_distancias_recursos(robo.x, robo.y)
+        recursos_antes = 0
+        dist_antes     = 0.0
+
+        # Âncora da janela de detecção de loop
+        ancora_pos      = (robo.x, robo.y)
+        ancora_recursos = 0
+        ancora_dist     = 0.0
+        ancora_passo    = 0
+
+        # Robo.tempo_parado compara com ultima_posicao já sobrescrita no
+        # mesmo passo e cresce sempre, então o travamento é contado aqui
+        passos_sem_mover = 0
+
+        passos = 0
+        motivo = 'tempo'
+        gravador = self.gravador
+        if gravador is not None:
+            gravador.iniciar_episodio()
+
+        # Loop da simulação
+        while True:
+            sensores = robo.get_sensores(ambiente)
+            a, r = individuo.comandos(sensores)
+
+            energia_antes = robo.energia
+            pos_antes = (robo.x, robo.y)
+            colisoes_antes = robo.colisoes
+            sem_energia = robo.mover(a, r, ambiente)
+            passos += 1
+            if gravador is not None:
+                gravador.registrar(robo, a, r, robo.colisoes > colisoes_antes)
+            if math.hypot(robo.x - pos_antes[0], robo.y - pos_antes[1]) < 0.1:
+                passos_sem_mover += 1
+            else:
+                passos_sem_mover = 0
+
+            # 1) Recompensa imediata por coleta
+            delta_recursos = robo.recursos_coletados - recursos_antes
+            if delta_recursos > 0:
+                fitness += delta_recursos * self.peso_recursos
+            recursos_antes = robo.recursos_coletados
+
+            # 2) Reward de aproximação (potencial Φ)
+            curr_potencial = -ambiente.soma_distancias_recursos(robo.x, robo.y)
+            fitness += (curr_potencial - prev_potencial) * self.peso_proximidade
+            prev_potencial = curr_potencial
+
+            # 3) Penalidade de looping sem coleta significativa
+            dist_percorrida = robo.distancia_percorrida - dist_antes
+            if delta_recursos == 0 and dist_percorrida > self.limiar_loop:
+                fitness -= self.penalidade_loop
+                dist_antes = robo.distancia_percorrida
+
+            # 4) Penalidade de tempo (passo a passo)
+            fitness += self.peso_tempo
+
+            if sem_energia:
+                motivo = 'energia'
+                break
+            if ambiente.passo():
+                motivo = 'tempo'
+                break
+            if self.horizonte is not None and passos >= self.horizonte:
+                motivo = 'horizonte'
+                break
+            if not regras['ativa']:
+                continue
+
+            # 5) Parada antecipada
+            if (regras['meta_e_recursos'] and robo.meta_atingida
+                    and ambiente.recursos and ambiente.recursos_restantes() == 0):
+                # estado terminal, como em Simulador.simular: não há mais
+                # recompensa positiva possível no episódio, mas o robô ainda
+                # pagaria a penalidade de tempo (e de loop) até o fim, então
+                # recebe a mesma cauda que os travados e em loop
+                motivo = 'concluido'
+                dist_por_passo = ((robo.distancia_percorrida - ancora_dist)
+                                  / max(1, passos - ancora_passo))
+                fitness += self.cauda_estimada(robo, ambiente,
+                                               energia_antes - robo.energia,
+                                               dist_por_passo)
+                break
+
+            travado = passos_sem_mover >= regras['max_tempo_parado']
+            em_loop = False
+            if passos - ancora_passo >= regras['janela_loop']:
+                deslocamento = math.hypot(robo.x - ancora_pos[0], robo.y - ancora_pos[1])
+                em_loop = (robo.recursos_coletados == ancora_recursos
+                           and deslocamento < regras['deslocamento_min'])
+                if not em_loop:
+                    ancora_pos      = (robo.x, robo.y)
+                    ancora_recursos = robo.recursos_coletados
+                    ancora_dist     = robo.distancia_percorrida
+                    ancora_passo    = passos
+
+            if travado or em_loop:
+                motivo = 'parado' if travado else 'loop'
+                dist_por_passo = 0.0 if travado else (
+                    (robo.distancia_percorrida - ancora_dist) / max(1, passos - ancora_passo))
+                fitness += self.cauda_estimada(robo, ambiente,
+                                               energia_antes - robo.energia,
+                                               dist_por_passo)
+                break
+
+        # 6) Bônus final por atingir a meta
+        if robo.meta_atingida:
+            fitness += self.bonus_meta
+
+        if gravador is not None:
+            gravador.finalizar_episodio(origem='treino', fitness=float(fitness),
+                                        motivo=motivo, meta_atingida=robo.meta_atingida,
+                                        semente_episodio=semente)
+
+        return {'fitness': fitness, 'passos': passos, 'motivo': motivo}
+
+    MAX_DIVERGENCIAS = 100
+
+    def conferir_episodio(self, individuo, ambiente, robo, semente=None):
+        """
+        Roda o episódio pelo caminho ativo (o resultado é o que vale para o
+        treino) e de novo, a partir do mesmo estado do `random`, pelo caminho
+        de referência: árvores interpretadas direto por IndividuoPG.avaliar_no
+        e um ambiente sem IndiceRecursos nem grade de colisão. Compara
+        comandos e posições a cada passo e o fitness final.
+        """
+        estado_inicial = random.getstate()
+        gravador = self.gravador
+        inicio = time.perf_counter()
+        rapido = RastreadorEpisodio(individuo.comandos, encaminhar=gravador)
+        self.gravador = rapido
+        try:
+            resultado = self.simular_episodio(rapido, ambiente, robo, semente)
+        finally:
+            self.gravador = gravador
+        meio = time.perf_counter()
+        self.tempo_episodios += meio - inicio
+
+        estado_final = random.getstate()
+        random.setstate(estado_inicial)
+        ambiente_ref = copy.copy(ambiente)
+        ambiente_ref.recursos = [dict(recurso) for recurso in ambiente.recursos]
+        ambiente_ref.indice_recursos = None
+        ambiente_ref.grade_colisao = None
+        referencia = RastreadorEpisodio(lambda sensores: comandos_referencia(individuo, sensores))
+        self.gravador = referencia
+        try:
+            resultado_ref = self.simular_episodio(referencia, ambiente_ref, Robo(0, 0, robo.raio))
+        finally:
+            self.gravador = gravador
+        random.setstate(estado_final)
+
+        divergencia = self.comparar_episodios(rapido, referencia, resultado, resultado_ref)
+        if divergencia is not None:
+            chave, texto = HallDaFama.codificar(individuo)
+            divergencia['individuo'] = chave.hex()
+            divergencia['arvores'] = texto.decode()
+            divergencia['semente'] = semente
+            if len(self.divergencias) < self.MAX_DIVERGENCIAS:
+                self.divergencias.append(divergencia)
+            print(f"Conformidade: divergência em '{divergencia['campo']}' no passo "
+                  f"{divergencia['passo']} (indivíduo {divergencia['individuo'][:12]}, "
+                  f"semente {semente})")
+        self.episodios_conferidos += 1
+        self.tempo_conformidade += time.perf_counter() - meio
+        return resultado
+
+    def comparar_episodios(self, rapido, referencia, resultado, resultado_ref):
+        """Primeira divergência (com o estado completo dos dois lados) ou None."""
+        tol = self.tolerancias
+        n = min(len(rapido.estados), len(referencia.estados))
+        campo, passo = None, None
+        for i in range(n):
+            (a1, r1), (a2, r2) = rapido.comandos_passos[i], referencia.comandos_passos[i]
+            if abs(a1 - a2) > tol['comando'] or abs(r1 - r2) > tol['comando']:
+                campo, passo = 'comando', i
+                break
+            e1, e2 = rapido.estados[i], referencia.estados[i]
+            if math.hypot(e1['x'] - e2['x'], e1['y'] - e2['y']) > tol['posicao']:
+                campo, passo = 'posicao', i
+                break
+        else:
+            if len(rapido.estados) != len(referencia.estados):
+                campo, passo = 'duracao', n
+            elif abs(resultado['fitness'] - resultado_ref['fitness']) > \
+                    tol['fitness'] * (1 + abs(resultado_ref['fitness'])):
+                campo, passo = 'fitness', n
+        if campo is None:
+            return None
+
+        def lado(rastro, res):
+            i = min(passo, len(rastro.estados) - 1)
+            return {'sensores': rastro.sensores[i] if i >= 0 else None,
+                    'comandos': rastro.comandos_passos[i] if i >= 0 else None,
+                    'antes':    rastro.estados[i - 1] if i >= 1 else None,
+                    'depois':   rastro.estados[i] if i >= 0 else None,
+                    'fitness':  res['fitness'], 'passos': res['passos'], 'motivo': res['motivo']}
+        return {'campo': campo, 'passo': passo,
+                'rapido': lado(rapido, resultado), 'referencia': lado(referencia, resultado_ref)}
+
+    def conformidade_para_processo(self, semente):
+        """
+        O que um processo de avaliação precisa, além de configuracao(), para
+        conferir episódios como este avaliador: fração, limite, tolerâncias,
+        a `semente` do sorteio (uma por tarefa) e os tempos acumulados, para
+        que o limite de custo valha para o total. None se a conformidade
+        estiver desligada, e aí nada disso vai nem volta.
+        """
+        if not self.conformidade:
+            return None
+        return {'fracao': self.conformidade, 'limite': self.limite_conformidade,
+                'tolerancias': self.tolerancias, 'semente': semente,
+                'tempo_episodios': self.tempo_episodios,
+                'tempo_conformidade': self.tempo_conformidade}
+
+    @classmethod
+    def para_processo(cls, configuracao, conformidade=None):
+        """Avaliador montado no processo a partir de configuracao() e conformidade_para_processo()."""
+        avaliador = cls.de_configuracao(configuracao)
+        if conformidade is not None:
+            avaliador.conformidade        = conformidade['fracao']
+            avaliador.limite_conformidade = conformidade['limite']
+            avaliador.tolerancias         = conformidade['tolerancias']
+            avaliador.tempo_episodios     = conformidade['tempo_episodios']
+            avaliador.tempo_conformidade  = conformidade['tempo_conformidade']
+            avaliador.rng_conformidade    = random.Random(conformidade['semente'])
+        return avaliador
+
+    def conformidade_parcial(self, conformidade):
+        """O que este avaliador (de para_processo) conferiu desde `conformidade`, ou None."""
+        if conformidade is None:
+            return None
+        return (self.episodios_conferidos,
+                self.tempo_episodios - conformidade['tempo_episodios'],
+                self.tempo_conformidade - conformidade['tempo_conformidade'],
+                self.divergencias)
+
+    def incorporar_conformidade(self, parcial):
+        """Soma ao relatório o que um processo conferiu (conformidade_parcial)."""
+        if parcial is None:
+            return
+        conferidos, tempo_episodios, tempo_conformidade, divergencias = parcial
+        self.episodios_conferidos += conferidos
+        self.tempo_episodios      += tempo_episodios
+        self.tempo_conformidade   += tempo_conformidade
+        self.divergencias += divergencias[:max(0, self.MAX_DIVERGENCIAS - len(self.divergencias))]
+
+    def relatorio_conformidade(self):
+        return {'episodios_conferidos': self.episodios_conferidos,
+                'divergencias':         len(self.divergencias),
+                'custo':                self.tempo_conformidade / max(self.tempo_episodios, 1e-9)}
+
+    def cauda_estimada(self, robo, ambiente, consumo, dist_por_passo):
+        """
+        Recompensa que um robô encerrado antes do fim (concluído, travado ou
+        em loop) ainda acumularia se o episódio continuasse: penalidade de
+        tempo até acabar a energia ou o tempo, mais a penalidade de loop pela
+        distância que seguiria percorrendo. O potencial não muda: ou ele não
+        sai do lugar ou já não há recursos.
+        """
+        consumo = max(0.1, consumo)
+        limite = ambiente.max_tempo
+        if self.horizonte is not None:
+            limite = min(limite, self.horizonte)
+        passos_restantes = min(limite - ambiente.tempo,
+                               math.ceil(robo.energia / consumo))
+        cauda = passos_restantes * self.peso_tempo
+        cauda -= (passos_restantes * dist_por_passo / self.limiar_loop) * self.penalidade_loop
+        return cauda
+
+def comandos_referencia(individuo, sensores):
+    """(aceleracao, rotacao) interpretando as árvores por IndividuoPG.avaliar_no, sem atalhos."""
+    avaliar = lambda arvore: IndividuoPG.avaliar_no(individuo, arvore, sensores)
+    a = avaliar(individuo.arvore_aceleracao)
+    if isinstance(a, tuple):
+        a, r = a
+    else:
+        r = avaliar(individuo.arvore_rotacao)
+        if isinstance(r, tuple):
+            r = r[1]
+    return max(-1, min(1, a)), max(-0.5, min(0.5, r))
+
+class RastreadorEpisodio:
+    """
+    Faz o papel do indivíduo (comandos) e do gravador em simular_episodio,
+    guardando sensores, comandos e estado do robô de cada passo para o modo
+    sombra. Opcionalmente repassa as chamadas de gravação a outro gravador.
+    """
+    def __init__(self, funcao_comandos, encaminhar=None):
+        self.funcao_comandos = funcao_comandos
+        self.encaminhar = encaminhar
+        self.sensores, self.comandos_passos, self.estados = [], [], []
+
+    def comandos(self, sensores):
+        a, r = self.funcao_comandos(sensores)
+        self.sensores.append(dict(sensores))
+        self.comandos_passos.append((a, r))
+        return a, r
+
+    def iniciar_episodio(self):
+        if self.encaminhar is not None:
+            self.encaminhar.iniciar_episodio()
+
+    def registrar(self, robo, aceleracao, rotacao, colisao):
+        self.estados.append({'x': robo.x, 'y': robo.y, 'angulo': robo.angulo,
+                             'velocidade': robo.velocidade, 'energia': robo.energia,
+                             'recursos': robo.recursos_coletados, 'colisao': bool(colisao)})
+        if self.encaminhar is not None:
+            self.encaminhar.registrar(robo, aceleracao, rotacao, colisao)
+
+    def finalizar_episodio(self, **metadados):
+        if self.encaminhar is not None:
+            self.encaminhar.finalizar_episodio(**metadados)
+
+OPERADORES_PG = [
+    '+', '-', '*', '/', 'max', 'min', 'abs',
+    'if_positivo', 'if_negativo', 'and', 'or', 'not',
+    'if_then_else', 'goto_meta'
+]
+
+class ModeloSubstituto:
+    """
+    Regressão ridge (só NumPy) treinada online com os indivíduos já
+    simulados, usada para ordenar os descendentes antes da simulação.
+
+    Características: saídas semânticas em um subconjunto do banco de sondas,
+    tamanho e altura das duas árvores e contagem de cada operador/folha.
+    Guarda só as `max_amostras` mais recentes, já que a escala do fitness
+    muda com o cenário de cada geração. Enquanto a correlação de postos
+    medida na última geração ficar abaixo de `min_precisao`, o modelo só
+    prevê (para continuar sendo medido) e todos os descendentes são simulados.
+    """
+    def __init__(self, banco_sondas, n_sondas=32, alfa=1.0,
+                 max_amostras=2000, min_amostras=30, min_precisao=0.3):
+        self.sondas = banco_sondas[:n_sondas]
+        self.alfa = alfa
+        self.max_amostras = max_amostras
+        self.min_amostras = min_amostras
+        self.min_precisao = min_precisao
+        self.precisao = None  # última correlação de postos válida
+        self.X = []
+        self.y = []
+        self.pesos = None
+
+    @property
+    def pronto(self):
+        return self.pesos is not None
+
+    @property
+    def confiavel(self):
+        return self.pronto and (self.precisao is None or self.precisao >= self.min_precisao)
+
+    def medir_precisao(self, previstos, reais):
+        """
+        Correlação de postos previsto x real (NaN se algum dos dois for
+        constante, caso em que a precisão anterior é mantida).
+        """
+        previstos, reais = np.asarray(previstos), np.asarray(reais)
+        if len(reais) < 3 or np.ptp(previstos) == 0 or np.ptp(reais) == 0:
+            return float('nan')
+        postos = lambda v: np.argsort(np.argsort(v))
+        rho = float(np.corrcoef(postos(previstos), postos(reais))[0, 1])
+        if math.isfinite(rho):
+            self.precisao = rho
+        return rho
+
+    def caracteristicas(self, individuo):
+        saidas = np.nan_to_num(
+            np.array([individuo.comandos(s) for s in self.sondas], dtype=float)).ravel()
+        contagem = dict.fromkeys(OPERADORES_PG + ['constante', 'variavel'], 0)
+        for arvore in (individuo.arvore_aceleracao, individuo.arvore_rotacao):
+            pilha = [arvore]
+            while pilha:
+                no = pilha.pop()
+                if no.get('tipo') == 'folha':
+                    contagem['constante' if 'valor' in no else 'variavel'] += 1
+                elif no.get('operador') in contagem:
+                    contagem[no['operador']] += 1
+                pilha.extend(individuo.filhos_no(no))
+        estrutura = [
+            individuo.contar_nos(individuo.arvore_aceleracao),
+            individuo.contar_nos(individuo.arvore_rotacao),
+            individuo.altura_no(individuo.arvore_aceleracao),
+            individuo.altura_no(individuo.arvore_rotacao),
+        ]
+        return np.concatenate([saidas, estrutura, list(contagem.values())])
+
+    def adicionar(self, individuo, fitness):
+        self.X.append(self.caracteristicas(individuo))
+        self.y.append(float(fitness))
+        if len(self.X) > self.max_amostras:
+            del self.X[:-self.max_amostras]
+            del self.y[:-self.max_amostras]
+
+    def treinar(self):
+        if len(self.X) < self.min_amostras:
+            return
+        X = np.array(self.X)
+        y = np.array(self.y)
+        self.media_x = X.mean(axis=0)
+        self.escala_x = X.std(axis=0)
+        self.escala_x[self.escala_x == 0] = 1.0
+        self.media_y = y.mean()
+        Xn = (X - self.media_x) / self.escala_x
+        A = Xn.T @ Xn + self.alfa * np.eye(Xn.shape[1])
+        self.pesos = np.linalg.solve(A, Xn.T @ (y - self.media_y))
+
+    def prever(self, individuos):
+        X = np.array([self.caracteristicas(ind) for ind in individuos])
+        return ((X - self.media_x) / self.escala_x) @ self.pesos + self.media_y
+
+class HallDaFama:
+    """
+    Arquivo persistente dos melhores indivíduos entre execuções, sem
+    repetições (chave = hash do conteúdo das duas árvores) e limitado aos
+    `capacidade` de maior fitness. O fitness guardado deve ser comparável
+    entre indivíduos, i.e. medido sempre no mesmo cenário (o treino usa
+    ProgramacaoGenetica.fitness_referencia): com o fitness do cenário
+    sorteado na geração, os que deram sorte tomariam o arquivo.
+
+    Formato: b'HDF1' seguido de registros
+        chave (16 bytes) | fitness (float64) | tamanho (uint32) | árvores (JSON + zlib)
+    A leitura é em blocos e só descomprime as árvores quando um indivíduo
+    é pedido; um registro final truncado é ignorado.
+    """
+    MAGICA = b'HDF1'
+    REGISTRO = struct.Struct('<16sdI')
+
+    def __init__(self, arquivo=None, capacidade=1000):
+        self.arquivo = arquivo
+        self.capacidade = capacidade
+        self.entradas = {}  # chave -> (fitness, árvores comprimidas)
+        if arquivo is not None and os.path.exists(arquivo):
+            self.carregar(arquivo)
+
+    def __len__(self):
+        return len(self.entradas)
+
+    @staticmethod
+    def codificar(individuo):
+        texto = json.dumps([individuo.arvore_aceleracao, individuo.arvore_rotacao],
+                           separators=(',', ':'), sort_keys=True).encode()
+        return hashlib.blake2b(texto, digest_size=16).digest(), texto
+
+    def adicionar(self, individuo, fitness):
+        chave, texto = self.codificar(individuo)
+        atual = self.entradas.get(chave)
+        if atual is None:
+            self.entradas[chave] = (float(fitness), zlib.compress(texto, 6))
+        elif fitness > atual[0]:
+            self.entradas[chave] = (float(fitness), atual[1])
+        if len(self.entradas) > 2 * self.capacidade:
+            self.podar()
+
+    def adicionar_populacao(self, populacao, pontuar):
+        """
+        Indivíduos com fitness simulado (os estimados pelo substituto ficam
+        de fora), com o fitness dado por `pontuar(individuo)`. A pontuação
+        não depende da geração, então quem já está no arquivo não é
+        pontuado de novo.
+        """
+        for individuo in populacao:
+            if not individuo.estimado and self.codificar(individuo)[0] not in self.entradas:
+                self.adicionar(individuo, pontuar(individuo))
+
+    def podar(self):
+        melhores = heapq.nlargest(self.capacidade, self.entradas.items(),
+                                  key=lambda item: item[1][0])
+        self.entradas = dict(melhores)
+
+    def melhores(self, n=None, profundidade=3):
+        """Os n indivíduos de maior fitness, do melhor para o pior."""
+        n = len(self.entradas) if n is None else n
+        topo = heapq.nlargest(n, self.entradas.values(), key=lambda entrada: entrada[0])
+        individuos = []
+        for fitness, blob in topo:
+            aceleracao, rotacao = json.loads(zlib.decompress(blob))
+            individuo = IndividuoPG.de_arvores(aceleracao, rotacao, profundidade)
+            individuo.fitness = fitness
+            individuos.append(individuo)
+        return individuos
+
+    def carregar(self, arquivo, tamanho_bloco=1 << 20):
+        registro = self.REGISTRO
+        with open(arquivo, 'rb') as f:
+            if f.read(len(self.MAGICA)) != self.MAGICA:
+                raise ValueError(f"{arquivo} não é um arquivo de hall da fama")
+            resto = b''
+            while True:
+                bloco = f.read(tamanho_bloco)
+                if not bloco:
+                    break
+                dados = resto + bloco
+                pos = 0
+                while pos + registro.size <= len(dados):
+                    chave, fitness, n = registro.unpack_from(dados, pos)
+                    fim = pos + registro.size + n
+                    if fim > len(dados):
+                        break
+                    atual = self.entradas.get(chave)
+                    if atual is None or fitness > atual[0]:
+                        self.entradas[chave] = (fitness, dados[pos + registro.size:fim])
+                    pos = fim
+                resto = dados[pos:]
+        if len(self.entradas) > self.capacidade:
+            self.podar()
+
+    def salvar(self, arquivo=None):
+        """Regrava o arquivo (atômico) com os `capacidade` melhores, em ordem de fitness."""
+        arquivo = arquivo or self.arquivo
+        self.podar()
+        temporario = arquivo + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(self.MAGICA)
+            for chave, (fitness, blob) in sorted(self.entradas.items(),
+                                                 key=lambda item: item[1][0], reverse=True):
+                f.write(self.REGISTRO.pack(chave, fitness, len(blob)))
+                f.write(blob)
+        os.replace(temporario, arquivo)
+
+class PopulacaoFragmentada:
+    """
+    População guardada em disco, para tamanhos que não cabem em memória
+    como lista de dicts. Os indivíduos vão em fragmentos de
+    `tamanho_fragmento` registros (tamanho uint32 + árvores em JSON/zlib);
+    em memória fica só o índice: fitness, tamanho, passos e posição de
+    cada indivíduo no seu fragmento (~28 bytes por indivíduo).
+
+    A avaliação percorre os fragmentos em sequência, em lotes; a reprodução
+    lê os pais sob demanda, com um cache LRU dos `cache` últimos lidos.
+    """
+    REGISTRO = struct.Struct('<I')
+
+    def __init__(self, diretorio, capacidade, profundidade=3,
+                 tamanho_fragmento=10000, cache=1024):
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.profundidade = profundidade
+        self.tamanho_fragmento = tamanho_fragmento
+        self.fitness  = np.zeros(capacidade)
+        self.tamanhos = np.zeros(capacidade, dtype=np.uint32)
+        self.passos   = np.full(capacidade, np.nan, dtype=np.float32)
+        self.offsets  = np.zeros(capacidade, dtype=np.int64)
+        self.n = 0
+        self.escrita = None
+        self.leitores = {}  # fragmento -> arquivo aberto para leitura
+        self.ler = functools.lru_cache(maxsize=cache)(self.ler_disco)
+
+    def __len__(self):
+        return self.n
+
+    def arquivo_fragmento(self, k):
+        return os.path.join(self.diretorio, f"fragmento_{k:05d}.bin")
+
+    def adicionar(self, individuo):
+        k, pos = divmod(self.n, self.tamanho_fragmento)
+        if pos == 0:
+            if self.escrita is not None:
+                self.escrita.close()
+            self.escrita = open(self.arquivo_fragmento(k), 'wb')
+        blob = zlib.compress(json.dumps([individuo.arvore_aceleracao, individuo.arvore_rotacao],
+                                        separators=(',', ':')).encode(), 1)
+        self.offsets[self.n] = self.escrita.tell()
+        self.escrita.write(self.REGISTRO.pack(len(blob)))
+        self.escrita.write(blob)
+        self.fitness[self.n] = individuo.fitness
+        self.tamanhos[self.n] = individuo.tamanho()
+        if individuo.passos is not None:
+            self.passos[self.n] = individuo.passos
+        self.n += 1
+
+    def finalizar_escrita(self):
+        if self.escrita is not None:
+            self.escrita.close()
+            self.escrita = None
+
+    def decodificar(self, i, blob):
+        aceleracao, rotacao = json.loads(zlib.decompress(blob))
+        individuo = IndividuoPG.de_arvores(aceleracao, rotacao, self.profundidade)
+        individuo.fitness = float(self.fitness[i])
+        if not np.isnan(self.passos[i]):
+            individuo.passos = float(self.passos[i])
+        return individuo
+
+    def ler_disco(self, i):
+        """Indivíduo i (compartilhado pelo cache: não deve ser alterado)."""
+        k = i // self.tamanho_fragmento
+        if k not in self.leitores:
+            self.leitores[k] = open(self.arquivo_fragmento(k), 'rb')
+        f = self.leitores[k]
+        f.seek(self.offsets[i])
+        n, = self.REGISTRO.unpack(f.read(self.REGISTRO.size))
+        return self.decodificar(i, f.read(n))
+
+    def lotes(self, tamanho_lote=1000):
+        """(índice do primeiro, indivíduos) em lotes, lendo os fragmentos em sequência."""
+        self.finalizar_escrita()
+        lote, inicio = [], 0
+        for k in range(math.ceil(self.n / self.tamanho_fragmento)):
+            fim = min(self.n, (k + 1) * self.tamanho_fragmento)
+            with open(self.arquivo_fragmento(k), 'rb') as f:
+                for i in range(k * self.tamanho_fragmento, fim):
+                    n, = self.REGISTRO.unpack(f.read(self.REGISTRO.size))
+                    lote.append(self.decodificar(i, f.read(n)))
+                    if len(lote) == tamanho_lote:
+                        yield inicio, lote
+                        lote, inicio = [], i + 1
+        if lote:
+            yield inicio, lote
+
+    def fechar(self):
+        self.finalizar_escrita()
+        for f in self.leitores.values():
+            f.close()
+        self.leitores = {}
+        self.ler.cache_clear()
+
+    def apagar(self):
+        self.fechar()
+        for k in range(math.ceil(self.n / self.tamanho_fragmento)):
+            os.remove(self.arquivo_fragmento(k))
+
+class PrevisorCusto:
+    """
+    Custo previsto (segundos) da avaliação de um indivíduo: passos esperados
+    vezes o tempo por passo, este linear no número de nós das árvores e
+    ajustado por mínimos quadrados com as tarefas já cronometradas.
+
+    Passos esperados: os da última avaliação do próprio indivíduo (elites),
+    senão a média dos pais, senão a média da geração anterior.
+    """
+    def __init__(self, max_amostras=2000):
+        self.max_amostras = max_amostras
+        self.amostras = []           # (nós, passos, duração)
+        self.coeficientes = (1e-4, 1e-6)  # s/passo = a + b * nós, até haver dados
+        self.passos_padrao = 1.0
+
+    def prever(self, individuos):
+        a, b = self.coeficientes
+        custos = []
+        for individuo in individuos:
+            passos = individuo.passos if individuo.passos is not None else individuo.passos_pais
+            if passos is None:
+                passos = self.passos_padrao
+            custos.append(passos * (a + b * individuo.tamanho()))
+        return np.array(custos)
+
+    def adicionar(self, individuo, passos, duracao):
+        self.amostras.append((individuo.tamanho(), passos, duracao))
+
+    def treinar(self):
+        self.amostras = self.amostras[-self.max_amostras:]
+        dados = np.array([amostra for amostra in self.amostras if amostra[1] > 0])
+        if len(dados) == 0:
+            return
+        self.passos_padrao = float(dados[:, 1].mean())
+        if len(dados) < 10 or np.ptp(dados[:, 0]) == 0:
+            return
+        X = np.column_stack([np.ones(len(dados)), dados[:, 0]])
+        (a, b), *_ = np.linalg.lstsq(X, dados[:, 2] / dados[:, 1], rcond=None)
+        if a > 0 and b >= 0:
+            self.coeficientes = (float(a), float(b))
+
+class ServidorMetricas:
+    """
+    Endpoint HTTP em localhost com as métricas da última geração no formato
+    texto do Prometheus (GET /metrics). Roda em uma thread daemon e só
+    existe quando evoluir_iter recebe `porta_metricas`.
+    """
+    METRICAS = {
+        'melhor':           ('pg_melhor_fitness',        'gauge',   'Melhor fitness da geração'),
+        'media':            ('pg_media_fitness',         'gauge',   'Fitness médio da geração'),
+        'std':              ('pg_desvio_fitness',        'gauge',   'Desvio-padrão do fitness'),
+        'diversidade':      ('pg_diversidade',           'gauge',   'Diversidade estrutural média'),
+        'tempo_avaliacao':  ('pg_tempo_avaliacao_segundos', 'gauge', 'Tempo de avaliação da geração'),
+        'tempo_reproducao': ('pg_tempo_reproducao_segundos', 'gauge', 'Tempo de seleção e reprodução'),
+        'passos_medios':    ('pg_passos_por_episodio',   'gauge',   'Passos simulados por episódio'),
+        'duplicatas':       ('pg_duplicatas_semanticas', 'gauge',   'Fração servida pelo cache semântico'),
+        'tamanho_melhor':   ('pg_tamanho_melhor',        'gauge',   'Nós nas árvores do melhor indivíduo'),
+        'tamanho_medio':    ('pg_tamanho_medio',         'gauge',   'Nós por indivíduo, média da população'),
+        'tamanho_max':      ('pg_tamanho_max',           'gauge',   'Nós do maior indivíduo da população'),
+        'geracao':          ('pg_geracao',               'gauge',   'Gerações concluídas'),
+    }
+
+    def __init__(self, porta, host='127.0.0.1'):
+        self.texto = b''
+        self.total_avaliacoes = 0
+        self.total_acertos_cache = 0
+        servidor_metricas = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('/metrics', ''):
+                    self.send_error(404)
+                    return
+                corpo = servidor_metricas.texto
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer((host, porta), Handler)
+        self.porta = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def atualizar(self, registro):
+        self.total_avaliacoes += registro['avaliacoes']
+        self.total_acertos_cache += registro['acertos_cache']
+        linhas = []
+        for chave, (nome, tipo, ajuda) in self.METRICAS.items():
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}",
+                       f"{nome} {float(registro[chave])!r}"]
+        for nome, valor, ajuda in (
+                ('pg_avaliacoes_total', self.total_avaliacoes, 'Indivíduos simulados'),
+                ('pg_acertos_cache_total', self.total_acertos_cache, 'Avaliações servidas pelo cache')):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter", f"{nome} {valor}"]
+        self.texto = ('\n'.join(linhas) + '\n').encode()
+
+    def encerrar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class ColetorTrajetoria:
+    """
+    Mesma interface do GravadorTrajetoria, mas guarda o episódio em memória
+    (array DTYPE_TRAJETORIA em self.trajetoria), sem tocar no disco.
+    """
+    def iniciar_episodio(self):
+        self.passos = []
+
+    def registrar(self, robo, aceleracao, rotacao, colisao):
+        self.passos.append((robo.x, robo.y, robo.angulo, robo.velocidade, robo.energia,
+                            robo.recursos_coletados, colisao, aceleracao, rotacao))
+
+    def finalizar_episodio(self, **metadados):
+        self.trajetoria = np.array(self.passos, dtype=DTYPE_TRAJETORIA)
+        self.metadados = metadados
+
+def executar_visualizador(fila, fps=20, passos_por_quadro=5, arquivo_png=None):
+    """
+    Laço do processo visualizador. A cada mensagem nova (só a mais recente
+    da fila interessa) refaz o episódio 0 do melhor indivíduo no cenário da
+    geração, que é reprodutível pela semente, e passa a exibir o replay e as
+    curvas de fitness no seu próprio ritmo. O treino não espera por nada
+    disso. Com `arquivo_png` (ex.: sem display) salva a figura a cada segundo.
+    """
+    # prioridade baixa: com os núcleos disputados, quem cede é o desenho
+    if hasattr(os, 'nice'):
+        os.nice(19)
+    fig, (ax_mapa, ax_fit) = plt.subplots(1, 2, figsize=(14, 5.5),
+                                          gridspec_kw={'width_ratios': [4, 3]})
+    linha_melhor, = ax_fit.plot([], [], label='Melhor fitness', linewidth=2)
+    linha_media,  = ax_fit.plot([], [], label='Média da população', linestyle='--')
+    ax_fit.set_xlabel('Geração')
+    ax_fit.set_ylabel('Fitness')
+    ax_fit.grid(True)
+    ax_fit.legend(loc='lower right')
+
+    trajetoria, quadro, ultimo_png = None, 0, 0.0
+    melhor, media = [], []
+    while True:
+        # 1) Só a mensagem mais recente interessa para o replay, mas o
+        #    histórico chega em pedaços e vem de todas
+        mensagem = None
+        try:
+            while True:
+                mensagem = fila.get_nowait()
+                if mensagem == 'fim':
+                    plt.close(fig)
+                    return
+                del melhor[mensagem['desde']:], media[mensagem['desde']:]
+                melhor += mensagem['melhor']
+                media += mensagem['media']
+        except queue.Empty:
+            pass
+        if not plt.fignum_exists(fig.number):
+            return  # janela fechada pelo usuário
+
+        # 2) Novo melhor indivíduo: refaz o episódio e redesenha o estático
+        if mensagem is not None:
+            ambiente = Ambiente.gerar_cenario(mensagem['cenario'])
+            robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+            coletor = ColetorTrajetoria()
+            avaliador = AvaliadorFitness.de_configuracao(mensagem['avaliador'])
+            avaliador.gravador = coletor
+            random.seed(mensagem['semente'])
+            avaliador.simular_episodio(IndividuoPG.de_arvores(*mensagem['arvores']), ambiente, robo)
+            trajetoria, quadro = coletor.trajetoria, 0
+
+            ax_mapa.clear()
+            ax_mapa.set_xlim(0, ambiente.largura)
+            ax_mapa.set_ylim(0, ambiente.altura)
+            ax_mapa.set_title(f"Geração {mensagem['geracao']} | melhor fitness "
+                              f"{mensagem['fitness']:.1f}")
+            for obst in ambiente.obstaculos:
+                ax_mapa.add_patch(patches.Rectangle(
+                    (obst['x'], obst['y']), obst['largura'], obst['altura'],
+                    linewidth=1, edgecolor='black', facecolor='#FF9999', alpha=0.7))
+            for rec in ambiente.recursos:
+                ax_mapa.add_patch(patches.Circle(
+                    (rec['x'], rec['y']), 10,
+                    linewidth=1, edgecolor='black', facecolor='#99FF99', alpha=0.8))
+            ax_mapa.add_patch(patches.Circle(
+                (ambiente.meta['x'], ambiente.meta['y']), ambiente.meta['raio'],
+                linewidth=2, edgecolor='black', facecolor='#FFFF00', alpha=0.8))
+            # artistas persistentes, só atualizados a cada quadro
+            rastro, = ax_mapa.plot([], [], color='#3366CC', linewidth=1, alpha=0.6)
+            robo_circ = patches.Circle((robo.x, robo.y), robo.raio, linewidth=1,
+                                       edgecolor='black', facecolor='#9999FF', alpha=0.8)
+            ax_mapa.add_patch(robo_circ)
+            info = ax_mapa.text(10, ambiente.altura - 30, "", fontsize=10,
+                                bbox=dict(facecolor='white', alpha=0.8, edgecolor='gray'))
+
+            geracoes = range(1, len(melhor) + 1)
+            linha_melhor.set_data(geracoes, melhor)
+            linha_media.set_data(geracoes, media)
+            ax_fit.relim()
+            ax_fit.autoscale_view()
+
+        # 3) Avança o replay (recomeça ao chegar no fim)
+        if trajetoria is not None and len(trajetoria):
+            passo = trajetoria[min(quadro, len(trajetoria) - 1)]
+            robo_circ.set_center((passo['x'], passo['y']))
+            rastro.set_data(trajetoria['x'][:quadro + 1], trajetoria['y'][:quadro + 1])
+            info.set_text(f"Passo {min(quadro, len(trajetoria) - 1) + 1}/{len(trajetoria)} | "
+                          f"Recursos: {passo['coletados']} | Energia: {passo['energia']:.0f}")
+            quadro = 0 if quadro >= len(trajetoria) + fps else quadro + passos_por_quadro
+
+        if arquivo_png is not None and time.monotonic() - ultimo_png >= 1.0:
+            fig.savefig(arquivo_png)
+            ultimo_png = time.monotonic()
+        plt.pause(1.0 / fps)
+
+class VisualizadorAoVivo:
+    """
+    Visualização durante o treino, em um processo separado. `publicar` só
+    troca a mensagem pendente (a anterior, se ainda não saiu, é descartada
+    e contada em `descartados`) e retorna; uma thread de envio leva a mais
+    recente para a fila de uma vaga e é só ela que espera quando o
+    visualizador está atrasado. Vão as árvores, as sementes do cenário e a
+    parte do histórico de fitness ainda não enviada; o visualizador refaz o
+    episódio sozinho.
+    """
+    def __init__(self, fps=20, arquivo_png=None):
+        contexto = multiprocessing.get_context('spawn')
+        self.fila = contexto.Queue(maxsize=1)
+        self.processo = contexto.Process(target=executar_visualizador,
+                                         args=(self.fila, fps, 5, arquivo_png), daemon=True)
+        self.processo.start()
+        self.enviados = 0
+        self.descartados = 0
+        self.pendente = None
+        self.fechado = False
+        self.historico_enviado = 0     # gerações do histórico já na fila
+        self.historico_fonte   = None  # histórico de qual execução
+        self.condicao = threading.Condition()
+        self.thread = threading.Thread(target=self.enviar, daemon=True)
+        self.thread.start()
+
+    def publicar(self, pg, geracao):
+        semente_cenario, semente = pg.cenario_atual
+        mensagem = {
+            'geracao':   geracao,
+            'arvores':   (pg.melhor_individuo.arvore_aceleracao, pg.melhor_individuo.arvore_rotacao),
+            'fitness':   pg.melhor_fitness,
+            'cenario':   semente_cenario,
+            'semente':   semente if semente is not None else 0,
+            'avaliador': pg.avaliador.configuracao(),
+        }
+        with self.condicao:
+            if self.fechado:
+                return  # 'fim' já foi (ou vai) para a fila
+            if self.pendente is not None:
+                self.descartados += 1
+            if pg.historico_fitness is not self.historico_fonte:
+                # outra execução no mesmo visualizador: histórico desde o início
+                self.historico_fonte = pg.historico_fitness
+                self.historico_enviado = 0
+            # histórico desde a última mensagem que saiu (inclui o das descartadas)
+            desde = self.historico_enviado
+            mensagem['desde'] = desde
+            mensagem['melhor'] = pg.historico_fitness[desde:]
+            mensagem['media'] = pg.media_fitness[desde:]
+            self.pendente = mensagem
+            self.condicao.notify()
+
+    def enviar(self):
+        """Thread de envio: leva a mensagem pendente mais recente para a fila."""
+        while True:
+            with self.condicao:
+                while self.pendente is None:
+                    self.condicao.wait()
+                mensagem, self.pendente = self.pendente, None
+                if mensagem != 'fim':
+                    self.historico_enviado = mensagem['desde'] + len(mensagem['melhor'])
+            while True:
+                try:
+                    self.fila.put(mensagem, timeout=0.5)
+                    break
+                except queue.Full:
+                    if not self.processo.is_alive():
+                        return
+            if mensagem == 'fim':
+                return
+            self.enviados += 1
+
+    def fechar(self, timeout=2.0):
+        with self.condicao:
+            self.fechado = True
+            self.pendente = 'fim'
+            self.condicao.notify()
+        self.thread.join(timeout)
+        self.processo.join(timeout)
+        if self.processo.is_alive():
+            self.processo.terminate()
+        self.fila.cancel_join_thread()
+        self.fila.close()
+
 class ProgramacaoGenetica:
     def __init__(self,
                  tamanho_populacao: int = 50,
                  profundidade: int = 3,
                  metodo_selecao: str = 'torneio',
-                 elite_size: float = 1):
+                 elite_size: float = 1,
+                 parada_antecipada: dict = None,
+                 cenarios_deterministicos: bool = False,
+                 deduplicacao_semantica: bool = False,
+                 n_sondas: int = 256,
+                 substituto: bool = False,
+                 fracao_simulada: float = 0.5,
+                 gravador: GravadorTrajetoria = None,
+                 broker=None,
+                 n_processos: int = 1,
+                 hall_da_fama: HallDaFama = None,
+                 fracao_hall: float = 0.2,
+                 profundidade_max: int = 12,
+                 max_nos: int = None,
+                 parcimonia: float = 0.0,
+                 torneio_duplo: bool = False,
+                 populacao_em_disco: str = None):
         self.tamanho_populacao = tamanho_populacao
         self.profundidade      = profundidade
         self.metodo_selecao    = metodo_selecao
         self.elite_size        = elite_size
-        self.populacao         = [IndividuoPG(profundidade)
-                                  for _ in range(tamanho_populacao)]
+        # Com populacao_em_disco (diretório) a população só existe nos
+        # fragmentos de evoluir_fragmentado; a última geração fica em
+        # populacao_fragmentada
+        self.populacao_em_disco = populacao_em_disco
+        self.populacao_fragmentada = None
         self.melhor_individuo  = None
         self.melhor_fitness    = float('-inf')
 
+        # Controle de bloat: descendentes acima de profundidade_max (por
+        # árvore, folha = 0 como em `profundidade`) ou max_nos (soma das
+        # duas) são descartados e o primeiro pai é copiado no lugar. A
+        # população inicial também respeita os limites. Na seleção,
+        # `parcimonia` desconta do fitness por nó, e o torneio duplo desempata
+        # os vencedores de dois torneios de fitness pelo tamanho (o menor
+        # vence com prob. pressao_tamanho)
+        if profundidade_max is not None and profundidade_max < profundidade:
+            raise ValueError(f"profundidade_max={profundidade_max} é menor que a profundidade "
+                             f"das árvores iniciais ({profundidade})")
+        self.profundidade_max  = profundidade_max
+        self.max_nos           = max_nos
+        self.parcimonia        = parcimonia
+        self.torneio_duplo     = torneio_duplo
+        self.pressao_tamanho   = 0.7
+        self.filhos_rejeitados = 0
+
+        self.populacao         = [self.individuo_aleatorio()
+                                  for _ in range(tamanho_populacao)] if populacao_em_disco is None else []
+
+        # Partida a quente: parte da população inicial vem do hall da fama,
+        # que recebe as elites de cada geração desta execução, pontuadas no
+        # cenário de referência (fitness_referencia)
+        self.hall_da_fama = hall_da_fama
+        self.fracao_hall  = fracao_hall
+        if hall_da_fama is not None and len(hall_da_fama) and populacao_em_disco is None:
+            sementes = [individuo for individuo in
+                        hall_da_fama.melhores(round(fracao_hall * tamanho_populacao), profundidade)
+                        if self.respeita_limites(individuo)]
+            for individuo in sementes:
+                individuo.fitness = 0
+            self.populacao[:len(sementes)] = sementes
+        self.prob_mut_inicial  = 0.1   # taxa inicial de mutação
+        self.decaimento_mutacao = 0.05 # fator de decaimento exponencial
+        self.geracao           = 0     # gerações concluídas (entre chamadas)
+        self.avaliador         = AvaliadorFitness(parada_antecipada=parada_antecipada,
+                                                  gravador=gravador)
+
+        # Deduplicação semântica: só é válida se os episódios forem
+        # reprodutíveis, i.e. com cenários determinísticos
+        if deduplicacao_semantica and not cenarios_deterministicos:
+            raise ValueError("deduplicacao_semantica=True exige cenarios_deterministicos=True")
+        self.cenarios_deterministicos = cenarios_deterministicos
+        self.deduplicacao_semantica   = deduplicacao_semantica
+        self.banco_sondas = gerar_banco_sondas(n_sondas) if self.deduplicacao_semantica else None
+
+        # Substituto: só a `fracao_simulada` mais promissora dos descendentes
+        # é simulada, o resto recebe o fitness previsto (estimado=True)
+        self.fracao_simulada = fracao_simulada
+        self.substituto = None
+        if substituto:
+            self.substituto = ModeloSubstituto(self.banco_sondas or gerar_banco_sondas(n_sondas))
+        self.elites = []
+
+        # Cenário fixo para comparar candidatos a melhor avaliados em
+        # cenários diferentes (ver fitness_referencia)
+        self.avaliador_referencia = None
+        self.ambiente_referencia  = None
+
+        # Cliente de um broker de avaliação (ver broker_avaliacao.py); sem
+        # ele as simulações rodam neste processo
+        self.broker = broker
+
+        # Avaliação paralela local: os cenários vão para os processos por
+        # memória compartilhada (BancoCenarios)
+        self.n_processos = n_processos
+        self.pool = None
+        self.banco_cenarios = None  # um bloco só, regravado a cada geração
+        self.previsor_custo = PrevisorCusto()
+        self.balanceamento = []  # por geração: utilização dos processos e cauda
+
         # estatísticas
         self.historico_fitness = []
         self.media_fitness     = []
         self.std_fitness       = []
         self.diversidade       = []
+        self.passos_medios     = []  # passos simulados por episódio
+        self.duplicatas_semanticas = []  # fração servida pelo cache semântico
+        self.acertos_cache         = []  # indivíduos servidos pelo cache semântico
+        self.precisao_substituto   = []  # correlação de postos previsto x real
+        self.simulacoes_poupadas   = []  # indivíduos com fitness estimado
+        self.avaliacoes            = []  # indivíduos simulados por geração
+        self.tamanho_medio         = []  # nós por indivíduo (duas árvores)
+        self.tamanho_max           = []
     
     def avaliar_populacao(self):
-        ambiente = Ambiente()
-        robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
-        fitness_vals = []
-
-        # Parâmetros de reward shaping
-        peso_recursos    = 200.0
-        peso_tempo       = -1.0
-        peso_proximidade = 10.0
-        penalidade_loop  = 50.0
-        limiar_loop      = 50.0  # distância em pixels
-
-        for individuo in self.populacao:
-            total_fitness = 0.0
-
-            for _ in range(5):
-                ambiente.reset()
-                robo.reset(ambiente.largura // 2, ambiente.altura // 2)
-
-                # Inicializa potencial Φ(s₀)
-                prev_potencial = -sum(
-                    np.hypot(robo.x - r['x'], robo.y - r['y'])
-                    for r in ambiente.recursos if not r['coletado']
-                )
-                recursos_antes = 0
-                dist_antes     = 0.0
-
-                # Loop da simulação
-                while True:
-                    sensores = robo.get_sensores(ambiente)
-                    resultado = individuo.avaliar(sensores, 'aceleracao')
-                    if isinstance(resultado, tuple):
-                        a, r = resultado
-                    else:
-                        a = resultado
-                        # substitui o desempacotamento direto por um check de tupla
-                        resultado_r = individuo.avaliar(sensores, 'rotacao')
-                        if isinstance(resultado_r, tuple):
-                            _, r = resultado_r
-                        else:
-                            r = resultado_r
-
-                    # Clamp
-                    a = max(-1, min(1, a))
-                    r = max(-0.5, min(0.5, r))
-
-                    sem_energia = robo.mover(a, r, ambiente)
-
-                    # 1) Recompensa imediata por coleta
-                    delta_recursos = robo.recursos_coletados - recursos_antes
-                    if delta_recursos > 0:
-                        total_fitness += delta_recursos * peso_recursos
-                    recursos_antes = robo.recursos_coletados
-
-                    # 2) Reward de aproximação (potencial Φ)
-                    curr_potencial = -sum(
-                        np.hypot(robo.x - rec['x'], robo.y - rec['y'])
-                        for rec in ambiente.recursos if not rec['coletado']
-                    )
-                    total_fitness += (curr_potencial - prev_potencial) * peso_proximidade
-                    prev_potencial = curr_potencial
-
-                    # 3) Penalidade de looping sem coleta significativa
-                    dist_percorrida = robo.distancia_percorrida - dist_antes
-                    if delta_recursos == 0 and dist_percorrida > limiar_loop:
-                        total_fitness -= penalidade_loop
-                        dist_antes = robo.distancia_percorrida
-
-                    # 4) Penalidade de tempo (passo a passo)
-                    total_fitness += peso_tempo
-
-                    if sem_energia or ambiente.passo():
-                        break
-
-                # 5) Bônus final por atingir a meta
-                if robo.meta_atingida:
-                    total_fitness += 500
-
-            # Fitness médio sobre os 5 episódios
-            individuo.fitness = total_fitness / 5.0
-            fitness_vals.append(individuo.fitness)
+        total_passos = 0
+        repetidos    = 0
+        semente_cenario = random.randrange(2**31)
+        semente = random.randrange(2**31) if self.cenarios_deterministicos else None
+        self.cenario_atual = (semente_cenario, semente)
+
+        # 1) Pré-triagem pelo substituto: elites sempre são simuladas, dos
+        #    descendentes só a fração com maior fitness previsto (todos,
+        #    se a precisão medida estiver baixa)
+        previstos = {}
+        adiados   = set()
+        if self.substituto is not None and self.substituto.pronto:
+            ids_elite = {id(ind) for ind in self.elites}
+            descendentes = [ind for ind in self.populacao if id(ind) not in ids_elite]
+            if descendentes:
+                preds = self.substituto.prever(descendentes)
+                previstos = {id(ind): p for ind, p in zip(descendentes, preds)}
+                n_sim = (math.ceil(self.fracao_simulada * len(descendentes))
+                         if self.substituto.confiavel else len(descendentes))
+                ordem = np.argsort(-preds)
+                adiados = {id(descendentes[i]) for i in ordem[n_sim:]}
+        ordem_avaliacao = sorted(self.populacao, key=lambda ind: id(ind) in adiados)
+
+        # 2) Decide quem precisa de simulação; repetidos semânticos apontam
+        #    para o primeiro indivíduo com a mesma assinatura
+        a_simular   = []
+        copias      = []  # (indivíduo, representante)
+        cache = {}  # assinatura semântica -> representante nesta geração
+        for individuo in ordem_avaliacao:
+            individuo.estimado = False
+            if self.deduplicacao_semantica:
+                chave = individuo.assinatura_semantica(self.banco_sondas)
+                if chave in cache:
+                    copias.append((individuo, cache[chave]))
+                    repetidos += 1
+                    continue
+                cache[chave] = individuo
+
+            if id(individuo) in adiados:
+                individuo.fitness  = float(previstos[id(individuo)])
+                individuo.estimado = True
+                continue
+            a_simular.append(individuo)
+
+        # 3) Simula (localmente ou no broker) e propaga para os repetidos
+        posicao = {id(ind): i for i, ind in enumerate(self.populacao)}
+        resultados = self.simular_lote(a_simular, semente_cenario, semente,
+                                       [posicao[id(ind)] for ind in a_simular])
+        avaliados = []  # (indivíduo, fitness previsto ou None) simulados agora
+        for individuo, (fitness, passos) in zip(a_simular, resultados):
+            individuo.fitness = fitness
+            individuo.passos  = passos
+            total_passos += passos
+            avaliados.append((individuo, previstos.get(id(individuo))))
+        for individuo, representante in copias:
+            individuo.fitness  = representante.fitness
+            individuo.estimado = representante.estimado
+            individuo.passos   = representante.passos
+        simulados = len(a_simular)
+
+        # 4) Atualiza o substituto com o que foi de fato simulado
+        if self.substituto is not None:
+            pares = [(p, ind.fitness) for ind, p in avaliados if p is not None]
+            prev, real = np.array(pares).T if pares else ([], [])
+            self.precisao_substituto.append(self.substituto.medir_precisao(prev, real))
+            estimados = sum(1 for ind in self.populacao if ind.estimado)
+            self.simulacoes_poupadas.append(estimados)
+            for ind, _ in avaliados:
+                self.substituto.adicionar(ind, ind.fitness)
+            self.substituto.treinar()
+
+        # Estatísticas só sobre fitness reais (simulados ou do cache)
+        reais = [ind for ind in self.populacao if not ind.estimado]
+        fitness_vals = [ind.fitness for ind in reais]
 
         # Estatísticas da população
         media = float(np.mean(fitness_vals))
         std   = float(np.std(fitness_vals))
 
         # Diversidade estrutural
+        diversidade_media = self.diversidade_estrutural(self.populacao)
+
+        # Atualiza históricos
+        self.historico_fitness.append(float(max(fitness_vals)))
+        self.media_fitness.append(media)
+        self.std_fitness.append(std)
+        self.diversidade.append(diversidade_media)
+        self.passos_medios.append(
+            total_passos / (max(1, simulados) * self.avaliador.n_episodios))
+        self.duplicatas_semanticas.append(repetidos / len(self.populacao))
+        self.acertos_cache.append(repetidos)
+        self.avaliacoes.append(simulados)
+        self.registrar_tamanhos(self.populacao)
+
+        # Atualiza melhor indivíduo
+        best_idx = int(np.argmax(fitness_vals))
+        self.melhor_individuo = reais[best_idx]
+        self.melhor_fitness   = fitness_vals[best_idx]
+
+    SEMENTE_REFERENCIA = 20240613
+
+    def fitness_referencia(self, individuo):
+        """
+        Fitness no cenário de referência, com os episódios de sementes fixas
+        e a fidelidade da avaliação no momento da primeira chamada. Fitness
+        de cenários diferentes não são comparáveis entre si; este é.
+        """
+        if self.avaliador_referencia is None:
+            self.avaliador_referencia = copy.copy(self.avaliador)
+            self.avaliador_referencia.gravador = None
+            self.avaliador_referencia.conformidade = 0.0
+            self.ambiente_referencia = Ambiente.gerar_cenario(self.SEMENTE_REFERENCIA)
+        ambiente = self.ambiente_referencia
+        robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+        fitness, _ = self.avaliador_referencia.avaliar(individuo, ambiente, robo,
+                                                       self.SEMENTE_REFERENCIA)
+        return fitness
+
+    def simular_lote(self, individuos, semente_cenario, semente, posicoes=None):
+        """
+        (fitness, passos) de cada indivíduo no cenário da geração. `posicoes`
+        (índices dos indivíduos na população) só servem para o gravador,
+        que só funciona com a avaliação neste processo.
+        """
+        if self.avaliador.gravador is not None and (self.broker is not None or self.n_processos > 1):
+            raise ValueError("gravação de trajetórias não é suportada com broker nem com n_processos > 1")
+        if self.broker is not None:
+            return self.broker.avaliar_lote(
+                individuos, semente_cenario, semente, self.avaliador.configuracao())
+
+        ambiente = Ambiente.gerar_cenario(semente_cenario)
+        if self.n_processos > 1:
+            return self.simular_em_processos(individuos, ambiente, semente)
+
+        robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+        geracao = len(self.historico_fitness) + 1
+        if posicoes is None:
+            posicoes = range(len(individuos))
+        resultados = []
+        for individuo, posicao in zip(individuos, posicoes):
+            # Fitness médio sobre os episódios
+            if self.avaliador.gravador is not None:
+                self.avaliador.gravador.contexto = {
+                    'geracao': geracao, 'individuo': posicao,
+                    'semente_cenario': semente_cenario}
+            resultados.append(self.avaliador.avaliar(individuo, ambiente, robo, semente))
+        return resultados
+
+    def simular_em_processos(self, individuos, ambiente, semente):
+        """
+        Despacho dinâmico, do maior custo previsto para o menor: as tarefas
+        são enviadas uma a uma e cada processo que fica livre pega a próxima
+        da fila, então as avaliações longas começam cedo e as curtas
+        preenchem o fim da geração.
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.n_processos)
+        # vai só a configuração; com conformidade, cada tarefa tem o seu sorteio
+        configuracao = self.avaliador.configuracao()
+        conformidade = [self.avaliador.conformidade_para_processo(
+                            self.avaliador.rng_conformidade.randrange(2**31))
+                        for _ in individuos] if self.avaliador.conformidade else None
+        previsao = self.previsor_custo.prever(individuos)
+        ordem = np.argsort(-previsao, kind='stable')
+
+        inicio = time.monotonic()
+        if self.banco_cenarios is None:
+            self.banco_cenarios = BancoCenarios([ambiente])
+        else:
+            self.banco_cenarios.carregar([ambiente])
+        banco = self.banco_cenarios
+        futuros = {
+            self.pool.submit(avaliar_no_banco_cronometrado,
+                             (individuos[i].arvore_aceleracao, individuos[i].arvore_rotacao),
+                             configuracao, banco.descritor, 0, semente,
+                             conformidade and conformidade[i]): i
+            for i in ordem}
+        resultados = [None] * len(individuos)
+        tarefas = []  # (processo, início, fim)
+        for futuro in futuros:
+            fitness, passos, pid, t0, t1, conferido = futuro.result()
+            i = futuros[futuro]
+            resultados[i] = (fitness, passos)
+            self.avaliador.incorporar_conformidade(conferido)
+            tarefas.append((pid, t0, t1))
+            self.previsor_custo.adicionar(individuos[i], passos, t1 - t0)
+        fim = time.monotonic()
+        self.previsor_custo.treinar()
+        self.registrar_balanceamento(tarefas, inicio, fim, previsao,
+                                     [t1 - t0 for _, t0, t1 in tarefas], ordem)
+        return resultados
+
+    def registrar_balanceamento(self, tarefas, inicio, fim, previsao, duracoes, ordem):
+        """
+        Utilização de cada processo (tempo ocupado / duração da geração) e
+        cauda: do primeiro processo que fica sem trabalho até o fim da última
+        tarefa, o tempo em que há núcleos parados esperando a geração acabar.
+        """
+        ocupado, ultimo_fim = {}, {}
+        for pid, t0, t1 in tarefas:
+            ocupado[pid] = ocupado.get(pid, 0.0) + (t1 - t0)
+            ultimo_fim[pid] = max(ultimo_fim.get(pid, t0), t1)
+        duracao = max(fim - inicio, 1e-9)
+        utilizacao = [ocupado[pid] / duracao for pid in sorted(ocupado)]
+        utilizacao += [0.0] * (self.n_processos - len(utilizacao))  # processos sem tarefa
+        cauda = fim - min(ultimo_fim.values()) if len(ultimo_fim) == self.n_processos else duracao
+        reais = np.array(duracoes)[np.argsort(ordem)]  # de volta à ordem dos indivíduos
+        self.balanceamento.append({
+            'duracao':         duracao,
+            'utilizacao':      utilizacao,
+            'utilizacao_media': float(np.mean(utilizacao)),
+            'cauda':           cauda,
+            'tarefa_p95':      float(np.percentile(duracoes, 95)),
+            'precisao_custo':  float(np.corrcoef(previsao, reais)[0, 1])
+                               if len(reais) > 2 and np.ptp(previsao) > 0 else float('nan'),
+        })
+
+    def encerrar_processos(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.banco_cenarios is not None:
+            self.banco_cenarios.fechar()
+            self.banco_cenarios = None
+
+    def diversidade_estrutural(self, populacao):
         serials = [
             json.dumps(ind.arvore_aceleracao) + json.dumps(ind.arvore_rotacao)
-            for ind in self.populacao
+            for ind in populacao
         ]
         divers_list = []
         for i, s1 in enumerate(serials):
@@ -983,27 +3009,67 @@ class ProgramacaoGenetica:
                 for j, s2 in enumerate(serials) if i != j
             ]
             divers_list.append(1.0 - np.mean(sims) if sims else 0.0)
-        diversidade_media = float(np.mean(divers_list))
+        return float(np.mean(divers_list))
+
+    def registrar_tamanhos(self, populacao):
+        tamanhos = [ind.tamanho() for ind in populacao]
+        self.tamanho_medio.append(float(np.mean(tamanhos)))
+        self.tamanho_max.append(int(max(tamanhos)))
+
+    def aptidao_selecao(self, individuo):
+        """Fitness usado na seleção: com parcimônia, descontado pelo tamanho."""
+        if self.parcimonia:
+            return individuo.fitness - self.parcimonia * individuo.tamanho()
+        return individuo.fitness
+
+    def respeita_limites(self, individuo):
+        if self.max_nos is not None and individuo.tamanho() > self.max_nos:
+            return False
+        if self.profundidade_max is not None:
+            return (individuo.profundidade_no(individuo.arvore_aceleracao) <= self.profundidade_max
+                    and individuo.profundidade_no(individuo.arvore_rotacao) <= self.profundidade_max)
+        return True
+
+    def individuo_aleatorio(self, tentativas=100):
+        """Indivíduo novo dentro dos limites (o gerador já respeita a profundidade; max_nos não)."""
+        for _ in range(tentativas):
+            individuo = IndividuoPG(self.profundidade)
+            if self.respeita_limites(individuo):
+                return individuo
+        raise ValueError(f"max_nos={self.max_nos} é pequeno demais para árvores de "
+                         f"profundidade {self.profundidade}")
+
+    def gerar_filho(self, p1, p2, prob_mut):
+        """Crossover + mutação, respeitando os limites de tamanho."""
+        filho = p1.crossover(p2).limpar_orfaos()
+        filho.mutacao(probabilidade=prob_mut)
+        if not self.respeita_limites(filho):
+            self.filhos_rejeitados += 1
+            filho = IndividuoPG.de_arvores(copy.deepcopy(p1.arvore_aceleracao),
+                                           copy.deepcopy(p1.arvore_rotacao),
+                                           p1.profundidade)
+        passos_pais = [p.passos for p in (p1, p2) if p.passos is not None]
+        if passos_pais:
+            filho.passos_pais = sum(passos_pais) / len(passos_pais)
+        return filho
 
-        # Atualiza históricos
-        self.historico_fitness.append(float(max(fitness_vals)))
-        self.media_fitness.append(media)
-        self.std_fitness.append(std)
-        self.diversidade.append(diversidade_media)
-
-        # Atualiza melhor indivíduo
-        best_idx = int(np.argmax(fitness_vals))
-        self.melhor_individuo = self.populacao[best_idx]
-        self.melhor_fitness   = fitness_vals[best_idx]
+    def torneio(self, populacao, tamanho_torneio=3):
+        vencedor = lambda: max(random.sample(populacao, min(tamanho_torneio, len(populacao))),
+                               key=self.aptidao_selecao)
+        if not self.torneio_duplo:
+            return vencedor()
+        a, b = vencedor(), vencedor()
+        menor, maior = sorted((a, b), key=lambda ind: ind.tamanho())
+        return menor if random.random() < self.pressao_tamanho else maior
 
     def selecionar_roleta(self):
-        total_fit = sum(ind.fitness for ind in self.populacao)
+        total_fit = sum(self.aptidao_selecao(ind) for ind in self.populacao)
         selecionados = []
         for _ in range(self.tamanho_populacao):
             pick = random.uniform(0, total_fit)
             acumulado = 0.0
             for ind in self.populacao:
-                acumulado += ind.fitness
+                acumulado += self.aptidao_selecao(ind)
                 if acumulado >= pick:
                     selecionados.append(ind)
                     break
@@ -1014,56 +3080,541 @@ class ProgramacaoGenetica:
             return self.selecionar_roleta()
 
         # seleção por torneio (padrão)
-        tamanho_torneio = 3
-        selecionados = []
-        for _ in range(self.tamanho_populacao):
-            torneio = random.sample(self.populacao, tamanho_torneio)
-            vencedor = max(torneio, key=lambda x: x.fitness)
-            selecionados.append(vencedor)
-        return selecionados
+        return [self.torneio(self.populacao) for _ in range(self.tamanho_populacao)]
     
-    def evoluir(self, n_geracoes: int = 50):
-        prob_mut_inicial = 0.1   # taxa inicial de mutação
-        k = 0.05                 # fator de decaimento exponencial
-
-        for geracao in range(n_geracoes):
-            print(f"Geração {geracao+1}/{n_geracoes}")
-            # 1) Avalia população e registra melhor fitness
-            self.avaliar_populacao()
-            # self.historico_fitness.append(self.melhor_fitness)
+    def evoluir(self, n_geracoes: int = 50, porta_metricas: int = None,
+                ao_vivo: bool = False):
+        for geracao, registro in enumerate(self.evoluir_iter(n_geracoes, porta_metricas, ao_vivo), 1):
+            print(f"Geração {geracao}/{n_geracoes}")
             print(f"  Melhor fitness: {self.melhor_fitness:.2f} | "
-                  f"Média: {self.media_fitness[-1]:.2f} ±{self.std_fitness[-1]:.2f} | "
-                  f"Div: {self.diversidade[-1]:.2f}")
+                  f"Média: {registro['media']:.2f} ±{registro['std']:.2f} | "
+                  f"Div: {registro['diversidade']:.2f} | "
+                  f"Dup: {registro['duplicatas']:.0%} | "
+                  f"Passos/ep: {registro['passos_medios']:.0f} | "
+                  f"Nós: {registro['tamanho_medio']:.0f}/{registro['tamanho_max']}")
+            if self.n_processos > 1 and self.balanceamento:
+                balanco = self.balanceamento[-1]
+                print(f"  Processos: utilização {balanco['utilizacao_media']:.0%} "
+                      f"(mín {min(balanco['utilizacao']):.0%}) | "
+                      f"cauda {balanco['cauda']:.2f}s de {balanco['duracao']:.2f}s | "
+                      f"tarefa p95 {balanco['tarefa_p95']:.2f}s")
+            if self.substituto is not None:
+                substituto = self.substituto
+                if not substituto.pronto:
+                    estado = f" (treinando: {len(substituto.X)}/{substituto.min_amostras} amostras)"
+                elif not substituto.confiavel:
+                    estado = " (pré-triagem desligada)"
+                else:
+                    estado = ""
+                print(f"  Substituto: postos ρ={self.precisao_substituto[-1]:.2f} | "
+                      f"simulações poupadas: {self.simulacoes_poupadas[-1]}"
+                      f"x{self.avaliador.n_episodios} episódios{estado}")
+            if self.avaliador.conformidade:
+                conformidade = self.avaliador.relatorio_conformidade()
+                print(f"  Conformidade: {conformidade['episodios_conferidos']} episódios conferidos | "
+                      f"divergências: {conformidade['divergencias']} | "
+                      f"custo {conformidade['custo']:.1%}")
 
-            # 2) Calcula elites (mantém self.elite_size definido no __init__)
-            if self.elite_size <= 1:
-                elite_count = max(1, int(self.elite_size * self.tamanho_populacao))
-            else:
-                elite_count = int(self.elite_size)
-            elites = sorted(self.populacao, key=lambda ind: ind.fitness, reverse=True)[:elite_count]
+        return self.melhor_individuo, self.historico_fitness
 
-            # 3) Seleciona pais (torneio ou roleta)
-            pais = self.selecionar()
+    def evoluir_iter(self, n_geracoes: int = None, porta_metricas: int = None,
+                     ao_vivo: bool = False):
+        """
+        Versão incremental de `evoluir`: roda uma geração por iteração e
+        devolve um registro com as métricas dela. Quem consome pode gravar
+        os registros, parar a qualquer momento (break) ou alterar parâmetros
+        (metodo_selecao, elite_size, prob_mut_inicial, ...) entre gerações.
+        Sem `n_geracoes` roda até ser interrompido. A contagem de gerações
+        (self.geracao), que rege o decaimento da mutação, continua de uma
+        chamada para a outra. Com `porta_metricas`,
+        as métricas mais recentes ficam em http://127.0.0.1:<porta>/metrics.
+        Com `ao_vivo` (True ou um VisualizadorAoVivo já criado) o melhor de
+        cada geração é enviado ao visualizador em processo separado; só o
+        criado aqui é fechado no fim.
+        """
+        servidor = ServidorMetricas(porta_metricas) if porta_metricas is not None else None
+        visualizador = None
+        proprio = False  # visualizador criado aqui, que fecha junto com o laço
+        if ao_vivo:
+            proprio = not isinstance(ao_vivo, VisualizadorAoVivo)
+            visualizador = VisualizadorAoVivo() if proprio else ao_vivo
+        geracao = 0
+        try:
+            while n_geracoes is None or geracao < n_geracoes:
+                inicio = time.perf_counter()
+                # 1) Avalia população e registra melhor fitness
+                self.avaliar_populacao()
+                fim_avaliacao = time.perf_counter()
+
+                # 2) Calcula elites (mantém self.elite_size definido no __init__)
+                if self.elite_size <= 1:
+                    elite_count = max(1, int(self.elite_size * self.tamanho_populacao))
+                else:
+                    elite_count = int(self.elite_size)
+                # só fitness simulados: uma superestimativa do substituto
+                # não vira elite sem ter sido simulada
+                reais = [ind for ind in self.populacao if not ind.estimado]
+                elites = sorted(reais, key=lambda ind: ind.fitness, reverse=True)[:elite_count]
+                self.elites = elites
+                if self.hall_da_fama is not None:
+                    self.hall_da_fama.adicionar_populacao(elites, self.fitness_referencia)
+
+                # 3) Seleciona pais (torneio ou roleta)
+                pais = self.selecionar()
+
+                # 4) Gera nova população, mantendo elites
+                nova_pop = elites.copy()
+                while len(nova_pop) < self.tamanho_populacao:
+                    p1, p2 = random.sample(pais, 2)
+                    # mutação com taxa adaptativa
+                    prob_mut = self.prob_mut_inicial * math.exp(-self.decaimento_mutacao * self.geracao)
+                    nova_pop.append(self.gerar_filho(p1, p2, prob_mut))
+
+                self.populacao = nova_pop
+                fim = time.perf_counter()
+                geracao += 1
+                self.geracao += 1
+
+                registro = {
+                    'geracao':          self.geracao,
+                    'melhor':           self.historico_fitness[-1],
+                    'media':            self.media_fitness[-1],
+                    'std':              self.std_fitness[-1],
+                    'diversidade':      self.diversidade[-1],
+                    'tempo_avaliacao':  fim_avaliacao - inicio,
+                    'tempo_reproducao': fim - fim_avaliacao,
+                    'tempo_total':      fim - inicio,
+                    'avaliacoes':       self.avaliacoes[-1],
+                    'episodios':        self.avaliacoes[-1] * self.avaliador.n_episodios,
+                    'acertos_cache':    self.acertos_cache[-1],
+                    'estimados':        self.simulacoes_poupadas[-1] if self.substituto is not None else 0,
+                    'duplicatas':       self.duplicatas_semanticas[-1],
+                    'passos_medios':    self.passos_medios[-1],
+                    'tamanho_melhor':   self.melhor_individuo.tamanho(),
+                    'tamanho_medio':    self.tamanho_medio[-1],
+                    'tamanho_max':      self.tamanho_max[-1],
+                }
+                if servidor is not None:
+                    servidor.atualizar(registro)
+                if visualizador is not None:
+                    visualizador.publicar(self, self.geracao)
+                yield registro
+        finally:
+            self.encerrar_processos()
+            if servidor is not None:
+                servidor.encerrar()
+            if self.hall_da_fama is not None and self.hall_da_fama.arquivo:
+                self.hall_da_fama.salvar()
+            if proprio:
+                visualizador.fechar()
+
+    def evoluir_com_orcamento(self, segundos: float,
+                              arquivo_checkpoint: str = 'melhor_robo_parcial.json',
+                              fracao_calibracao: float = 0.05,
+                              geracoes_min: int = 20,
+                              margem: float = 0.05,
+                              porta_metricas: int = None):
+        """
+        Evolução limitada por tempo de relógio. As primeiras gerações, com a
+        fidelidade atual, servem de calibração: medem passos/s e avaliações/s
+        nesta máquina. Com isso escolhe o número de gerações e a fidelidade
+        da avaliação (episódios por indivíduo e horizonte do episódio) que
+        cabem no tempo restante, reduzindo a fidelidade só se ela não
+        permitir `geracoes_min` gerações. Antes de cada geração confere se a
+        próxima ainda cabe no prazo; o melhor até agora, pontuado no cenário
+        de referência (fitness_referencia, comparável entre gerações e
+        fidelidades), é salvo em `arquivo_checkpoint` sempre que melhora.
+        O plano e o tempo previsto
+        versus o real ficam em self.plano_orcamento. A fidelidade escolhida
+        vale só para esta chamada: n_episodios e horizonte do avaliador são
+        restaurados ao final.
+        """
+        inicio = time.perf_counter()
+        prazo = inicio + segundos * (1 - margem)
+        geracoes = self.evoluir_iter(None, porta_metricas)
+        melhor_salvo = [float('-inf')]
+        fidelidade_original = (self.avaliador.n_episodios, self.avaliador.horizonte)
+
+        def salvar_checkpoint():
+            if not arquivo_checkpoint:
+                return
+            fitness = self.fitness_referencia(self.melhor_individuo)
+            if fitness > melhor_salvo[0]:
+                temporario = arquivo_checkpoint + '.tmp'
+                self.melhor_individuo.salvar(temporario)
+                os.replace(temporario, arquivo_checkpoint)
+                melhor_salvo[0] = fitness
+
+        try:
+            # 1) Calibração com a fidelidade atual (no máximo 3 gerações)
+            calibracao = []
+            while not calibracao or (
+                    len(calibracao) < 3
+                    and time.perf_counter() - inicio < fracao_calibracao * segundos):
+                calibracao.append(next(geracoes))
+                salvar_checkpoint()
+            tempo_calibracao = time.perf_counter() - inicio
+
+            tempo_avaliacao = sum(reg['tempo_avaliacao'] for reg in calibracao)
+            passos = sum(reg['episodios'] * reg['passos_medios'] for reg in calibracao)
+            avaliacoes = sum(reg['avaliacoes'] for reg in calibracao)
+            passos_por_seg = passos / max(tempo_avaliacao, 1e-9)
+            avaliacoes_por_seg = avaliacoes / max(tempo_avaliacao, 1e-9)
+            avaliacoes_geracao = avaliacoes / len(calibracao)
+            passos_episodio = passos / max(1, sum(reg['episodios'] for reg in calibracao))
+            tempo_reproducao = sum(reg['tempo_reproducao'] for reg in calibracao) / len(calibracao)
+
+            # 2) Plano: maior fidelidade que ainda permite geracoes_min gerações
+            n_episodios = self.avaliador.n_episodios
+            horizonte_max = self.avaliador.horizonte or Ambiente.MAX_TEMPO
+            candidatos = sorted(
+                ((n, h) for n in range(n_episodios, 0, -1)
+                 for h in (horizonte_max, horizonte_max * 3 // 4, horizonte_max // 2)),
+                key=lambda c: c[0] * c[1], reverse=True)
+            restante = prazo - time.perf_counter()
+            for n, h in candidatos:
+                custo_geracao = (avaliacoes_geracao * n * min(passos_episodio, h)
+                                 / passos_por_seg + tempo_reproducao)
+                n_geracoes = max(0, int(restante // custo_geracao))
+                if n_geracoes >= geracoes_min:
+                    break
+
+            self.avaliador.n_episodios = n
+            self.avaliador.horizonte = None if h == horizonte_max else h
+
+            self.plano_orcamento = {
+                'orcamento':          segundos,
+                'tempo_calibracao':   tempo_calibracao,
+                'geracoes_calibracao': len(calibracao),
+                'passos_por_seg':     passos_por_seg,
+                'avaliacoes_por_seg': avaliacoes_por_seg,
+                'n_episodios':        n,
+                'horizonte':          h,
+                'geracoes_planejadas': n_geracoes,
+                'custo_previsto':     custo_geracao,
+                'geracoes':           [],   # (previsto, real) por geração
+            }
+            print(f"Calibração: {len(calibracao)} gerações em {tempo_calibracao:.1f}s | "
+                  f"{passos_por_seg:.0f} passos/s | {avaliacoes_por_seg:.1f} avaliações/s")
+            print(f"Plano: {n_geracoes} gerações x {custo_geracao:.2f}s | "
+                  f"{n} episódios | horizonte {h} passos | "
+                  f"{restante:.1f}s disponíveis")
+
+            # 3) Execução até o prazo, sem começar uma geração que não caiba
+            #    nele; se as gerações saírem mais baratas que o previsto, o
+            #    tempo que sobra vira gerações extras
+            estimativa = custo_geracao
+            while time.perf_counter() + estimativa <= prazo:
+                registro = next(geracoes)
+                salvar_checkpoint()
+                self.plano_orcamento['geracoes'].append((custo_geracao, registro['tempo_total']))
+                # episódios ficam mais longos conforme a população melhora,
+                # então a estimativa segue as últimas gerações reais
+                estimativa = max(real for _, real in self.plano_orcamento['geracoes'][-3:])
+        finally:
+            geracoes.close()
+            self.avaliador.n_episodios, self.avaliador.horizonte = fidelidade_original
+
+        reais = [real for _, real in self.plano_orcamento['geracoes']]
+        self.plano_orcamento['tempo_total'] = time.perf_counter() - inicio
+        print(f"Orçamento: {len(reais)} gerações (planejadas {n_geracoes}) | previsto "
+              f"{custo_geracao * len(reais):.1f}s, real {sum(reais):.1f}s | "
+              f"total {self.plano_orcamento['tempo_total']:.1f}s de {segundos:.1f}s")
+
+        return self.melhor_individuo, self.historico_fitness
+
+    def evoluir_fragmentado(self, n_geracoes: int = 50, tamanho_lote: int = 1000,
+                            tamanho_fragmento: int = 10000):
+        """
+        Evolução geracional com a população em disco (PopulacaoFragmentada
+        em `populacao_em_disco`), para populações grandes demais para a
+        lista em memória. A avaliação é feita em lotes de `tamanho_lote`
+        indivíduos; seleção e elitismo usam só o índice de fitness, e os
+        pais são lidos do disco ao gerar cada filho. A memória fica limitada
+        pelo lote, pelo cache de pais e pelo índice.
+
+        Sem deduplicação semântica nem substituto (ambos guardam estado por
+        indivíduo); a diversidade é estimada em uma amostra. Como em
+        evoluir_iter, a contagem de gerações (self.geracao), que rege o
+        decaimento da mutação, continua de uma chamada para a outra. A
+        última geração, já avaliada, fica em disco em
+        self.populacao_fragmentada (a de uma chamada anterior é apagada); se
+        a evolução falhar, os fragmentos criados são apagados.
+        """
+        if self.populacao_em_disco is None:
+            raise ValueError("evoluir_fragmentado exige populacao_em_disco no construtor")
+        if self.avaliador.gravador is not None:
+            raise ValueError("gravação de trajetórias não é suportada com população em disco")
+        n = self.tamanho_populacao
+        diretorio = lambda g: os.path.join(self.populacao_em_disco, f"geracao_{g % 2}")
+
+        if self.populacao_fragmentada is not None:
+            self.populacao_fragmentada.apagar()
+            self.populacao_fragmentada = None
+
+        populacao = nova = None
+        try:
+            # 1) População inicial gerada direto no disco (hall da fama primeiro)
+            populacao = PopulacaoFragmentada(diretorio(0), n, self.profundidade, tamanho_fragmento)
+            if self.hall_da_fama is not None and len(self.hall_da_fama):
+                for individuo in self.hall_da_fama.melhores(round(self.fracao_hall * n), self.profundidade):
+                    if not self.respeita_limites(individuo):
+                        continue
+                    individuo.fitness = 0
+                    populacao.adicionar(individuo)
+            while len(populacao) < n:
+                populacao.adicionar(self.individuo_aleatorio())
+
+            for geracao in range(n_geracoes):
+                # 2) Avaliação em lotes, no cenário da geração
+                semente_cenario = random.randrange(2**31)
+                semente = random.randrange(2**31) if self.cenarios_deterministicos else None
+                self.cenario_atual = (semente_cenario, semente)
+                total_passos = 0
+                for inicio, lote in populacao.lotes(tamanho_lote):
+                    for k, (fitness, passos) in enumerate(
+                            self.simular_lote(lote, semente_cenario, semente)):
+                        populacao.fitness[inicio + k] = fitness
+                        populacao.passos[inicio + k] = passos
+                        total_passos += passos
+
+                fitness = populacao.fitness[:n]
+                tamanhos = populacao.tamanhos[:n]
+                melhor = int(np.argmax(fitness))
+                self.melhor_individuo = populacao.ler(melhor)
+                self.melhor_fitness   = float(fitness[melhor])
+                amostra = [populacao.ler(i) for i in random.sample(range(n), min(n, 30))]
+                self.historico_fitness.append(self.melhor_fitness)
+                self.media_fitness.append(float(fitness.mean()))
+                self.std_fitness.append(float(fitness.std()))
+                self.diversidade.append(self.diversidade_estrutural(amostra))
+                self.passos_medios.append(total_passos / (n * self.avaliador.n_episodios))
+                self.duplicatas_semanticas.append(0.0)
+                self.acertos_cache.append(0)
+                self.avaliacoes.append(n)
+                self.tamanho_medio.append(float(tamanhos.mean()))
+                self.tamanho_max.append(int(tamanhos.max()))
+                print(f"Geração {geracao + 1}/{n_geracoes}")
+                print(f"  Melhor fitness: {self.melhor_fitness:.2f} | "
+                      f"Média: {self.media_fitness[-1]:.2f} ±{self.std_fitness[-1]:.2f} | "
+                      f"Div: {self.diversidade[-1]:.2f} | "
+                      f"Passos/ep: {self.passos_medios[-1]:.0f} | "
+                      f"Nós: {self.tamanho_medio[-1]:.0f}/{self.tamanho_max[-1]}")
+                if geracao == n_geracoes - 1:
+                    self.geracao += 1
+                    break
 
-            # 4) Gera nova população, mantendo elites
-            nova_pop = elites.copy()
-            while len(nova_pop) < self.tamanho_populacao:
-                p1, p2 = random.sample(pais, 2)
-                filho = p1.crossover(p2)
-                # mutação com taxa adaptativa
-                prob_mut = prob_mut_inicial * math.exp(-k * geracao)
-                filho.mutacao(probabilidade=prob_mut)
-                nova_pop.append(filho)
+                # 3) Elites e pais escolhidos só pelo índice
+                if self.elite_size <= 1:
+                    elite_count = max(1, int(self.elite_size * n))
+                else:
+                    elite_count = int(self.elite_size)
+                elites = np.argsort(-fitness, kind='stable')[:elite_count]
+                if self.hall_da_fama is not None:
+                    self.hall_da_fama.adicionar_populacao(
+                        [populacao.ler(int(i)) for i in elites], self.fitness_referencia)
+                pais = self.selecionar_indices(fitness, tamanhos, 2 * (n - elite_count))
+                pais = pais.reshape(-1, 2)
+                pais = pais[np.argsort(pais[:, 0], kind='stable')]  # leituras mais sequenciais
+
+                # 4) Nova população escrita no outro diretório
+                nova = PopulacaoFragmentada(diretorio(geracao + 1), n, self.profundidade,
+                                            tamanho_fragmento)
+                for i in elites:
+                    nova.adicionar(populacao.ler(int(i)))
+                prob_mut = self.prob_mut_inicial * math.exp(-self.decaimento_mutacao * self.geracao)
+                for i, j in pais:
+                    nova.adicionar(self.gerar_filho(populacao.ler(int(i)),
+                                                    populacao.ler(int(j)), prob_mut))
+                populacao.apagar()
+                populacao, nova = nova, None
+                self.geracao += 1
+            populacao.fechar()
+            self.populacao_fragmentada, populacao = populacao, None
+        finally:
+            if populacao is not None:
+                populacao.apagar()
+            if nova is not None:
+                nova.apagar()
+            self.encerrar_processos()
+            if self.hall_da_fama is not None and self.hall_da_fama.arquivo:
+                self.hall_da_fama.salvar()
 
-            self.populacao = nova_pop
+        return self.melhor_individuo, self.historico_fitness
 
+    def selecionar_indices(self, fitness, tamanhos, n_pais):
+        """Seleção (torneio ou roleta) vetorizada sobre os arrays do índice."""
+        rng = np.random.default_rng(random.randrange(2**32))
+        aptidao = fitness - self.parcimonia * tamanhos if self.parcimonia else fitness
+        if self.metodo_selecao == 'roleta':
+            pesos = aptidao - aptidao.min() + 1e-9
+            return rng.choice(len(fitness), size=n_pais, p=pesos / pesos.sum())
+
+        def torneio():
+            candidatos = rng.integers(0, len(fitness), size=(n_pais, 3))
+            return candidatos[np.arange(n_pais), np.argmax(aptidao[candidatos], axis=1)]
+        vencedores = torneio()
+        if self.torneio_duplo:
+            outros = torneio()
+            menor = np.where(tamanhos[vencedores] <= tamanhos[outros], vencedores, outros)
+            maior = np.where(tamanhos[vencedores] <= tamanhos[outros], outros, vencedores)
+            vencedores = np.where(rng.random(n_pais) < self.pressao_tamanho, menor, maior)
+        return vencedores
+
+    def evoluir_estado_estacionario(self,
+                                    n_avaliacoes: int = 2500,
+                                    n_processos: int = None,
+                                    substituicao: str = 'pior',
+                                    intervalo_estatisticas: int = None):
+        """
+        Evolução em estado estacionário, sem barreira entre gerações: um
+        conjunto de processos fica sempre ocupado e, assim que uma avaliação
+        termina, o indivíduo entra na população (substituindo o pior ou o
+        perdedor de um torneio inverso) e um novo descendente é enviado.
+
+        As estatísticas são registradas a cada `intervalo_estatisticas`
+        avaliações (padrão: tamanho da população), nos mesmos históricos de
+        `evoluir`, para que as curvas sejam comparáveis. O cenário também
+        muda a cada intervalo, como muda a cada geração no modo geracional;
+        por isso o melhor de cada intervalo é pontuado no cenário de
+        referência (fitness_referencia) e só então comparado com o melhor
+        até agora, que fica em melhor_individuo/melhor_fitness.
+        """
+        if self.avaliador.gravador is not None:
+            raise ValueError("gravação de trajetórias não é suportada no estado estacionário")
+        if self.tamanho_populacao < 2:
+            # cada descendente precisa de dois pais já avaliados na população
+            raise ValueError(f"o estado estacionário precisa de tamanho_populacao >= 2 "
+                             f"(recebido {self.tamanho_populacao})")
+        n_processos = n_processos or os.cpu_count() or 1
+        intervalo = intervalo_estatisticas or self.tamanho_populacao
+        tamanho_torneio = 3
+        semente_base = random.randrange(2**31)
+
+        avaliador = self.avaliador
+        configuracao = avaliador.configuracao()
+
+        a_enviar = list(self.populacao)  # população inicial ainda não avaliada
+        populacao = []
+        pendentes = {}
+        enviados = concluidos = 0
+        proximo_registro = intervalo
+        passos_bloco = simulados_bloco = repetidos_bloco = 0
+        cache = {}  # (cenário, assinatura) -> (fitness, passos)
+        campeoes = {}     # bloco -> melhor indivíduo avaliado no cenário do bloco
+        em_aberto = {}    # bloco -> avaliações enviadas e ainda não concluídas
+
+        def proximo_individuo():
+            if a_enviar:
+                return a_enviar.pop()
+            # mutação com taxa adaptativa, em "gerações equivalentes"
+            prob_mut = self.prob_mut_inicial * math.exp(
+                -self.decaimento_mutacao * concluidos / self.tamanho_populacao)
+            return self.gerar_filho(self.torneio(populacao, tamanho_torneio),
+                                    self.torneio(populacao, tamanho_torneio), prob_mut)
+
+        def inserir(individuo):
+            if len(populacao) < self.tamanho_populacao:
+                populacao.append(individuo)
+                return
+            if substituicao == 'torneio':
+                candidatos = random.sample(range(len(populacao)),
+                                           min(tamanho_torneio, len(populacao)))
+                alvo = min(candidatos, key=lambda i: populacao[i].fitness)
+            else:
+                alvo = min(range(len(populacao)), key=lambda i: populacao[i].fitness)
+                if individuo.fitness < populacao[alvo].fitness:
+                    return
+            populacao[alvo] = individuo
+
+        def concluir(individuo, bloco):
+            nonlocal concluidos
+            concluidos += 1
+            inserir(individuo)
+            if bloco not in campeoes or individuo.fitness > campeoes[bloco].fitness:
+                campeoes[bloco] = individuo
+            em_aberto[bloco] -= 1
+            # bloco fechado: todas as avaliações dele já voltaram
+            if em_aberto[bloco] == 0 and (enviados >= (bloco + 1) * intervalo
+                                          or enviados >= n_avaliacoes):
+                campeao = campeoes.pop(bloco)
+                fitness = self.fitness_referencia(campeao)
+                if fitness > self.melhor_fitness:
+                    self.melhor_fitness   = fitness
+                    self.melhor_individuo = campeao
+
+        def registrar_estatisticas():
+            nonlocal passos_bloco, simulados_bloco, repetidos_bloco
+            fitness_vals = [ind.fitness for ind in populacao]
+            self.historico_fitness.append(float(max(fitness_vals)))
+            self.media_fitness.append(float(np.mean(fitness_vals)))
+            self.std_fitness.append(float(np.std(fitness_vals)))
+            self.diversidade.append(self.diversidade_estrutural(populacao))
+            self.passos_medios.append(
+                passos_bloco / (max(1, simulados_bloco) * avaliador.n_episodios))
+            self.duplicatas_semanticas.append(repetidos_bloco / intervalo)
+            self.acertos_cache.append(repetidos_bloco)
+            self.registrar_tamanhos(populacao)
+            passos_bloco = simulados_bloco = repetidos_bloco = 0
+            print(f"Avaliações {concluidos}/{n_avaliacoes}")
+            print(f"  Melhor fitness: {self.historico_fitness[-1]:.2f} | "
+                  f"Média: {self.media_fitness[-1]:.2f} ±{self.std_fitness[-1]:.2f} | "
+                  f"Div: {self.diversidade[-1]:.2f} | "
+                  f"Dup: {self.duplicatas_semanticas[-1]:.0%} | "
+                  f"Passos/ep: {self.passos_medios[-1]:.0f}")
+
+        with ProcessPoolExecutor(max_workers=n_processos) as pool:
+            while concluidos < n_avaliacoes:
+                # 1) Mantém os processos ocupados
+                while (len(pendentes) < 2 * n_processos and enviados < n_avaliacoes
+                       and (a_enviar or len(populacao) >= 2)):
+                    individuo = proximo_individuo()
+                    bloco = enviados // intervalo
+                    enviados += 1
+                    em_aberto[bloco] = em_aberto.get(bloco, 0) + 1
+                    chave = None
+                    if self.deduplicacao_semantica:
+                        chave = (bloco, individuo.assinatura_semantica(self.banco_sondas))
+                        if chave in cache:
+                            individuo.fitness = cache[chave][0]
+                            repetidos_bloco += 1
+                            concluir(individuo, bloco)
+                            continue
+                    conformidade = avaliador.conformidade_para_processo(
+                        avaliador.rng_conformidade.randrange(2**31)) if avaliador.conformidade else None
+                    futuro = pool.submit(
+                        avaliar_em_processo_conferido,
+                        (individuo.arvore_aceleracao, individuo.arvore_rotacao),
+                        configuracao, semente_base + bloco, semente_base + 7919 * bloco,
+                        conformidade)
+                    pendentes[futuro] = (individuo, chave, bloco)
+
+                # 2) Insere o que terminar primeiro (retorna na hora se não houver pendentes)
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    individuo, chave, bloco = pendentes.pop(futuro)
+                    individuo.fitness, passos, conferido = futuro.result()
+                    avaliador.incorporar_conformidade(conferido)
+                    if chave is not None:
+                        cache[chave] = (individuo.fitness, passos)
+                    passos_bloco    += passos
+                    simulados_bloco += 1
+                    concluir(individuo, bloco)
+
+                # 3) Estatísticas a cada `intervalo` avaliações
+                while concluidos >= proximo_registro:
+                    registrar_estatisticas()
+                    proximo_registro += intervalo
+
+        self.populacao = populacao
         return self.melhor_individuo, self.historico_fitness
 
     def plotar_estatisticas(self, arquivo_png):
 
         gens = list(range(1, len(self.media_fitness) + 1))
-        plt.figure(figsize=(10,6))
+        plt.figure(figsize=(10,8))
 
+        plt.subplot(2, 1, 1)
         plt.plot(gens, self.historico_fitness, label='Melhor fitness',       linewidth=2)
         plt.plot(gens, self.media_fitness,   label='Média da população',   linestyle='--')
         plt.fill_between(gens,
@@ -1078,6 +3629,15 @@ class ProgramacaoGenetica:
         plt.ylabel('Valor')
         plt.legend()
         plt.grid(True)
+
+        # Tamanho das árvores (bloat)
+        plt.subplot(2, 1, 2)
+        plt.plot(gens, self.tamanho_medio, label='Tamanho médio')
+        plt.plot(gens, self.tamanho_max,   label='Tamanho máximo', linestyle='--')
+        plt.xlabel('Geração')
+        plt.ylabel('Nós por indivíduo')
+        plt.legend()
+        plt.grid(True)
         plt.tight_layout()
         plt.savefig(arquivo_png)
         plt.close()
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from robo_exercicio import IndividuoPG, ProgramacaoGenetica, gerar_banco_sondas
+
+
+def folha(valor=None, variavel=None):
+    if variavel is not None:
+        return {'tipo': 'folha', 'variavel': variavel}
+    return {'tipo': 'folha', 'valor': valor}
+
+
+def operador(op, esquerda, direita):
+    return {'tipo': 'operador', 'operador': op, 'esquerda': esquerda, 'direita': direita}
+
+
+BANCO = gerar_banco_sondas(64)
+
+
+def assinatura(aceleracao, rotacao):
+    return IndividuoPG.de_arvores(aceleracao, rotacao).assinatura_semantica(BANCO)
+
+
+def test_constantes_saturadas_tem_a_mesma_assinatura():
+    # 3 e 4 saturam em 1 na aceleração, 2 e -7 em ±0.5 na rotação
+    assert (assinatura(folha(3.0), folha(2.0)) == assinatura(folha(4.0), folha(2.0)))
+    assert (assinatura(folha(3.0), folha(-7.0)) != assinatura(folha(3.0), folha(2.0)))
+
+
+def test_operandos_trocados_tem_a_mesma_assinatura():
+    soma = operador('+', folha(variavel='angulo_meta'), folha(0.1))
+    trocada = operador('+', folha(0.1), folha(variavel='angulo_meta'))
+    assert assinatura(folha(1.0), soma) == assinatura(folha(1.0), trocada)
+
+
+def test_comportamentos_diferentes_tem_assinaturas_diferentes():
+    assert (assinatura(folha(1.0), folha(variavel='angulo_meta'))
+            != assinatura(folha(1.0), folha(variavel='angulo_recurso')))
+
+
+def test_repetidos_compartilham_a_simulacao():
+    random.seed(0)
+    pg = ProgramacaoGenetica(tamanho_populacao=4, cenarios_deterministicos=True,
+                             deduplicacao_semantica=True, n_sondas=64)
+    pg.avaliador.n_episodios = 1
+    rotacao = operador('+', folha(variavel='angulo_meta'), folha(0.1))
+    pg.populacao = [
+        IndividuoPG.de_arvores(folha(3.0), rotacao),
+        IndividuoPG.de_arvores(folha(4.0), operador('+', folha(0.1), folha(variavel='angulo_meta'))),
+        IndividuoPG.de_arvores(folha(0.5), folha(variavel='angulo_recurso')),
+        IndividuoPG.de_arvores(folha(0.5), folha(variavel='angulo_recurso')),
+    ]
+    pg.avaliar_populacao()
+    assert pg.duplicatas_semanticas[-1] == 0.5
+    assert pg.avaliacoes[-1] == 2
+    assert pg.populacao[0].fitness == pg.populacao[1].fitness
+    assert pg.populacao[2].fitness == pg.populacao[3].fitness
+
+
+def test_sem_deduplicacao_por_padrao():
+    pg = ProgramacaoGenetica(tamanho_populacao=2)
+    assert not pg.deduplicacao_semantica and pg.banco_sondas is None
+
+
+def test_deduplicacao_exige_cenarios_deterministicos():
+    with pytest.raises(ValueError, match='cenarios_deterministicos'):
+        ProgramacaoGenetica(tamanho_populacao=2, deduplicacao_semantica=True)
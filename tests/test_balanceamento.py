@@ -0,0 +1,63 @@
+import random
+from concurrent.futures import Future
+
+import pytest
+
+from robo_exercicio import Ambiente, IndividuoPG, PrevisorCusto, ProgramacaoGenetica, Robo
+
+
+class PoolSequencial:
+    """Executor falso: roda cada tarefa na hora e guarda a ordem de envio."""
+
+    def __init__(self):
+        self.enviados = []
+
+    def submit(self, funcao, *args):
+        self.enviados.append(args[0])
+        futuro = Future()
+        futuro.set_result(funcao(*args))
+        return futuro
+
+    def shutdown(self):
+        pass
+
+
+def test_previsor_usa_passos_proprios_dos_pais_ou_padrao():
+    random.seed(0)
+    previsor = PrevisorCusto()
+    proprio, filho, novo = IndividuoPG(2), IndividuoPG(2), IndividuoPG(2)
+    proprio.passos, filho.passos_pais, previsor.passos_padrao = 800, 400, 50.0
+    a, b = previsor.coeficientes
+    assert previsor.prever([proprio, filho, novo]) == pytest.approx(
+        [passos * (a + b * ind.tamanho())
+         for passos, ind in ((800, proprio), (400, filho), (50.0, novo))])
+
+
+def test_tarefas_enviadas_do_maior_custo_previsto_para_o_menor():
+    random.seed(1)
+    pg = ProgramacaoGenetica(tamanho_populacao=6, profundidade=2, n_processos=2)
+    pg.avaliador.n_episodios = 1
+    individuos = pg.populacao
+    for individuo, passos in zip(individuos, [10, 3000, 200, 1, 900, 50]):
+        individuo.passos = passos
+    previsao = pg.previsor_custo.prever(individuos)
+
+    pool = pg.pool = PoolSequencial()
+    try:
+        resultados = pg.simular_em_processos(individuos, Ambiente.gerar_cenario(2), 7)
+    finally:
+        pg.encerrar_processos()
+
+    posicao = {id(ind.arvore_aceleracao): i for i, ind in enumerate(individuos)}
+    ordem = [posicao[id(aceleracao)] for aceleracao, _ in pool.enviados]
+    assert sorted(ordem) == list(range(6))
+    assert ordem[:2] == [1, 4]  # os mais longos começam primeiro
+    assert list(previsao[ordem]) == sorted(previsao, reverse=True)
+
+    # os resultados voltam na ordem dos indivíduos, não na de envio
+    ambiente = Ambiente.gerar_cenario(2)
+    for individuo, resultado in zip(individuos, resultados):
+        robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+        assert resultado == pg.avaliador.avaliar(individuo, ambiente, robo, 7)
+    assert len(pg.previsor_custo.amostras) == 6
+    assert len(pg.balanceamento) == 1
@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+import pytest
+
+from robo_exercicio import Ambiente, BancoCenarios, ambiente_do_banco
+
+
+@pytest.mark.parametrize('semente', range(4))
+def test_grade_colisao_e_conservadora(semente):
+    ambiente = Ambiente.gerar_cenario(semente)
+    raio, celula = 15, 4
+    grade = ambiente.calcular_grade_colisao(raio, celula)
+    assert grade.shape == (-(-ambiente.altura // celula), -(-ambiente.largura // celula))
+
+    rng = random.Random(semente)
+    livres = np.argwhere(grade == 1)
+    assert len(livres) > 0
+    for iy, ix in livres[rng.sample(range(len(livres)), min(300, len(livres)))]:
+        # cantos e pontos internos da célula: nenhum pode colidir
+        for fx, fy in [(0, 0), (1, 0), (0, 1), (1, 1), (rng.random(), rng.random())]:
+            x, y = (ix + fx) * celula, (iy + fy) * celula
+            assert not ambiente.verificar_colisao(x, y, raio)
+
+
+def test_usar_grade_colisao_liga_atalho_para_o_raio():
+    ambiente = Ambiente.gerar_cenario(0)
+    assert (ambiente.grade_colisao, ambiente.raio_grade, ambiente.celula_grade) == (None, None, None)
+    assert Ambiente.de_layout(ambiente.largura, ambiente.altura, ambiente.obstaculos,
+                              ambiente.recursos, ambiente.meta).raio_grade is None
+
+    grade = ambiente.usar_grade_colisao(15, 4)
+    assert np.array_equal(grade, ambiente.calcular_grade_colisao(15, 4))
+    assert (ambiente.raio_grade, ambiente.celula_grade) == (15, 4)
+
+    exato, copia = Ambiente.gerar_cenario(0), Ambiente.gerar_cenario(0)
+    assert copia.usar_grade_colisao(15, 4, grade) is grade
+    rng = random.Random(0)
+    for _ in range(2000):
+        x, y = rng.uniform(-20, ambiente.largura + 20), rng.uniform(-20, ambiente.altura + 20)
+        for raio in (15, 10):
+            assert copia.verificar_colisao(x, y, raio) == exato.verificar_colisao(x, y, raio)
+
+
+@pytest.mark.parametrize('semente', range(4))
+def test_colisao_pela_grade_igual_a_exata(semente):
+    exato = Ambiente.gerar_cenario(semente)
+    with BancoCenarios([exato]) as banco:
+        pela_grade = ambiente_do_banco(banco.descritor, 0)
+        rng = random.Random(semente)
+        for _ in range(2000):
+            x, y = rng.uniform(-20, exato.largura + 20), rng.uniform(-20, exato.altura + 20)
+            assert pela_grade.verificar_colisao(x, y, 15) == exato.verificar_colisao(x, y, 15)
+
+
+def test_carregar_reaproveita_bloco_e_troca_versao():
+    with BancoCenarios([Ambiente.gerar_cenario(0), Ambiente.gerar_cenario(1)]) as banco:
+        nome, versao = banco.descritor['nome'], banco.descritor['versao']
+        antigo = ambiente_do_banco(banco.descritor, 0)
+
+        novo = Ambiente.gerar_cenario(7)
+        banco.carregar([novo])
+        assert banco.descritor['nome'] == nome
+        assert banco.descritor['versao'] == versao + 1
+        assert len(banco) == 1
+
+        montado = ambiente_do_banco(banco.descritor, 0)
+        assert montado is not antigo
+        assert montado.obstaculos == novo.obstaculos
+        assert [(r['x'], r['y']) for r in montado.recursos] == \
+               [(r['x'], r['y']) for r in novo.recursos]
+        assert np.array_equal(montado.grade_colisao, novo.calcular_grade_colisao(15, 4))
+
+
+def test_carregar_realoca_quando_nao_cabe():
+    with BancoCenarios([Ambiente.gerar_cenario(0)]) as banco:
+        tamanho = banco.shm.size
+        banco.carregar([Ambiente.gerar_cenario(s) for s in range(5)])
+        assert banco.shm.size > tamanho
+        assert len(banco) == 5
+        for i in range(5):
+            assert ambiente_do_banco(banco.descritor, i).obstaculos == \
+                   Ambiente.gerar_cenario(i).obstaculos
@@ -0,0 +1,123 @@
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+from broker_avaliacao import BrokerAvaliacao, ClienteBroker, EstadoCliente
+from robo_exercicio import AvaliadorFitness, IndividuoPG, avaliar_em_processo
+
+CONFIGURACAO = {'n_episodios': 1}
+
+
+def parte(lote, ids, fim=True):
+    return {'tipo': 'lote', 'lote': lote, 'cenario': 1, 'semente': 2, 'fim': fim,
+            'avaliador': CONFIGURACAO,
+            'tarefas': [{'id': i, 'arvores': [None, None]} for i in ids]}
+
+
+def test_admissao_conta_individuos_e_recusa_partes_grandes():
+    async def cenario():
+        broker = BrokerAvaliacao(n_processos=1, limite_pendentes=4)
+        cliente = EstadoCliente('teste', writer=None)
+
+        assert broker.receber_lote(cliente, parte(0, range(5))) is not None
+        assert cliente.pendentes == 0 and not cliente.fila and 0 not in cliente.lotes
+
+        assert broker.receber_lote(cliente, parte(0, range(3), fim=False)) is None
+        assert cliente.livre.is_set()
+        assert broker.receber_lote(cliente, parte(0, range(3, 5))) is None
+        assert not cliente.livre.is_set()  # 5 indivíduos pendentes >= limite 4
+        assert cliente.pendentes == 5 and len(cliente.fila) == 5
+        assert cliente.lotes[0] == {'abertas': 5, 'fim': True}
+        assert list(broker.rodizio) == [cliente]
+    asyncio.run(cenario())
+
+
+@pytest.fixture
+def broker(tmp_path):
+    """Broker real (1 processo) em uma thread com o seu próprio laço asyncio."""
+    caminho = str(tmp_path / 'broker.sock')
+    laco = asyncio.new_event_loop()
+    pronto = threading.Event()
+    instancia = BrokerAvaliacao(n_processos=1, limite_pendentes=4)
+
+    def rodar():
+        asyncio.set_event_loop(laco)
+        laco.run_until_complete(instancia.iniciar(caminho))
+        pronto.set()
+        laco.run_forever()
+
+    thread = threading.Thread(target=rodar, daemon=True)
+    thread.start()
+    pronto.wait(10)
+    yield caminho, instancia
+    # espera o broker notar que os clientes fecharam a conexão
+    limite = time.monotonic() + 10
+    while instancia.clientes and time.monotonic() < limite:
+        time.sleep(0.01)
+    asyncio.run_coroutine_threadsafe(instancia.encerrar(), laco).result(10)
+    laco.call_soon_threadsafe(laco.stop)
+    thread.join(10)
+
+
+def individuos(n, semente=0):
+    random.seed(semente)
+    return [IndividuoPG(2) for _ in range(n)]
+
+
+def test_lote_em_partes_igual_a_avaliacao_local(broker):
+    caminho, _ = broker
+    populacao = individuos(5)
+    cliente = ClienteBroker(caminho, nome='partes', tarefas_por_mensagem=2)
+    resultados = cliente.avaliar_lote(populacao, 11, 12, CONFIGURACAO)
+    cliente.fechar()
+
+    avaliador = AvaliadorFitness.de_configuracao(CONFIGURACAO)
+    esperado = [avaliar_em_processo((ind.arvore_aceleracao, ind.arvore_rotacao),
+                                    avaliador, 11, 12) for ind in populacao]
+    assert resultados == [(float(f), int(p)) for f, p in esperado]
+    assert cliente.falhas == []
+
+
+def test_timeout_vira_erro_explicito(broker):
+    caminho, instancia = broker
+    cliente = ClienteBroker(caminho, nome='lento', timeout=1e-6, tentativas=1)
+    with pytest.raises(RuntimeError):
+        cliente.avaliar_lote(individuos(2), 11, 12, CONFIGURACAO)
+    assert cliente.falhas == [0, 1]
+    estatisticas = cliente.estatisticas()['lento']
+    assert estatisticas['timeouts'] == 4  # 2 tarefas x (envio + 1 reenvio)
+    assert estatisticas['concluidas'] == 0
+    cliente.fechar()
+
+
+def test_parte_acima_do_limite_e_recusada(broker):
+    caminho, _ = broker
+    cliente = ClienteBroker(caminho, tarefas_por_mensagem=10)
+    with pytest.raises(RuntimeError, match='limite'):
+        cliente.avaliar_lote(individuos(6), 11, 12, CONFIGURACAO)
+    cliente.fechar()
+
+
+def test_cliente_que_cai_nao_afeta_o_proximo(broker):
+    caminho, instancia = broker
+    apressado = ClienteBroker(caminho, nome='apressado', tarefas_por_mensagem=2)
+    apressado.enviar(parte(0, []) | {'tarefas': [
+        {'id': i, 'arvores': [ind.arvore_aceleracao, ind.arvore_rotacao]}
+        for i, ind in enumerate(individuos(3))]})
+    apressado.fechar()
+
+    cliente = ClienteBroker(caminho, nome='seguinte')
+    assert len(cliente.avaliar_lote(individuos(2, semente=1), 11, 12, CONFIGURACAO)) == 2
+    assert 'apressado' not in cliente.estatisticas()
+    cliente.fechar()
+
+
+def test_falhas_recebem_o_pior_fitness_do_lote():
+    assert ClienteBroker.completar_falhas([(3.0, 10), None, (-2.0, 5)]) == \
+        [(3.0, 10), (-2.0, 0), (-2.0, 5)]
+    assert ClienteBroker.completar_falhas([]) == []
+    with pytest.raises(RuntimeError):
+        ClienteBroker.completar_falhas([None, None])
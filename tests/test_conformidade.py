@@ -0,0 +1,66 @@
+import pickle
+import random
+
+from robo_exercicio import (AvaliadorFitness, Ambiente, IndividuoPG, Robo,
+                            avaliar_em_processo_conferido)
+
+
+def avaliar_como_processo(configuracao, conformidade, individuo, ambiente, semente):
+    """Avalia como num processo de avaliação: só o que passa por pickle chega lá."""
+    configuracao, conformidade = pickle.loads(pickle.dumps((configuracao, conformidade)))
+    avaliador = AvaliadorFitness.para_processo(configuracao, conformidade)
+    robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+    avaliador.avaliar(individuo, ambiente, robo, semente)
+    return avaliador.conformidade_parcial(conformidade)
+
+
+def test_conferido_nos_processos_entra_no_relatorio():
+    random.seed(0)
+    avaliador = AvaliadorFitness(n_episodios=3, conformidade=1.0, limite_conformidade=100.0)
+    ambiente = Ambiente.gerar_cenario(11)
+    individuos = [IndividuoPG(3) for _ in range(4)]
+
+    configuracao = avaliador.configuracao()
+    parciais = [avaliar_como_processo(configuracao, avaliador.conformidade_para_processo(k),
+                                      ind, ambiente, 5)
+                for k, ind in enumerate(individuos)]
+    assert avaliador.episodios_conferidos == 0  # nada muda no original até incorporar
+    for parcial in parciais:
+        avaliador.incorporar_conformidade(parcial)
+
+    relatorio = avaliador.relatorio_conformidade()
+    assert relatorio['episodios_conferidos'] == 3 * len(individuos)
+    assert relatorio['divergencias'] == 0
+    assert avaliador.tempo_conformidade > 0
+
+
+def test_sem_conformidade_so_vai_a_configuracao():
+    avaliador = AvaliadorFitness()
+    assert avaliador.conformidade_para_processo(1) is None
+    assert AvaliadorFitness.para_processo(avaliador.configuracao(), None).conformidade == 0.0
+    avaliador.incorporar_conformidade(None)
+    assert avaliador.episodios_conferidos == 0
+
+    fitness, passos, parcial = avaliar_em_processo_conferido(
+        (IndividuoPG(2).arvore_aceleracao, IndividuoPG(2).arvore_rotacao),
+        avaliador.configuracao(), 3, 4)
+    assert parcial is None and passos > 0
+    # a tarefa leva a configuração, não o avaliador inteiro
+    assert len(pickle.dumps(avaliador.configuracao())) < len(pickle.dumps(avaliador)) / 4
+
+
+def test_cada_tarefa_tem_o_seu_sorteio_e_divergencias_limitadas():
+    avaliador = AvaliadorFitness(conformidade=0.5)
+    configuracao = avaliador.configuracao()
+    a = AvaliadorFitness.para_processo(configuracao, avaliador.conformidade_para_processo(1))
+    b = AvaliadorFitness.para_processo(configuracao, avaliador.conformidade_para_processo(2))
+    assert a.conformidade == 0.5 and a.gravador is None
+    assert [a.rng_conformidade.random() for _ in range(5)] != \
+           [b.rng_conformidade.random() for _ in range(5)]
+
+    divergencias = [{'campo': 'posicao', 'passo': i}
+                    for i in range(AvaliadorFitness.MAX_DIVERGENCIAS + 10)]
+    avaliador.incorporar_conformidade((len(divergencias), 1.0, 0.1, divergencias))
+    avaliador.incorporar_conformidade((1, 1.0, 0.1, divergencias[:1]))
+    assert len(avaliador.divergencias) == AvaliadorFitness.MAX_DIVERGENCIAS
+    assert avaliador.episodios_conferidos == len(divergencias) + 1
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from robo_exercicio import IndividuoPG, ProgramacaoGenetica
+
+
+def folha(valor):
+    return {'tipo': 'folha', 'valor': valor}
+
+
+def operador(op, esquerda, direita=None):
+    return {'tipo': 'operador', 'operador': op, 'esquerda': esquerda, 'direita': direita}
+
+
+def cadeia(n):
+    """Árvore de profundidade n: n operadores abs empilhados sobre uma folha."""
+    no = folha(1.0)
+    for _ in range(n):
+        no = operador('abs', no)
+    return no
+
+
+def individuo(arvore, fitness=0.0):
+    ind = IndividuoPG.de_arvores(arvore, folha(0.0))
+    ind.fitness = fitness
+    return ind
+
+
+@pytest.mark.parametrize('profundidade', range(6))
+def test_gerador_respeita_profundidade(profundidade):
+    random.seed(profundidade)
+    for _ in range(100):
+        ind = IndividuoPG(profundidade)
+        assert ind.profundidade_no(ind.arvore_aceleracao) <= profundidade
+        assert ind.profundidade_no(ind.arvore_rotacao) <= profundidade
+    assert IndividuoPG(0).profundidade_no(folha(1.0)) == 0
+    assert IndividuoPG(0).profundidade_no(cadeia(3)) == 3
+
+
+def test_profundidade_max_menor_que_a_inicial_e_rejeitada():
+    with pytest.raises(ValueError, match='profundidade_max'):
+        ProgramacaoGenetica(tamanho_populacao=4, profundidade=4, profundidade_max=3)
+
+
+def test_profundidade_max_igual_a_inicial_nao_trava_a_evolucao():
+    random.seed(1)
+    pg = ProgramacaoGenetica(tamanho_populacao=50, profundidade=4, profundidade_max=4)
+    filhos = [pg.gerar_filho(*random.sample(pg.populacao, 2), 0.1) for _ in range(50)]
+    assert all(pg.respeita_limites(f) for f in filhos)
+    assert pg.filhos_rejeitados < 50
+
+
+def test_max_nos_vale_para_populacao_inicial_e_descendentes():
+    random.seed(2)
+    pg = ProgramacaoGenetica(tamanho_populacao=30, profundidade=3, max_nos=25)
+    assert all(ind.tamanho() <= 25 for ind in pg.populacao)
+    for _ in range(50):
+        assert pg.gerar_filho(*random.sample(pg.populacao, 2), 0.2).tamanho() <= 25
+
+    grande, pequeno = individuo(cadeia(30)), individuo(cadeia(2))
+    assert not pg.respeita_limites(grande)
+    pg.filhos_rejeitados = 0
+    filho = pg.gerar_filho(pequeno, grande, 0.0)
+    assert filho.tamanho() <= 25
+
+    with pytest.raises(ValueError, match='max_nos'):
+        ProgramacaoGenetica(tamanho_populacao=2, profundidade=3, max_nos=2)
+
+
+def test_parcimonia_desconta_tamanho_na_selecao():
+    pg = ProgramacaoGenetica(tamanho_populacao=2, profundidade=2, parcimonia=1.0)
+    grande, pequeno = individuo(cadeia(10), fitness=10.0), individuo(cadeia(1), fitness=5.0)
+    assert pg.aptidao_selecao(grande) == 10.0 - grande.tamanho()
+    assert pg.torneio([grande, pequeno], tamanho_torneio=2) is pequeno
+    pg.parcimonia = 0.0
+    assert pg.torneio([grande, pequeno], tamanho_torneio=2) is grande
+
+
+def test_torneio_duplo_prefere_o_menor():
+    random.seed(3)
+    populacao = [individuo(cadeia(n), fitness=1.0) for n in range(1, 21)]
+    pg = ProgramacaoGenetica(tamanho_populacao=2, profundidade=2, torneio_duplo=True)
+    pg.pressao_tamanho = 1.0
+    vencedores = [pg.torneio(populacao, tamanho_torneio=1) for _ in range(400)]
+    media = sum(v.tamanho() for v in vencedores) / len(vencedores)
+    media_populacao = sum(p.tamanho() for p in populacao) / len(populacao)
+    assert media < media_populacao - 3
+
+    pg.torneio_duplo = False
+    simples = [pg.torneio(populacao, tamanho_torneio=1) for _ in range(400)]
+    assert sum(v.tamanho() for v in simples) / len(simples) > media
+
+
+def test_limpar_orfaos_remove_filhos_ignorados():
+    ramos = {'then': folha(1.0), 'else': folha(2.0)}
+    arvore = operador('+', operador('abs', folha(3.0), folha(4.0)), dict(ramos))
+    ite = {'tipo': 'operador', 'operador': 'if_then_else', 'esquerda': folha(0.5),
+           'direita': dict(ramos)}
+    ind = IndividuoPG.de_arvores(arvore, ite).limpar_orfaos()
+
+    assert ind.arvore_aceleracao['direita'] is None          # then/else fora do if_then_else
+    assert ind.arvore_aceleracao['esquerda']['direita'] is None  # segundo filho do abs
+    assert ind.arvore_rotacao['direita'] == ramos             # if_then_else intacto
+    assert ind.tamanho() == 3 + 4
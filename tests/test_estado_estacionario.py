@@ -0,0 +1,26 @@
+import random
+
+import pytest
+
+from robo_exercicio import ProgramacaoGenetica
+
+
+@pytest.mark.parametrize('substituicao', ['pior', 'torneio'])
+def test_avaliacoes_e_estatisticas_por_intervalo(substituicao):
+    random.seed(0)
+    pg = ProgramacaoGenetica(tamanho_populacao=4, profundidade=2)
+    pg.avaliador.n_episodios = 1
+    melhor, historico = pg.evoluir_estado_estacionario(n_avaliacoes=10, n_processos=1,
+                                                       substituicao=substituicao,
+                                                       intervalo_estatisticas=5)
+
+    assert len(historico) == 2
+    assert len(pg.acertos_cache) == len(pg.passos_medios) == 2
+    assert melhor is pg.melhor_individuo
+    assert pg.melhor_fitness == pg.fitness_referencia(melhor)
+
+
+def test_populacao_de_um_e_rejeitada():
+    pg = ProgramacaoGenetica(tamanho_populacao=1, profundidade=2)
+    with pytest.raises(ValueError, match='tamanho_populacao'):
+        pg.evoluir_estado_estacionario(n_avaliacoes=3, n_processos=1)
@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+
+from robo_exercicio import (AvaliadorFitness, ColetorTrajetoria, GravadorTrajetoria,
+                            ProgramacaoGenetica, Robo)
+
+
+def test_episodio_gravado_pode_ser_refeito_no_seu_mapa(tmp_path):
+    random.seed(4)
+    gravador = GravadorTrajetoria(str(tmp_path))
+    pg = ProgramacaoGenetica(tamanho_populacao=3, cenarios_deterministicos=True,
+                             gravador=gravador)
+    pg.avaliador.n_episodios = 2
+    pg.avaliar_populacao()
+
+    indice = GravadorTrajetoria.indice(str(tmp_path))
+    assert len(indice) == 6
+    assert sorted({e['individuo'] for e in indice}) == [0, 1, 2]
+    for entrada in indice:
+        gravada = GravadorTrajetoria.carregar(str(tmp_path), entrada['episodio'])
+        ambiente = GravadorTrajetoria.ambiente(entrada)
+        coletor = ColetorTrajetoria()
+        avaliador = AvaliadorFitness(gravador=coletor)
+        random.seed(entrada['semente_episodio'])
+        avaliador.simular_episodio(pg.populacao[entrada['individuo']], ambiente,
+                                   Robo(0, 0), entrada['semente_episodio'])
+        assert np.array_equal(coletor.trajetoria, gravada)
+        assert coletor.metadados['fitness'] == entrada['fitness']
+
+
+def test_buffer_descarrega_sem_guardar_o_episodio(tmp_path):
+    gravador = GravadorTrajetoria(str(tmp_path), tamanho_buffer=8)
+    robo = Robo(10, 20)
+    gravador.iniciar_episodio()
+    for passo in range(20):
+        robo.x = passo
+        gravador.registrar(robo, 0.5, -0.1, passo % 7 == 0)
+        assert gravador.n_buffer < 8
+    gravador.finalizar_episodio(origem='teste')
+    trajetoria = GravadorTrajetoria.carregar(str(tmp_path), 0)
+    assert trajetoria['x'].tolist() == list(range(20))
+    assert trajetoria['colisao'].sum() == 3
+    assert GravadorTrajetoria.indice(str(tmp_path))[0]['passos'] == 20
+
+
+@pytest.mark.parametrize('opcoes', [{'n_processos': 2}, {'broker': object()}])
+def test_gravacao_fora_deste_processo_e_recusada(tmp_path, opcoes):
+    pg = ProgramacaoGenetica(tamanho_populacao=2, gravador=GravadorTrajetoria(str(tmp_path)),
+                             **opcoes)
+    with pytest.raises(ValueError, match='gravação'):
+        pg.avaliar_populacao()
+    with pytest.raises(ValueError, match='gravação'):
+        pg.evoluir_estado_estacionario(n_avaliacoes=2, n_processos=1)
@@ -0,0 +1,102 @@
+import os
+import random
+
+import pytest
+
+from robo_exercicio import HallDaFama, IndividuoPG
+
+
+def individuos(n, semente):
+    random.seed(semente)
+    return [IndividuoPG(3) for _ in range(n)]
+
+
+def arvores(individuo):
+    return individuo.arvore_aceleracao, individuo.arvore_rotacao
+
+
+def test_ida_e_volta_pelo_arquivo(tmp_path):
+    arquivo = str(tmp_path / 'hall.bin')
+    hall = HallDaFama(arquivo, capacidade=10)
+    pop = individuos(15, 0)
+    for k, ind in enumerate(pop):
+        hall.adicionar(ind, float(k))
+    hall.salvar()
+
+    lido = HallDaFama(arquivo, capacidade=10)
+    assert len(lido) == 10
+    melhores = lido.melhores()
+    assert [ind.fitness for ind in melhores] == [float(k) for k in range(14, 4, -1)]
+    assert [arvores(ind) for ind in melhores] == [arvores(ind) for ind in pop[:4:-1]]
+
+
+def test_registro_final_truncado_e_ignorado(tmp_path):
+    arquivo = str(tmp_path / 'hall.bin')
+    hall = HallDaFama(arquivo)
+    for k, ind in enumerate(individuos(5, 1)):
+        hall.adicionar(ind, float(k))
+    hall.salvar()
+    with open(arquivo, 'rb+') as f:
+        f.truncate(os.path.getsize(arquivo) - 5)
+
+    lido = HallDaFama(arquivo, capacidade=10)
+    # o pior (último gravado) foi cortado; os outros saem intactos e em blocos pequenos
+    assert len(lido) == 4
+    lido_em_blocos = HallDaFama(capacidade=10)
+    lido_em_blocos.carregar(arquivo, tamanho_bloco=7)
+    assert sorted(lido_em_blocos.entradas) == sorted(lido.entradas)
+
+    with open(arquivo, 'wb') as f:
+        f.write(b'XXXX')
+    with pytest.raises(ValueError):
+        HallDaFama(arquivo)
+
+
+def test_repetidos_viram_uma_entrada_com_o_maior_fitness():
+    hall = HallDaFama()
+    ind = individuos(1, 2)[0]
+    copia = IndividuoPG.de_arvores(*arvores(ind))
+    hall.adicionar(ind, 1.0)
+    hall.adicionar(copia, 3.0)
+    hall.adicionar(ind, 2.0)
+    assert len(hall) == 1
+    assert hall.melhores()[0].fitness == 3.0
+
+
+def test_populacao_pontuada_no_cenario_de_referencia():
+    hall = HallDaFama()
+    pop = individuos(4, 3)
+    for k, ind in enumerate(pop):
+        ind.fitness = 1000.0 if k == 0 else 0.0  # o primeiro deu sorte no cenário da geração
+    pop[3].estimado = True
+    referencia = {id(ind): float(k) for k, ind in enumerate(pop)}
+    pontuados = []
+
+    def pontuar(ind):
+        pontuados.append(ind)
+        return referencia[id(ind)]
+
+    hall.adicionar_populacao(pop, pontuar)
+    assert [ind.fitness for ind in hall.melhores()] == [2.0, 1.0, 0.0]
+    # já arquivados não são pontuados de novo
+    hall.adicionar_populacao(pop[:3], pontuar)
+    assert len(pontuados) == 3
+
+
+def test_salvar_e_atomico(tmp_path):
+    arquivo = str(tmp_path / 'hall.bin')
+    hall = HallDaFama(arquivo)
+    for k, ind in enumerate(individuos(3, 4)):
+        hall.adicionar(ind, float(k))
+    hall.salvar()
+    antes = open(arquivo, 'rb').read()
+
+    # falha no meio da gravação: o arquivo anterior continua inteiro
+    for k, ind in enumerate(individuos(3, 5)):
+        hall.adicionar(ind, 10.0 + k)
+    chave = next(iter(hall.entradas))
+    hall.entradas[chave] = (hall.entradas[chave][0], None)
+    with pytest.raises(TypeError):
+        hall.salvar()
+    assert open(arquivo, 'rb').read() == antes
+    assert len(HallDaFama(arquivo)) == 3
@@ -0,0 +1,88 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from robo_exercicio import Ambiente, IndiceRecursos
+
+
+def recursos_aleatorios(n, largura, altura, semente):
+    rng = random.Random(semente)
+    return [{'x': rng.randint(20, largura - 20), 'y': rng.randint(20, altura - 20),
+             'coletado': False} for _ in range(n)]
+
+
+def ambiente_linear(recursos, largura, altura):
+    """Mesmos recursos, consultas pela varredura linear (sem índice)."""
+    ambiente = Ambiente.de_layout(largura, altura, [], recursos,
+                                  {'x': 0, 'y': 0, 'raio': 30})
+    ambiente.indice_recursos = None
+    return ambiente
+
+
+def conferir_piramide(indice):
+    lado = indice.lado
+    fina = np.array(indice.contagens[0]).reshape(lado, lado)
+    for n in range(1, indice.niveis + 1):
+        lado_n = lado >> n
+        esperado = fina.reshape(lado_n, lado // lado_n, lado_n, lado // lado_n).sum(axis=(1, 3))
+        assert indice.contagens[n] == esperado.ravel().tolist()
+    assert indice.contagens[indice.niveis][0] == indice.restantes
+    assert indice.restantes == sum(1 for r in indice.recursos if not r['coletado'])
+    assert indice.ativos.tolist() == [not r['coletado'] for r in indice.recursos]
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_consultas_iguais_a_varredura_linear(semente):
+    largura, altura = 800, 600
+    recursos = recursos_aleatorios(200, largura, altura, semente)
+    indice = IndiceRecursos(recursos, largura, altura)
+    linear = ambiente_linear(recursos, largura, altura)
+    rng = random.Random(100 + semente)
+
+    for _ in range(60):
+        x, y = rng.uniform(0, largura), rng.uniform(0, altura)
+        dist, i = indice.mais_proximo(x, y)
+        dist_linear, _ = linear.recurso_mais_proximo(x, y)
+        if math.isinf(dist_linear):
+            assert i is None
+        else:
+            assert dist == pytest.approx(dist_linear)
+
+        angulo = rng.uniform(-math.pi, math.pi)
+        assert (indice.contar_no_setor(x, y, angulo, math.radians(30))
+                == linear.recursos_no_cone(x, y, angulo, math.radians(30)))
+        assert indice.soma_distancias(x, y) == pytest.approx(linear.soma_distancias_recursos(x, y))
+
+        # coleta em uma cópia linear e no índice devem marcar os mesmos recursos
+        copia = [dict(r) for r in recursos]
+        esperado = ambiente_linear(copia, largura, altura).verificar_coleta_recursos(x, y, 40)
+        assert indice.coletar_no_raio(x, y, 50) == esperado
+        assert [r['coletado'] for r in recursos] == [r['coletado'] for r in copia]
+        conferir_piramide(indice)
+
+
+def test_reset_restaura_contagens():
+    recursos = recursos_aleatorios(100, 500, 500, 7)
+    indice = IndiceRecursos(recursos, 500, 500)
+    for i in range(0, 100, 3):
+        recursos[i]['coletado'] = True
+        indice.remover(i)
+    conferir_piramide(indice)
+    for r in recursos:
+        r['coletado'] = False
+    indice.reset()
+    conferir_piramide(indice)
+    assert indice.restantes == 100
+
+
+def test_sem_recursos_restantes():
+    recursos = recursos_aleatorios(40, 400, 400, 3)
+    indice = IndiceRecursos(recursos, 400, 400)
+    for i in range(40):
+        recursos[i]['coletado'] = True
+        indice.remover(i)
+    assert indice.mais_proximo(200, 200) == (float('inf'), None)
+    assert indice.contar_no_setor(200, 200, 0.0, math.pi) == 0
+    conferir_piramide(indice)
@@ -0,0 +1,60 @@
+import random
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from robo_exercicio import ProgramacaoGenetica, ServidorMetricas
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def raspar(porta, caminho='/metrics'):
+    with urllib.request.urlopen(f'http://127.0.0.1:{porta}{caminho}', timeout=5) as resposta:
+        assert resposta.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        return resposta.read().decode()
+
+
+def amostras(texto):
+    return {nome: float(valor) for nome, valor in
+            (linha.split() for linha in texto.splitlines() if not linha.startswith('#'))}
+
+
+def test_evoluir_iter_publica_ultima_geracao():
+    random.seed(0)
+    pg = ProgramacaoGenetica(tamanho_populacao=4, profundidade=2)
+    pg.avaliador.n_episodios = 1
+    porta = porta_livre()
+    geracoes = pg.evoluir_iter(n_geracoes=3, porta_metricas=porta)
+
+    avaliacoes = 0
+    for _ in range(2):
+        registro = next(geracoes)
+        avaliacoes += registro['avaliacoes']
+        metricas = amostras(raspar(porta))
+        assert metricas['pg_geracao'] == registro['geracao']
+        assert metricas['pg_melhor_fitness'] == pytest.approx(registro['melhor'])
+        assert metricas['pg_tamanho_max'] == registro['tamanho_max']
+        assert metricas['pg_avaliacoes_total'] == avaliacoes
+    assert set(metricas) == ({nome for nome, _, _ in ServidorMetricas.METRICAS.values()}
+                             | {'pg_avaliacoes_total', 'pg_acertos_cache_total'})
+
+    geracoes.close()  # o servidor encerra junto com o laço
+    with pytest.raises(urllib.error.URLError):
+        raspar(porta)
+
+
+def test_caminho_desconhecido_e_404():
+    servidor = ServidorMetricas(0)
+    try:
+        assert raspar(servidor.porta) == ''  # nenhuma geração ainda
+        with pytest.raises(urllib.error.HTTPError) as erro:
+            raspar(servidor.porta, '/outra')
+        assert erro.value.code == 404
+    finally:
+        servidor.encerrar()
@@ -0,0 +1,71 @@
+import random
+import time
+
+import pytest
+
+import robo_exercicio
+from robo_exercicio import ProgramacaoGenetica
+
+
+class Relogio:
+    """perf_counter falso: cada leitura avança `passo` segundos."""
+
+    def __init__(self, passo):
+        self.agora = 0.0
+        self.passo = passo
+
+    def perf_counter(self):
+        self.agora += self.passo
+        return self.agora
+
+    def __getattr__(self, nome):
+        return getattr(time, nome)
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio(0.5)
+    monkeypatch.setattr(robo_exercicio, 'time', relogio)
+    return relogio
+
+
+def test_plano_reduz_fidelidade_e_restaura_avaliador(relogio, tmp_path):
+    random.seed(0)
+    pg = ProgramacaoGenetica(tamanho_populacao=6, profundidade=2)
+    pg.avaliador.n_episodios = 2
+    arquivo = str(tmp_path / 'parcial.json')
+
+    # geracoes_min inalcançável: o plano desce até a menor fidelidade
+    pg.evoluir_com_orcamento(60, arquivo_checkpoint=arquivo, geracoes_min=10**6)
+
+    plano = pg.plano_orcamento
+    assert plano['geracoes_calibracao'] >= 1
+    assert plano['n_episodios'] == 1
+    assert plano['horizonte'] == robo_exercicio.Ambiente.MAX_TEMPO // 2
+    assert plano['geracoes']
+    assert plano['tempo_total'] <= 60
+    assert (pg.avaliador.n_episodios, pg.avaliador.horizonte) == (2, None)
+    assert (tmp_path / 'parcial.json').exists()
+
+
+def test_falha_tambem_restaura_avaliador(relogio, monkeypatch, tmp_path):
+    random.seed(1)
+    pg = ProgramacaoGenetica(tamanho_populacao=6, profundidade=2)
+    pg.avaliador.n_episodios = 2
+    pg.avaliador.horizonte = 400
+
+    fidelidades = []
+
+    def falha_depois_do_plano(individuo):
+        fidelidades.append((pg.avaliador.n_episodios, pg.avaliador.horizonte))
+        if pg.avaliador.n_episodios == 1:
+            raise RuntimeError('checkpoint indisponível')
+        return float('-inf')
+
+    monkeypatch.setattr(pg, 'fitness_referencia', falha_depois_do_plano)
+    with pytest.raises(RuntimeError):
+        pg.evoluir_com_orcamento(60, arquivo_checkpoint=str(tmp_path / 'parcial.json'),
+                                 fracao_calibracao=0, geracoes_min=10**6)
+
+    assert fidelidades[-1] == (1, 200)
+    assert (pg.avaliador.n_episodios, pg.avaliador.horizonte) == (2, 400)
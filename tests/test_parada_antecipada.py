@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from robo_exercicio import Ambiente, AvaliadorFitness, IndividuoPG, Robo
+
+
+def folha(valor):
+    return {'tipo': 'folha', 'valor': valor}
+
+
+PARADO  = IndividuoPG.de_arvores(folha(0.0), folha(0.0))
+GIRANDO = IndividuoPG.de_arvores(folha(0.5), folha(1.0))
+
+
+def episodio(individuo, semente=1, **kwargs):
+    ambiente = Ambiente.gerar_cenario(3)
+    robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+    random.seed(semente)
+    return AvaliadorFitness(n_episodios=1, **kwargs).simular_episodio(individuo, ambiente, robo)
+
+
+def test_robo_parado_encerra_apos_max_tempo_parado():
+    curto = episodio(PARADO)
+    longo = episodio(PARADO, parada_antecipada={'max_tempo_parado': 60})
+    assert curto['motivo'] == longo['motivo'] == 'parado'
+    # o robô para de se mover no mesmo passo; só a tolerância muda
+    assert longo['passos'] - curto['passos'] == 30
+
+
+def test_robo_em_loop_encerra_ao_fim_da_janela():
+    padrao = episodio(GIRANDO)
+    assert (padrao['motivo'], padrao['passos']) == ('loop', 150)
+    maior = episodio(GIRANDO, parada_antecipada={'janela_loop': 200})
+    assert (maior['motivo'], maior['passos']) == ('loop', 200)
+
+
+@pytest.mark.parametrize('individuo', [PARADO, GIRANDO], ids=['parado', 'loop'])
+def test_cauda_estimada_aproxima_episodio_completo(individuo):
+    cedo = episodio(individuo)
+    completo = episodio(individuo, parada_antecipada={'ativa': False})
+    assert completo['motivo'] == 'energia'
+    assert cedo['passos'] < completo['passos']
+    assert cedo['fitness'] == pytest.approx(completo['fitness'], rel=0.02)
+
+
+def test_horizonte_limita_passos():
+    resultado = episodio(IndividuoPG.de_arvores(folha(1.0), folha(0.0)), horizonte=77,
+                         parada_antecipada={'ativa': False})
+    assert (resultado['motivo'], resultado['passos']) == ('horizonte', 77)
+
+
+def test_avaliar_soma_passos_dos_episodios():
+    ambiente = Ambiente.gerar_cenario(3)
+    robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+    avaliador = AvaliadorFitness(n_episodios=3)
+    _, passos = avaliador.avaliar(GIRANDO, ambiente, robo, semente=5)
+    assert passos == 3 * 150
@@ -0,0 +1,77 @@
+import math
+import os
+import random
+
+import pytest
+
+from robo_exercicio import ProgramacaoGenetica
+
+
+def fragmentos(diretorio):
+    return sorted(os.path.relpath(os.path.join(raiz, nome), diretorio)
+                  for raiz, _, nomes in os.walk(diretorio) for nome in nomes)
+
+
+def test_ultima_geracao_fica_em_disco(tmp_path):
+    random.seed(0)
+    pg = ProgramacaoGenetica(tamanho_populacao=12, profundidade=2, elite_size=0.25,
+                             populacao_em_disco=str(tmp_path))
+    melhor, historico = pg.evoluir_fragmentado(n_geracoes=2, tamanho_lote=5, tamanho_fragmento=5)
+
+    populacao = pg.populacao_fragmentada
+    assert len(populacao) == 12
+    assert fragmentos(str(tmp_path)) == [os.path.join('geracao_1', f'fragmento_{k:05d}.bin')
+                                         for k in range(3)]
+    # o índice guarda o fitness da última avaliação e os indivíduos são legíveis
+    assert float(populacao.fitness.max()) == historico[-1] == pg.melhor_fitness
+    assert [ind.fitness for _, lote in populacao.lotes(5) for ind in lote] == \
+           populacao.fitness.tolist()
+    assert populacao.ler(int(populacao.fitness.argmax())).arvore_aceleracao == melhor.arvore_aceleracao
+
+    # nova chamada: a população anterior é substituída
+    pg.evoluir_fragmentado(n_geracoes=1, tamanho_lote=5, tamanho_fragmento=5)
+    assert pg.populacao_fragmentada is not populacao
+    assert fragmentos(str(tmp_path)) == [os.path.join('geracao_0', f'fragmento_{k:05d}.bin')
+                                         for k in range(3)]
+
+
+def test_falha_apaga_fragmentos(tmp_path, monkeypatch):
+    random.seed(1)
+    pg = ProgramacaoGenetica(tamanho_populacao=12, profundidade=2, elite_size=0.25,
+                             populacao_em_disco=str(tmp_path))
+    chamadas = []
+
+    def simular_lote(lote, semente_cenario, semente):
+        chamadas.append(len(lote))
+        if len(chamadas) > 4:  # segunda geração
+            raise RuntimeError('falha simulada')
+        return [(0.0, 1)] * len(lote)
+
+    monkeypatch.setattr(pg, 'simular_lote', simular_lote)
+    with pytest.raises(RuntimeError, match='falha simulada'):
+        pg.evoluir_fragmentado(n_geracoes=3, tamanho_lote=3, tamanho_fragmento=5)
+    assert fragmentos(str(tmp_path)) == []
+    assert pg.populacao_fragmentada is None
+
+
+def test_decaimento_da_mutacao_continua_entre_chamadas(tmp_path, monkeypatch):
+    random.seed(2)
+    pg = ProgramacaoGenetica(tamanho_populacao=6, profundidade=2, elite_size=0.2,
+                             populacao_em_disco=str(tmp_path))
+    taxas = []
+    gerar_filho = pg.gerar_filho
+
+    def registrar(p1, p2, prob_mut):
+        taxas.append(prob_mut)
+        return gerar_filho(p1, p2, prob_mut)
+
+    monkeypatch.setattr(pg, 'gerar_filho', registrar)
+    pg.evoluir_fragmentado(n_geracoes=2, tamanho_lote=3, tamanho_fragmento=4)
+    assert pg.geracao == 2
+    pg.evoluir_fragmentado(n_geracoes=2, tamanho_lote=3, tamanho_fragmento=4)
+    assert pg.geracao == 4
+
+    esperadas = [pg.prob_mut_inicial * math.exp(-pg.decaimento_mutacao * g) for g in (0, 2)]
+    por_chamada = len(taxas) // 2
+    assert set(taxas[:por_chamada]) == {esperadas[0]}
+    assert set(taxas[por_chamada:]) == {esperadas[1]}
@@ -0,0 +1,68 @@
+import copy
+import random
+
+import pytest
+
+from robo_exercicio import Ambiente, ColetorTrajetoria, IndividuoPG, Robo, Simulador
+
+
+@pytest.fixture
+def sem_sorteio_no_episodio(monkeypatch):
+    # desvios aleatórios de Robo.mover: sem eles cada robô só depende da
+    # posição inicial, e não da ordem em que os robôs sorteiam no laço
+    monkeypatch.setattr(random, 'uniform', lambda a, b: (a + b) / 2)
+
+
+# acelera e vira para o recurso mais próximo: coleta quase todos
+COLETOR = IndividuoPG.de_arvores({'tipo': 'folha', 'valor': 0.5},
+                                 {'tipo': 'folha', 'variavel': 'angulo_recurso'})
+
+
+def individuos(n, semente=3):
+    random.seed(semente)
+    return [IndividuoPG(3) for _ in range(n)]
+
+
+def simular(ambiente, individuo, **kwargs):
+    random.seed(0)  # mesma posição segura para todos
+    simulador = Simulador(ambiente, Robo(0, 0), individuo, headless=True, **kwargs)
+    simulador.simular()
+    return simulador
+
+
+def test_cada_robo_anda_como_se_estivesse_sozinho(sem_sorteio_no_episodio):
+    ambiente = Ambiente.gerar_cenario(5)
+    grupo = [COLETOR] + individuos(3) + [COLETOR]
+    resultados = simular(ambiente, grupo).resultados
+
+    assert len(resultados) == 5
+    # os recursos que um coleta continuam disponíveis para o outro
+    assert resultados[0]['recursos_coletados'] > 0
+    assert resultados[4] == resultados[0]
+    for individuo, resultado in zip(grupo, resultados):
+        assert simular(ambiente, individuo).resultados == [resultado]
+
+
+def test_ambiente_do_chamador_nao_muda():
+    ambiente = Ambiente.gerar_cenario(5)
+    recursos = copy.deepcopy(ambiente.recursos)
+    simulador = simular(ambiente, [COLETOR] + individuos(2))
+    assert ambiente.recursos == recursos
+    assert ambiente.tempo == 0
+    assert all(r['passos'] > 0 for r in simulador.resultados)
+
+
+def test_gravador_acompanha_o_primeiro_robo(sem_sorteio_no_episodio):
+    ambiente = Ambiente.gerar_cenario(5)
+    grupo = individuos(3)
+    sozinho, junto = ColetorTrajetoria(), ColetorTrajetoria()
+    simular(ambiente, grupo[0], gravador=sozinho)
+    simular(ambiente, grupo, gravador=junto)
+    assert len(junto.trajetoria) > 0
+    assert junto.trajetoria.tobytes() == sozinho.trajetoria.tobytes()
+
+
+def test_animar_exige_figura():
+    simulador = Simulador(Ambiente.gerar_cenario(5), Robo(0, 0), individuos(2), headless=True)
+    with pytest.raises(ValueError, match='headless'):
+        simulador.animar()
@@ -0,0 +1,101 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from robo_exercicio import IndividuoPG, ModeloSubstituto, ProgramacaoGenetica, gerar_banco_sondas
+
+
+@pytest.fixture(scope='module')
+def sondas():
+    return gerar_banco_sondas(64)
+
+
+def alvo(individuo):
+    return (5.0 * individuo.contar_nos(individuo.arvore_aceleracao)
+            - 3.0 * individuo.contar_nos(individuo.arvore_rotacao))
+
+
+def test_so_fica_pronto_com_amostras_suficientes(sondas):
+    random.seed(0)
+    modelo = ModeloSubstituto(sondas, min_amostras=10)
+    for _ in range(9):
+        modelo.adicionar(IndividuoPG(3), 0.0)
+    modelo.treinar()
+    assert not modelo.pronto and not modelo.confiavel
+
+    modelo.adicionar(IndividuoPG(3), 1.0)
+    modelo.treinar()
+    assert modelo.pronto and modelo.confiavel
+
+
+def test_ajuste_ordena_individuos_novos(sondas):
+    random.seed(1)
+    modelo = ModeloSubstituto(sondas, min_amostras=30)
+    for _ in range(200):
+        individuo = IndividuoPG(4)
+        modelo.adicionar(individuo, alvo(individuo))
+    modelo.treinar()
+
+    novos = [IndividuoPG(4) for _ in range(50)]
+    previstos = modelo.prever(novos)
+    assert previstos.shape == (50,)
+    rho = modelo.medir_precisao(previstos, [alvo(ind) for ind in novos])
+    assert rho > 0.9
+    assert modelo.precisao == rho
+
+
+def test_max_amostras_descarta_as_mais_antigas(sondas):
+    random.seed(2)
+    modelo = ModeloSubstituto(sondas, max_amostras=5)
+    for fitness in range(8):
+        modelo.adicionar(IndividuoPG(2), fitness)
+    assert modelo.y == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert len(modelo.X) == 5
+
+
+def test_confiavel_segue_limite_de_precisao(sondas):
+    random.seed(3)
+    modelo = ModeloSubstituto(sondas, min_amostras=3, min_precisao=0.3)
+    for fitness in range(3):
+        modelo.adicionar(IndividuoPG(2), fitness)
+    modelo.treinar()
+    assert modelo.confiavel  # sem medida ainda
+
+    assert modelo.medir_precisao([1, 2, 3, 4], [4, 3, 2, 1]) == pytest.approx(-1.0)
+    assert not modelo.confiavel
+    # previsões constantes não medem nada: a precisão anterior continua valendo
+    assert math.isnan(modelo.medir_precisao([1, 1, 1, 1], [1, 2, 3, 4]))
+    assert modelo.precisao == pytest.approx(-1.0)
+
+    modelo.medir_precisao([1, 2, 3, 4], [1, 2, 4, 3])
+    assert modelo.precisao == pytest.approx(0.8)
+    assert modelo.confiavel
+
+
+def test_elites_sempre_sao_simuladas():
+    random.seed(4)
+    pg = ProgramacaoGenetica(tamanho_populacao=8, profundidade=2, substituto=True,
+                             fracao_simulada=0.25)
+    pg.substituto.min_amostras = 5
+    for _ in range(10):
+        individuo = IndividuoPG(2)
+        pg.substituto.adicionar(individuo, alvo(individuo))
+    pg.substituto.treinar()
+    assert pg.substituto.confiavel
+
+    elites = pg.populacao[:2]
+    pg.elites = list(elites)
+    previstos = dict(zip(map(id, pg.populacao[2:]), pg.substituto.prever(pg.populacao[2:])))
+    pg.avaliar_populacao()
+
+    assert not any(ind.estimado for ind in elites)
+    estimados = [ind for ind in pg.populacao if ind.estimado]
+    assert len(estimados) == 6 - math.ceil(0.25 * 6)
+    # os adiados são os de menor fitness previsto e ficam com a previsão
+    simulados = [ind for ind in pg.populacao[2:] if not ind.estimado]
+    assert max(previstos[id(ind)] for ind in estimados) <= \
+           min(previstos[id(ind)] for ind in simulados)
+    assert all(ind.fitness == pytest.approx(previstos[id(ind)]) for ind in estimados)
+    assert pg.simulacoes_poupadas == [len(estimados)]
@@ -0,0 +1,45 @@
+import json
+import math
+
+import pytest
+
+from validar_campeoes import intervalo_wilson, media_com_intervalo, resumir, sem_nan
+
+
+@pytest.mark.parametrize('sucessos, n, esperado', [
+    # valores de referência (Wilson, z = 1.96)
+    (5, 10, (0.2366, 0.7634)),
+    (0, 10, (0.0, 0.2775)),
+    (10, 10, (0.7225, 1.0)),
+    (81, 263, (0.2553, 0.3662)),
+])
+def test_intervalo_wilson_referencia(sucessos, n, esperado):
+    baixo, alto = intervalo_wilson(sucessos, n)
+    assert baixo == pytest.approx(esperado[0], abs=1e-4)
+    assert alto == pytest.approx(esperado[1], abs=1e-4)
+
+
+@pytest.mark.parametrize('n', [1, 7, 50, 1000])
+def test_intervalo_wilson_contem_proporcao_e_fica_em_0_1(n):
+    for sucessos in range(0, n + 1, max(1, n // 10)):
+        baixo, alto = intervalo_wilson(sucessos, n)
+        assert 0.0 <= baixo <= sucessos / n <= alto <= 1.0
+
+
+def test_intervalo_wilson_estreita_com_n():
+    larguras = [alto - baixo for baixo, alto in
+                (intervalo_wilson(n // 4, n) for n in (20, 200, 2000))]
+    assert larguras == sorted(larguras, reverse=True)
+
+
+def test_sem_episodios_da_nan_e_json_valido():
+    assert all(math.isnan(x) for x in intervalo_wilson(0, 0))
+    media, (baixo, alto) = media_com_intervalo([3.0])
+    assert media == 3.0 and math.isnan(baixo) and math.isnan(alto)
+
+    # nenhum sucesso: passos até a meta sem amostras
+    relatorio = {'campeao.json': resumir([(False, 0.5, -1, 2), (False, 0.0, -1, 0)])}
+    texto = json.dumps(sem_nan(relatorio), allow_nan=False)
+    lido = json.loads(texto)['campeao.json']
+    assert lido['passos_meta'] == [None, [None, None]]
+    assert lido['sucesso'][0] == 0.0
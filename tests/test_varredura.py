@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from robo_exercicio import IndividuoPG
+from varredura import (campeao_referencia, executar_ensaio, expandir, ler_resultados,
+                       validar_parametros, varrer)
+
+
+SPEC_GRADE = {
+    'tipo': 'grade',
+    'semente': 3,
+    'repeticoes': 2,
+    'n_geracoes': 4,
+    'parametros': {'tamanho_populacao': [10, 20], 'profundidade': [2, 3, 4]},
+}
+
+
+def test_grade_expande_produto_com_repeticoes():
+    ensaios = expandir(SPEC_GRADE)
+    assert len(ensaios) == 2 * 3 * 2
+    combinacoes = {tuple(sorted(e['parametros'].items())) for e in ensaios}
+    assert len(combinacoes) == 6
+    assert all(e['n_geracoes'] == 4 for e in ensaios)
+    assert len({e['id'] for e in ensaios}) == len(ensaios)
+
+
+def test_ids_estaveis_entre_expansoes():
+    assert [e['id'] for e in expandir(SPEC_GRADE)] == [e['id'] for e in expandir(json.loads(json.dumps(SPEC_GRADE)))]
+    outra = dict(SPEC_GRADE, semente=4)
+    assert {e['id'] for e in expandir(outra)}.isdisjoint(e['id'] for e in expandir(SPEC_GRADE))
+
+
+def test_aleatoria_respeita_dominios():
+    spec = {'tipo': 'aleatoria', 'n_amostras': 50, 'semente': 1,
+            'parametros': {'tamanho_populacao': {'min': 10, 'max': 40},
+                           'decaimento_mutacao': {'min': 0.01, 'max': 0.2, 'log': True},
+                           'metodo_selecao': ['torneio', 'roleta']}}
+    ensaios = expandir(spec)
+    assert len(ensaios) == 50
+    for ensaio in ensaios:
+        p = ensaio['parametros']
+        assert isinstance(p['tamanho_populacao'], int) and 10 <= p['tamanho_populacao'] <= 40
+        assert 0.01 <= p['decaimento_mutacao'] <= 0.2
+        assert p['metodo_selecao'] in ('torneio', 'roleta')
+
+
+def test_parametros_invalidos():
+    with pytest.raises(ValueError, match='desconhecidos'):
+        validar_parametros(['tamanho_populacao', 'taxa_inventada'])
+    validar_parametros(['elite_size', 'decaimento_mutacao', 'peso_recursos', 'parada_antecipada'])
+    with pytest.raises(ValueError, match='lista'):
+        expandir({'tipo': 'grade', 'parametros': {'tamanho_populacao': {'min': 1, 'max': 2}}})
+    with pytest.raises(ValueError, match='Tipo'):
+        expandir({'tipo': 'bayesiana', 'parametros': {}})
+
+
+def test_ler_resultados_ignora_linha_cortada(tmp_path):
+    arquivo = tmp_path / 'resultados.jsonl'
+    arquivo.write_text('{"id": "a", "melhor_fitness": 1.0}\n'
+                       '{"id": "b", "melhor_fitness": 2.0}\n'
+                       '{"id": "c", "melhor_fi')
+    assert [r['id'] for r in ler_resultados(str(arquivo))] == ['a', 'b']
+    assert ler_resultados(str(tmp_path / 'inexistente.jsonl')) == []
+
+
+def test_executar_ensaio_completa_dict_de_parada():
+    ensaio = {'parametros': {'tamanho_populacao': 4, 'profundidade': 2, 'elite_size': 0.25,
+                             'parada_antecipada': {'max_tempo_parado': 10}},
+              'semente': 5, 'n_geracoes': 1}
+    resultado = executar_ensaio(ensaio)
+    assert resultado['historico']['melhor']
+    # a ordenação usa a mesma régua em todos os ensaios: reavaliar o campeão
+    # gravado dá o mesmo fitness
+    campeao = IndividuoPG.de_arvores(resultado['melhor']['arvore_aceleracao'],
+                                     resultado['melhor']['arvore_rotacao'])
+    assert campeao_referencia([campeao])[0] == resultado['melhor_fitness']
+
+
+def test_varrer_retoma_sem_repetir_ensaios(tmp_path):
+    spec = {'tipo': 'grade', 'semente': 0, 'repeticoes': 2, 'n_geracoes': 1,
+            'parametros': {'tamanho_populacao': [4], 'profundidade': [2], 'elite_size': [0.25]}}
+    arquivo = tmp_path / 'resultados.jsonl'
+    ensaios = expandir(spec)
+
+    # um ensaio gravado por inteiro e um cortado no meio da linha
+    completo = executar_ensaio(ensaios[0])
+    arquivo.write_text(json.dumps(completo) + '\n' + json.dumps(completo)[:40])
+
+    varrer(spec, str(arquivo), n_processos=1)
+    resultados = ler_resultados(str(arquivo))
+    assert sorted(r['id'] for r in resultados) == sorted(e['id'] for e in ensaios)
+
+    varrer(spec, str(arquivo), n_processos=1)
+    assert len(ler_resultados(str(arquivo))) == len(ensaios)
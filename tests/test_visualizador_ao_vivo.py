@@ -0,0 +1,100 @@
+import multiprocessing
+import random
+import time
+import types
+
+import pytest
+
+import robo_exercicio
+from robo_exercicio import AvaliadorFitness, IndividuoPG, VisualizadorAoVivo
+
+
+class ProcessoFalso:
+    """Visualizador que não sobe: o próprio teste lê a fila."""
+
+    def __init__(self, target, args, daemon):
+        self.vivo = True
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return self.vivo
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        self.vivo = False
+
+
+@pytest.fixture
+def visualizador(monkeypatch):
+    contexto = multiprocessing.get_context('spawn')
+    falso = types.SimpleNamespace(Queue=contexto.Queue, Process=ProcessoFalso)
+    monkeypatch.setattr(robo_exercicio.multiprocessing, 'get_context', lambda metodo: falso)
+    visualizador = VisualizadorAoVivo()
+    yield visualizador
+    visualizador.processo.vivo = False
+    visualizador.fechar(timeout=5)
+
+
+def treino():
+    random.seed(0)
+    return types.SimpleNamespace(cenario_atual=(11, None), melhor_individuo=IndividuoPG(2),
+                                 melhor_fitness=0.0, avaliador=AvaliadorFitness(),
+                                 historico_fitness=[], media_fitness=[])
+
+
+def gerar(pg, visualizador):
+    pg.historico_fitness.append(float(len(pg.historico_fitness)))
+    pg.media_fitness.append(-1.0)
+    visualizador.publicar(pg, len(pg.historico_fitness))
+
+
+def esperar(condicao, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        assert time.monotonic() < limite
+        time.sleep(0.01)
+
+
+def test_visualizador_atrasado_descarta_so_a_pendente(visualizador):
+    pg = treino()
+    gerar(pg, visualizador)
+    esperar(lambda: visualizador.pendente is None)   # 1 na fila
+    gerar(pg, visualizador)
+    esperar(lambda: visualizador.pendente is None)   # 2 esperando vaga na thread
+    gerar(pg, visualizador)
+    gerar(pg, visualizador)                          # 4 substitui 3
+    assert visualizador.descartados == 1
+
+    recebidas = [visualizador.fila.get(timeout=5) for _ in range(3)]
+    assert [m['geracao'] for m in recebidas] == [1, 2, 4]
+    assert [m['cenario'] for m in recebidas] == [11] * 3
+    # a 4 leva também o histórico da descartada
+    assert (recebidas[2]['desde'], recebidas[2]['melhor']) == (2, [2.0, 3.0])
+    esperar(lambda: visualizador.enviados == 3)
+
+
+def test_publicar_depois_de_fechar_e_ignorado(visualizador):
+    pg = treino()
+    gerar(pg, visualizador)
+    assert visualizador.fila.get(timeout=5)['geracao'] == 1
+    visualizador.fechar(timeout=5)  # o 'fim' ocupa a vaga livre
+    assert not visualizador.thread.is_alive()
+
+    gerar(pg, visualizador)
+    assert visualizador.pendente is None
+    assert (visualizador.enviados, visualizador.descartados) == (1, 0)
+
+
+def test_thread_de_envio_desiste_se_o_visualizador_morre(visualizador):
+    pg = treino()
+    gerar(pg, visualizador)
+    esperar(lambda: visualizador.pendente is None)
+    gerar(pg, visualizador)       # sem vaga na fila
+    visualizador.processo.vivo = False
+    visualizador.thread.join(timeout=5)
+    assert not visualizador.thread.is_alive()
+    assert visualizador.enviados == 1
@@ -0,0 +1,195 @@
+"""
+Validação de campeões: roda uma ou mais árvores salvas (formato do
+melhor_robo.json) em um banco fixo de cenários de teste, gerado por semente
+e com tamanho de mapa e densidade de obstáculos/recursos variados, em
+paralelo entre os núcleos.
+
+Cada episódio começa em uma posição segura sorteada (como no Simulador),
+usa os comandos da própria árvore e termina sem energia, no fim do tempo
+ou com a meta atingida e todos os recursos coletados. Para cada campeão o
+relatório traz, com intervalo de confiança de 95%:
+  - taxa de sucesso (meta atingida), intervalo de Wilson;
+  - fração dos recursos coletados, passos até a meta (só nos sucessos) e
+    colisões por episódio, intervalo normal da média.
+
+Uso:
+    python validar_campeoes.py melhor_robo.json outro.json --cenarios 5000
+    python validar_campeoes.py melhor_robo.json --json relatorio.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from robo_exercicio import Ambiente, IndividuoPG, Robo
+
+# Faixas do banco de teste: área do mapa e densidades por 100 000 px²
+FAIXA_LARGURA = (500, 1200)
+FAIXA_PROPORCAO = (0.5, 1.0)     # altura / largura
+FAIXA_OBSTACULOS = (0.3, 2.0)
+FAIXA_RECURSOS = (0.5, 3.0)
+RAIO_ROBO = 15
+CELULA_GRADE = 4
+
+
+def gerar_banco_validacao(n_cenarios=2000, semente=20240):
+    """Parâmetros de cada cenário do banco; o layout sai de Ambiente.gerar_cenario."""
+    rng = random.Random(semente)
+    banco = []
+    for _ in range(n_cenarios):
+        largura = rng.randint(*FAIXA_LARGURA)
+        altura = int(largura * rng.uniform(*FAIXA_PROPORCAO))
+        area = largura * altura / 100_000
+        banco.append({
+            'semente':        rng.randrange(2**31),
+            'largura':        largura,
+            'altura':         altura,
+            'num_obstaculos': max(1, round(area * rng.uniform(*FAIXA_OBSTACULOS))),
+            'num_recursos':   max(1, round(area * rng.uniform(*FAIXA_RECURSOS))),
+        })
+    return banco
+
+
+def episodio_validacao(individuo, ambiente, semente):
+    """(sucesso, fração de recursos, passos até a meta ou -1, colisões) de um episódio."""
+    random.seed(semente)
+    ambiente.reset()
+    robo = Robo(*ambiente.posicao_segura(RAIO_ROBO), raio=RAIO_ROBO)
+    passos_meta = -1
+    passos = 0
+    while True:
+        a, r = individuo.comandos(robo.get_sensores(ambiente))
+        sem_energia = robo.mover(a, r, ambiente)
+        passos += 1
+        if robo.meta_atingida and passos_meta < 0:
+            passos_meta = passos
+        if sem_energia or ambiente.passo():
+            break
+        if robo.meta_atingida and ambiente.recursos_restantes() == 0:
+            break
+    fracao = robo.recursos_coletados / len(ambiente.recursos)
+    return robo.meta_atingida, fracao, passos_meta, robo.colisoes
+
+
+def avaliar_bloco(arvores, cenarios):
+    """Resultados de todos os campeões em um bloco de cenários (roda em um processo)."""
+    campeoes = [IndividuoPG.de_arvores(aceleracao, rotacao) for aceleracao, rotacao in arvores]
+    estado = random.getstate()
+    resultados = [[] for _ in campeoes]
+    for cenario in cenarios:
+        parametros = {k: v for k, v in cenario.items() if k != 'semente'}
+        ambiente = Ambiente.gerar_cenario(cenario['semente'], **parametros)
+        ambiente.usar_grade_colisao(RAIO_ROBO, CELULA_GRADE)
+        for individuo, saida in zip(campeoes, resultados):
+            # mesma semente para todos os campeões: mesmo ponto de partida
+            saida.append(episodio_validacao(individuo, ambiente, cenario['semente'] + 1))
+    random.setstate(estado)
+    return resultados
+
+
+def intervalo_wilson(sucessos, n, z=1.96):
+    if n == 0:
+        return float('nan'), float('nan')
+    p = sucessos / n
+    denominador = 1 + z**2 / n
+    centro = (p + z**2 / (2 * n)) / denominador
+    meia = z * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denominador
+    return centro - meia, centro + meia
+
+
+def media_com_intervalo(valores, z=1.96):
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) == 0:
+        return float('nan'), (float('nan'), float('nan'))
+    media = float(valores.mean())
+    if len(valores) < 2:
+        return media, (float('nan'), float('nan'))
+    meia = z * float(valores.std(ddof=1)) / math.sqrt(len(valores))
+    return media, (media - meia, media + meia)
+
+
+def resumir(episodios):
+    sucesso = np.array([e[0] for e in episodios], dtype=bool)
+    fracao = [e[1] for e in episodios]
+    passos_meta = [e[2] for e in episodios if e[0]]
+    colisoes = [e[3] for e in episodios]
+    n = len(episodios)
+    return {
+        'episodios': n,
+        'sucesso':   (float(sucesso.mean()) if n else float('nan'),
+                      intervalo_wilson(int(sucesso.sum()), n)),
+        'recursos':  media_com_intervalo(fracao),
+        'passos_meta': media_com_intervalo(passos_meta),
+        'colisoes':  media_com_intervalo(colisoes),
+    }
+
+
+def validar(arquivos, n_cenarios=2000, semente=20240, n_processos=None):
+    arvores = []
+    for arquivo in arquivos:
+        individuo = IndividuoPG.carregar(arquivo)
+        arvores.append((individuo.arvore_aceleracao, individuo.arvore_rotacao))
+
+    banco = gerar_banco_validacao(n_cenarios, semente)
+    n_processos = n_processos or os.cpu_count()
+    # blocos pequenos o bastante para equilibrar a carga entre processos
+    tamanho_bloco = max(1, math.ceil(len(banco) / (8 * n_processos)))
+    blocos = [banco[i:i + tamanho_bloco] for i in range(0, len(banco), tamanho_bloco)]
+
+    inicio = time.perf_counter()
+    episodios = [[] for _ in arquivos]
+    with ProcessPoolExecutor(max_workers=n_processos) as pool:
+        for resultado in pool.map(avaliar_bloco, [arvores] * len(blocos), blocos):
+            for saida, parcial in zip(episodios, resultado):
+                saida.extend(parcial)
+    duracao = time.perf_counter() - inicio
+
+    total = n_cenarios * len(arquivos)
+    print(f"{total} episódios em {duracao:.1f}s ({60 * total / duracao:.0f} episódios/min, "
+          f"{n_processos} processos) | banco: {n_cenarios} cenários, semente {semente}")
+    return {arquivo: resumir(saida) for arquivo, saida in zip(arquivos, episodios)}
+
+
+def sem_nan(valor):
+    """Cópia do relatório com NaN trocado por None (null no JSON)."""
+    if isinstance(valor, dict):
+        return {chave: sem_nan(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [sem_nan(v) for v in valor]
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+def imprimir_relatorio(relatorio):
+    for arquivo, r in relatorio.items():
+        taxa, (baixo, alto) = r['sucesso']
+        print(f"\n{arquivo} ({r['episodios']} episódios)")
+        print(f"  Sucesso (meta):     {taxa:7.1%}  [{baixo:.1%}, {alto:.1%}]")
+        for chave, rotulo, formato in (('recursos', 'Recursos coletados', '.1%'),
+                                       ('passos_meta', 'Passos até a meta', '.1f'),
+                                       ('colisoes', 'Colisões/episódio', '.2f')):
+            media, (baixo, alto) = r[chave]
+            print(f"  {rotulo + ':':<19} {media:7{formato}}  "
+                  f"[{baixo:{formato}}, {alto:{formato}}]")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validação de campeões em cenários de teste")
+    parser.add_argument('arquivos', nargs='+', help="árvores salvas (formato melhor_robo.json)")
+    parser.add_argument('--cenarios', type=int, default=2000)
+    parser.add_argument('--semente', type=int, default=20240)
+    parser.add_argument('--processos', type=int, default=os.cpu_count())
+    parser.add_argument('--json', help="grava o relatório neste arquivo")
+    args = parser.parse_args()
+
+    relatorio = validar(args.arquivos, args.cenarios, args.semente, args.processos)
+    imprimir_relatorio(relatorio)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(sem_nan(relatorio), f, indent=2, allow_nan=False)
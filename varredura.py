@@ -0,0 +1,243 @@
+"""
+Varredura de hiperparâmetros sem interface gráfica: roda ensaios
+independentes de ProgramacaoGenetica em paralelo (um ensaio por processo),
+cada um com a sua semente, e grava o resultado de cada ensaio concluído em
+um arquivo JSONL só de acréscimo. Uma varredura interrompida continua de
+onde parou: os ensaios já gravados são pulados.
+
+Especificação (JSON):
+    {
+      "tipo": "grade",              # ou "aleatoria"
+      "n_amostras": 20,             # só para "aleatoria"
+      "semente": 0,                 # sorteio dos ensaios e das sementes
+      "repeticoes": 2,              # sementes por combinação
+      "n_geracoes": 30,
+      "parametros": {
+        "tamanho_populacao":  [30, 50],
+        "profundidade":       [3, 4],
+        "metodo_selecao":     ["torneio", "roleta"],
+        "elite_size":         [0.05, 0.1],
+        "decaimento_mutacao": {"min": 0.01, "max": 0.2, "log": true},
+        "peso_recursos":      {"min": 100, "max": 400}
+      }
+    }
+
+Na grade, cada parâmetro é uma lista de valores. Na busca aleatória também
+aceita um intervalo {"min", "max"} (inteiro se os dois limites forem
+inteiros, log-uniforme com "log": true). Os parâmetros podem ser do
+construtor de ProgramacaoGenetica, os da taxa de mutação
+(prob_mut_inicial, decaimento_mutacao) ou os da avaliação
+(AvaliadorFitness.PARAMETROS, e.g. pesos do reward shaping). Parâmetros
+de avaliação que são dicts (parada_antecipada) completam o padrão: basta
+informar as chaves alteradas.
+
+Os ensaios são ordenados pelo fitness dos campeões no cenário de
+referência, com o avaliador padrão; o fitness da última geração vem de um
+cenário sorteado e de pesos que podem ter sido varridos, e não serve para
+comparar ensaios.
+
+Uso:
+    python varredura.py spec.json resultados.jsonl --processos 8
+    python varredura.py spec.json resultados.jsonl --resumo 10
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from robo_exercicio import Ambiente, AvaliadorFitness, ProgramacaoGenetica, Robo
+
+PARAMETROS_CONSTRUTOR = ('tamanho_populacao', 'profundidade', 'metodo_selecao',
+                         'elite_size', 'cenarios_deterministicos',
+                         'deduplicacao_semantica', 'n_sondas', 'substituto',
+                         'fracao_simulada')
+PARAMETROS_MUTACAO = ('prob_mut_inicial', 'decaimento_mutacao')
+
+
+def validar_parametros(nomes):
+    conhecidos = set(PARAMETROS_CONSTRUTOR + PARAMETROS_MUTACAO + AvaliadorFitness.PARAMETROS)
+    desconhecidos = sorted(set(nomes) - conhecidos)
+    if desconhecidos:
+        raise ValueError(f"Parâmetros desconhecidos na varredura: {', '.join(desconhecidos)}")
+
+
+def sortear_valor(dominio, rng):
+    if isinstance(dominio, list):
+        return rng.choice(dominio)
+    minimo, maximo = dominio['min'], dominio['max']
+    if dominio.get('log'):
+        valor = math.exp(rng.uniform(math.log(minimo), math.log(maximo)))
+        return round(valor) if isinstance(minimo, int) and isinstance(maximo, int) else valor
+    if isinstance(minimo, int) and isinstance(maximo, int):
+        return rng.randint(minimo, maximo)
+    return rng.uniform(minimo, maximo)
+
+
+def id_ensaio(ensaio):
+    """Identificador estável: o mesmo ensaio tem o mesmo id em qualquer execução."""
+    texto = json.dumps(ensaio, sort_keys=True)
+    return hashlib.blake2b(texto.encode(), digest_size=8).hexdigest()
+
+
+def expandir(spec):
+    """Lista de ensaios {'parametros', 'semente', 'n_geracoes', 'id'} da especificação."""
+    parametros = spec['parametros']
+    validar_parametros(parametros)
+    rng = random.Random(spec.get('semente', 0))
+
+    if spec.get('tipo', 'grade') == 'grade':
+        for nome, dominio in parametros.items():
+            if not isinstance(dominio, list):
+                raise ValueError(f"Na grade, '{nome}' precisa ser uma lista de valores")
+        nomes = list(parametros)
+        combinacoes = [dict(zip(nomes, valores))
+                       for valores in itertools.product(*(parametros[n] for n in nomes))]
+    elif spec['tipo'] == 'aleatoria':
+        combinacoes = [{nome: sortear_valor(dominio, rng) for nome, dominio in parametros.items()}
+                       for _ in range(spec['n_amostras'])]
+    else:
+        raise ValueError(f"Tipo de varredura desconhecido: {spec['tipo']}")
+
+    ensaios = []
+    for combinacao in combinacoes:
+        for _ in range(spec.get('repeticoes', 1)):
+            ensaio = {'parametros': combinacao,
+                      'semente': rng.randrange(2**31),
+                      'n_geracoes': spec.get('n_geracoes', 50)}
+            ensaio['id'] = id_ensaio(ensaio)
+            ensaios.append(ensaio)
+    return ensaios
+
+
+def campeao_referencia(candidatos):
+    """
+    (fitness, indivíduo) do melhor dos `candidatos` no cenário de referência
+    com o avaliador padrão: a mesma régua para todos os ensaios.
+    """
+    avaliador = AvaliadorFitness()
+    ambiente = Ambiente.gerar_cenario(ProgramacaoGenetica.SEMENTE_REFERENCIA)
+    pontuados = []
+    for individuo in candidatos:
+        robo = Robo(ambiente.largura // 2, ambiente.altura // 2)
+        fitness, _ = avaliador.avaliar(individuo, ambiente, robo,
+                                       ProgramacaoGenetica.SEMENTE_REFERENCIA)
+        pontuados.append((fitness, individuo))
+    return max(pontuados, key=lambda par: par[0])
+
+
+def executar_ensaio(ensaio):
+    """Roda um ensaio completo em um processo de trabalho."""
+    parametros = ensaio['parametros']
+    random.seed(ensaio['semente'])
+    inicio = time.perf_counter()
+
+    pg = ProgramacaoGenetica(**{nome: valor for nome, valor in parametros.items()
+                                if nome in PARAMETROS_CONSTRUTOR})
+    for nome, valor in parametros.items():
+        if nome in PARAMETROS_MUTACAO:
+            setattr(pg, nome, valor)
+        elif nome in AvaliadorFitness.PARAMETROS:
+            padrao = getattr(pg.avaliador, nome)
+            if isinstance(padrao, dict):
+                valor = {**padrao, **valor}
+            setattr(pg.avaliador, nome, valor)
+
+    for _ in pg.evoluir_iter(ensaio['n_geracoes']):
+        pass
+    melhor_fitness, melhor = campeao_referencia(pg.elites)
+
+    return dict(ensaio,
+                melhor_fitness=melhor_fitness,
+                fitness_ultima_geracao=pg.melhor_fitness,
+                tempo=time.perf_counter() - inicio,
+                historico={'melhor':      pg.historico_fitness,
+                           'media':       pg.media_fitness,
+                           'std':         pg.std_fitness,
+                           'diversidade': pg.diversidade,
+                           'passos':      pg.passos_medios},
+                melhor={'arvore_aceleracao': melhor.arvore_aceleracao,
+                        'arvore_rotacao':    melhor.arvore_rotacao})
+
+
+def ler_resultados(arquivo):
+    """Resultados já gravados; uma última linha incompleta (interrupção) é ignorada."""
+    resultados = []
+    if not os.path.exists(arquivo):
+        return resultados
+    with open(arquivo) as f:
+        for linha in f:
+            try:
+                resultados.append(json.loads(linha))
+            except json.JSONDecodeError:
+                continue
+    return resultados
+
+
+def gravar_resultado(arquivo, resultado):
+    with open(arquivo, 'a') as f:
+        f.write(json.dumps(resultado) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def varrer(spec, arquivo, n_processos=None):
+    ensaios = expandir(spec)
+    concluidos = {resultado['id'] for resultado in ler_resultados(arquivo)}
+    pendentes = [ensaio for ensaio in ensaios if ensaio['id'] not in concluidos]
+    print(f"{len(ensaios)} ensaios | {len(ensaios) - len(pendentes)} já concluídos | "
+          f"{len(pendentes)} a rodar")
+    if not pendentes:
+        return
+
+    # Ensaio já gravado que não termina em '\n' foi cortado no meio: a
+    # próxima gravação começa em uma linha nova
+    if os.path.exists(arquivo) and os.path.getsize(arquivo) > 0:
+        with open(arquivo, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                with open(arquivo, 'a') as g:
+                    g.write('\n')
+
+    with ProcessPoolExecutor(max_workers=n_processos) as pool:
+        futuros = {pool.submit(executar_ensaio, ensaio): ensaio for ensaio in pendentes}
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            ensaio = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as erro:
+                print(f"[{n}/{len(pendentes)}] {ensaio['id']} falhou: {erro!r}", file=sys.stderr)
+                continue
+            gravar_resultado(arquivo, resultado)
+            print(f"[{n}/{len(pendentes)}] {ensaio['id']} melhor={resultado['melhor_fitness']:.2f} "
+                  f"({resultado['tempo']:.0f}s) {ensaio['parametros']}")
+
+
+def resumo(arquivo, n=10):
+    resultados = sorted(ler_resultados(arquivo), key=lambda r: r['melhor_fitness'], reverse=True)
+    for resultado in resultados[:n]:
+        print(f"{resultado['melhor_fitness']:10.2f}  {resultado['id']}  "
+              f"semente={resultado['semente']}  {resultado['parametros']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura de hiperparâmetros da programação genética")
+    parser.add_argument('spec', help="arquivo JSON com a especificação da varredura")
+    parser.add_argument('resultados', help="arquivo JSONL de resultados (só acréscimo)")
+    parser.add_argument('--processos', type=int, default=os.cpu_count())
+    parser.add_argument('--resumo', type=int, metavar='N',
+                        help="só mostra os N melhores ensaios já gravados")
+    args = parser.parse_args()
+
+    if args.resumo is not None:
+        resumo(args.resultados, args.resumo)
+    else:
+        with open(args.spec) as f:
+            spec = json.load(f)
+        varrer(spec, args.resultados, args.processos)
+        resumo(args.resultados)